@@ -11,14 +11,27 @@ import urllib3
 import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import argparse
 
 # Импортируем Page Objects
 from pages.listing_page import ListingPage
 from pages.car_detail_page import CarDetailPage
+from pages.http_listing_page import HttpListingPage
+from pages.query_planner import create_listing, search_url
+from crawler.sinks import create_sink
+from crawler.normalize import normalize_frame, sort_by_date
+from crawler.http_cache import get_http_cache
+from crawler.rate_limit import get_rate_limiter
+from crawler.seen_store import SeenStore
+from crawler.dedupe import ListingIndex
+from crawler.checkpoint import Checkpoint
+from crawler import metrics, profiling
+from crawler.profiling import Profiler
 from config import (
-    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME,
+    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME, EXCEL_EXPORT,
     BASE_URL_TEMPLATE, CHROMEDRIVER_PATH, CHROME_ARGS,
-    PAGE_LOAD_DELAY, PAGINATION_DELAY
+    LISTING_CONCURRENCY, INCREMENTAL_MODE,
+    CHECKPOINT_ENABLED
 )
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -27,20 +40,36 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class AutoRuParser:
     """Быстрый парсер auto.ru с оптимизациями"""
     
-    def __init__(self, max_price=MAX_PRICE, num_threads=NUM_THREADS):
+    def __init__(self, max_price=MAX_PRICE, num_threads=NUM_THREADS, sink=None,
+                 incremental=INCREMENTAL_MODE, resume=False):
         """Инициализация парсера
         
         Args:
             max_price (int): Максимальная цена для фильтрации
             num_threads (int): Количество параллельных потоков
+            sink (ResultSink): Хранилище результатов (по умолчанию из SINK_FORMAT)
+            incremental (bool): Скачивать детали только для новых/устаревших объявлений
+            resume (bool): Продолжить прерванный запуск с контрольной точки
         """
-        self.base_url = f"{BASE_URL_TEMPLATE}{max_price}"
+        self.base_url = search_url(BASE_URL_TEMPLATE, max_price)  # ✅ price_to из max_price
         self.max_price = max_price
-        self.cars = []
+        self.http_listing = create_listing(self.base_url)  # ✅ Выдача по срезам цены (QUERY_PLANNER)
+        
+        # ✅ Контрольная точка: при продолжении результаты дописываются в тот же файл
+        self.checkpoint = Checkpoint() if CHECKPOINT_ENABLED or resume else None
+        resumed = self.checkpoint is not None and self.checkpoint.start(self.base_url, resume)
+        self.sink = sink if sink is not None else create_sink(append=resumed)  # ✅ Потоковая запись результатов
         self.driver = None
         self.num_threads = num_threads
         self.lock = threading.Lock()
         self.stats = {'processed': 0, 'errors': 0}  # ✅ Статистика
+        self.seen_store = SeenStore() if incremental else None
+        self.index = ListingIndex()  # ✅ Дедупликация по ID объявления
+    
+    @property
+    def cars(self):
+        """Все собранные записи (читаются из потокового хранилища)"""
+        return self.sink.read_records()
     
     def setup_driver(self):
         """Инициализирует оптимизированный Selenium WebDriver"""
@@ -62,8 +91,37 @@ class AutoRuParser:
             print(f"❌ Ошибка при загрузке ChromeDriver: {e}")
             raise
     
+    def get_listing_page(self):
+        """Получить Selenium ListingPage (браузер запускается только при необходимости)"""
+        if self.driver is None:
+            self.setup_driver()
+        return ListingPage(self.driver, self.base_url, page_url=self.http_listing.get_page_url)
+    
+    def collect_with_selenium(self, pages):
+        """Добрать через браузер страницы, которые не удалось разобрать по HTTP
+        
+        Args:
+            pages (list): Номера страниц
+            
+        Returns:
+            dict: {номер страницы: список ссылок}
+        """
+        listing_page = self.get_listing_page()
+        links_by_page = {}
+        
+        for page in pages:
+            print(f"📄 Страница {page} (браузер)...", end=' ')
+            listing_page.open_page(page)
+            
+            links_by_page[page] = listing_page.get_car_links()
+            print(f"✅ {len(links_by_page[page])} ссылок")
+            if self.checkpoint is not None:
+                self.checkpoint.save_page(page, links_by_page[page])
+        
+        return links_by_page
+    
     def collect_all_links(self, max_pages=MAX_PAGES):
-        """Собрать все ссылки на объявления (оптимизировано)
+        """Собрать все ссылки на объявления (HTTP + lxml, Selenium как запасной вариант)
         
         Args:
             max_pages (int): Максимальное количество страниц
@@ -71,27 +129,42 @@ class AutoRuParser:
         Returns:
             list: Список ссылок на объявления
         """
-        listing_page = ListingPage(self.driver, self.base_url)
+        http_listing = self.http_listing
+        session = CarDetailPage.get_session()
+        checkpoint = self.checkpoint
+        
+        total_pages = checkpoint.total_pages if checkpoint is not None else None
+        if total_pages is not None:
+            http_listing.load_plan(checkpoint.plan)
+        else:
+            print(f"🔍 Определяю количество страниц...")
+            total_pages = http_listing.get_total_pages(session)
+            if total_pages is None:
+                total_pages = self.get_listing_page().get_total_pages()
+            
+            if max_pages:
+                total_pages = min(total_pages, max_pages)
+            if checkpoint is not None:
+                checkpoint.set_total_pages(total_pages, http_listing.plan_state())
         
-        print(f"🔍 Определяю количество страниц...")
-        total_pages = listing_page.get_total_pages()
+        pages = checkpoint.remaining_pages(total_pages) if checkpoint is not None else range(1, total_pages + 1)
         
-        if max_pages:
-            total_pages = min(total_pages, max_pages)
+        print(f"📄 Загружаю {len(pages)} страниц по HTTP ({LISTING_CONCURRENCY} потоков)...")
+        links_by_page, fallback_pages = http_listing.collect_threaded(
+            session, pages, LISTING_CONCURRENCY
+        )
+        print(f"✅ По HTTP: {len(links_by_page)} страниц | через браузер: {len(fallback_pages)}")
         
-        all_links = []
-        for page in range(1, total_pages + 1):
-            print(f"📄 Страница {page}/{total_pages}...", end=' ')
-            listing_page.open_page(page)
-            
-            links = listing_page.get_car_links()
-            all_links.extend(links)
-            print(f"✅ {len(links)} ссылок")
-            
-            if PAGINATION_DELAY > 0:
-                time.sleep(PAGINATION_DELAY)
+        if checkpoint is not None:
+            checkpoint.save_pages(links_by_page)
+            checkpoint.fail_pages(fallback_pages)
         
-        return all_links
+        if fallback_pages:
+            links_by_page.update(self.collect_with_selenium(fallback_pages))
+        
+        if checkpoint is not None:
+            return checkpoint.frontier()  # ✅ Включая страницы, собранные в прошлом запуске
+        return HttpListingPage.merge_links(links_by_page)
     
     def parse_car_thread(self, car_url):
         """Парсить объявление в отдельном потоке (оптимизировано)
@@ -103,11 +176,19 @@ class AutoRuParser:
             detail_page = CarDetailPage(car_url)
             car_data = detail_page.get_car_data()
             
-            if car_data['Цена'] == 0:
+            loaded = detail_page.tree is not None or detail_page.record is not None
+            if loaded:
+                self.index.mark_fetched(car_url)
+                if self.seen_store is not None:
+                    self.seen_store.mark_fetched(car_url)
+            
+            if car_data.price == 0:
+                if self.checkpoint is not None and loaded:
+                    self.checkpoint.mark_finished(car_url)
                 return
             
             with self.lock:
-                self.cars.append(car_data)
+                self.sink.add(car_data)
                 self.stats['processed'] += 1
                 
                 # ✅ Прогресс каждые 20 объявлений
@@ -124,12 +205,25 @@ class AutoRuParser:
         Args:
             max_pages (int): Максимальное количество страниц
         """
-        self.setup_driver()
-        
+        completed = False
+        metrics.start_server()  # ✅ /metrics, если задан METRICS_PORT
         try:
+            if self.seen_store is not None:
+                self.seen_store.begin_run()
+            
             # ✅ Собираем ссылки
             all_links = self.collect_all_links(max_pages)
             
+            all_links = self.index.filter(all_links)  # ✅ Одно объявление - одна загрузка
+            
+            if self.checkpoint is not None:
+                # ✅ Пропускаем объявления, обработанные до прерывания
+                all_links = self.checkpoint.pending(all_links, self.checkpoint.completed_urls(self.sink))
+            
+            if self.seen_store is not None:
+                # ✅ Инкрементальный режим: только новые и устаревшие объявления
+                all_links = self.seen_store.observe(all_links)
+            
             print(f"\n{'='*60}")
             print(f"📊 Всего собрано ссылок: {len(all_links)}")
             print(f"⚡ Запущено потоков: {self.num_threads}")
@@ -149,16 +243,40 @@ class AutoRuParser:
             
             elapsed_parsing = time.time() - start_parsing
             print(f"\n⚡ Парсинг занял: {elapsed_parsing:.1f} сек")
+            completed = True
         
         except KeyboardInterrupt:
             print("\n\n⚠️  Парсинг прерван")
         
         finally:
-            self.driver.quit()
+            self.sink.close()  # ✅ Сбрасываем буфер даже при ошибке
+            self.index.close()
+            self.index.print_stats()
+            if self.seen_store is not None:
+                self.seen_store.flush()  # ✅ Отметки о скачивании пишутся пачками
+                if completed and not max_pages:
+                    self.seen_store.finish_run()
+                self.seen_store.print_stats()
+            if self.checkpoint is not None:
+                if completed:
+                    self.checkpoint.finish()
+                else:
+                    print("💾 Прогресс сохранён - продолжить: python auto_parser.py --resume")
+            cache = get_http_cache()
+            if cache is not None:
+                cache.flush()  # ✅ Отложенные LRU-отметки попаданий
+                cache.print_stats()
+            rate_limiter = get_rate_limiter()
+            if rate_limiter is not None:
+                rate_limiter.print_stats()
+            metrics.print_summary()
+            if self.driver is not None:
+                self.driver.quit()
+                self.driver = None
+                print("🔴 Browser закрыт")
             CarDetailPage.close_session()  # ✅ Закрываем сессию
-            print("🔴 Browser закрыт")
         
-        return self.cars
+        return self.sink
     
     def save_to_excel(self, filename=OUTPUT_FILENAME):
         """Сохранить данные в Excel (оптимизировано)
@@ -166,24 +284,18 @@ class AutoRuParser:
         Args:
             filename (str): Имя выходного файла
         """
-        if not self.cars:
+        if not self.sink.count:
             print("❌ Нет данных для сохранения")
             return
         
         start_save = time.time()
-        print(f"\n⏳ Сохраняю {len(self.cars)} объявлений...")
+        print(f"\n⏳ Сохраняю {self.sink.count} объявлений...")
         
-        df = pd.DataFrame(self.cars)
-        
-        # ✅ Быстрая сортировка
-        try:
-            df['Дата объявления'] = pd.to_datetime(df['Дата объявления'], 
-                                                   format='%d %B %Y', 
-                                                   errors='coerce')
-            df = df.sort_values('Дата объявления', ascending=False, na_position='last')
-            df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
-        except:
-            pass
+        # ✅ Читаем уже сброшенные на диск записи
+        df = self.sink.read_dataframe()
+        # ✅ Векторная нормализация: даты «12 октября» / «вчера», пробег, двигатель
+        df = sort_by_date(normalize_frame(df))
+        df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
         
         df = df.drop('URL', axis=1)
         
@@ -206,9 +318,14 @@ class AutoRuParser:
 
 def main():
     """Главная функция"""
+    arg_parser = argparse.ArgumentParser(description="Парсер auto.ru")
+    arg_parser.add_argument('--resume', action='store_true', help="Продолжить прерванный запуск")
+    profiling.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    
     total_start = time.time()
     
-    parser = AutoRuParser(max_price=MAX_PRICE, num_threads=NUM_THREADS)
+    parser = AutoRuParser(max_price=MAX_PRICE, num_threads=NUM_THREADS, resume=args.resume)
     
     print("\n" + "="*60)
     print("🚗 БЫСТРЫЙ ПАРСЕР AUTO.RU (Page Object Pattern)")
@@ -217,8 +334,12 @@ def main():
     print(f"⚡ Параллельных потоков: {parser.num_threads}")
     print("="*60 + "\n")
     
-    parser.parse_all_pages(max_pages=MAX_PAGES)
-    parser.save_to_excel(OUTPUT_FILENAME)
+    with Profiler(args.profile, args.profile_memory, output=OUTPUT_FILENAME) as profiler:
+        with profiler.phase('crawl'):
+            parser.parse_all_pages(max_pages=MAX_PAGES)
+        if EXCEL_EXPORT:
+            with profiler.phase('save'):
+                parser.save_to_excel(OUTPUT_FILENAME)
     
     total_elapsed = time.time() - total_start
     
@@ -226,10 +347,10 @@ def main():
     print(f"✅ ПАРСИНГ ЗАВЕРШЁН")
     print("="*60)
     print(f"⏱️  Общее время: {total_elapsed:.1f} сек")
-    print(f"📊 Всего объявлений: {len(parser.cars)}")
+    print(f"📊 Всего объявлений: {parser.sink.count}")
     
-    if total_elapsed > 0 and len(parser.cars) > 0:
-        speed = len(parser.cars) / total_elapsed
+    if total_elapsed > 0 and parser.sink.count > 0:
+        speed = parser.sink.count / total_elapsed
         print(f"⚡ Скорость: ~{speed:.1f} объявл/сек")
     
     print("="*60 + "\n")
@@ -11,13 +11,34 @@ from selenium import webdriver
 import pandas as pd
 import urllib3
 import os
+import argparse
 from lxml import html
 
 from pages.listing_page import ListingPage
+from pages.http_listing_page import HttpListingPage
+from pages.query_planner import create_listing, search_url
+from pages.extraction import DEFAULT_PLAN, get_extractor, StreamingExtraction
+from pages.page_state import DEFAULT_STATE_EXTRACTOR
+from crawler.records import CarRecord
+from crawler.http_cache import HttpCache, get_http_cache
+from crawler.rate_limit import throttle_async, backoff, get_rate_limiter
+from crawler.retry import RetryScheduler, parse_retry_after
+from crawler.sinks import create_sink
+from crawler.normalize import normalize_frame, sort_by_date
+from crawler.parse_pool import ParsePool
+from crawler.seen_store import SeenStore
+from crawler.dedupe import ListingIndex
+from crawler.checkpoint import Checkpoint
+from crawler.concurrency import AdaptiveLimiter
+from crawler import metrics, profiling
+from crawler.profiling import Profiler
 from config import (
-    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME,
+    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME, EXCEL_EXPORT,
     BASE_URL_TEMPLATE, CHROMEDRIVER_PATH, CHROME_ARGS,
-    PAGINATION_DELAY, REQUEST_TIMEOUT
+    REQUEST_TIMEOUT, LISTING_CONCURRENCY,
+    PIPELINE_MODE, LINK_QUEUE_SIZE, STREAM_PARSE, STREAM_CHUNK_SIZE,
+    USE_PAGE_STATE, PARSE_PROCESSES, INCREMENTAL_MODE, CHECKPOINT_ENABLED,
+    ADAPTIVE_CONCURRENCY, ADAPTIVE_MAX_CONCURRENCY, SHUTDOWN_GRACE
 )
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -26,183 +47,267 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class AsyncCarDetailPage:
     """Асинхронный Page Object для деталей объявления"""
     
-    TITLE = '//h1[@class="CardHead__title"]/text()'
-    YEAR = '(//a[@class="Link Link_color_black"]/text())[2]'
-    MILEAGE = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[1]'
-    OWNERS = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[2]'
-    CONDITION = '//span[contains(text(), "Исправн") or contains(text(), "Деформ") or contains(text(), "Битые") or contains(text(), "Перекр")]/text()'
-    TRANSMISSION = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[2]'
-    ENGINE = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[1]'
-    DATE_POSTED = '//div[contains(@class, "CardHead__creationDate")]/text()'
-    VIEWS = '//div[contains(@class, "CardHead__views")]/text()'
-    PRICE = '//span[@class="OfferPriceCaption__price"]/text()'
-    
-    def __init__(self, car_url):
+    # ✅ XPath-цепочки полей описаны в config.CAR_DETAIL_FIELDS и скомпилированы один раз
+    PLAN = DEFAULT_PLAN
+    EXTRACTOR = get_extractor()  # ✅ get_car_data() - один проход по DOM
+    STATE = DEFAULT_STATE_EXTRACTOR  # ✅ JSON-состояние страницы вместо DOM
+    
+    def __init__(self, car_url, raw=False, limiter=None):
+        """
+        Args:
+            car_url (str): URL объявления
+            raw (bool): Только скачать байты в self.content (разбор - в ParsePool)
+            limiter (AdaptiveLimiter): Получает задержки и сигналы перегрузки
+        """
         self.car_url = car_url
+        self.raw = raw
+        self.limiter = limiter
+        self.content = None
         self.tree = None
+        self.record = None  # ✅ Заполняется сразу при потоковом разборе или из JSON
+        self.bytes_read = 0
+        self.partial = False  # ✅ Тело дочитано только до JSON-состояния
+        self.retry_reason = None  # ✅ Причина неудачи, если запрос стоит повторить
+        self.retry_after = None
+    
+    def _report(self, outcome, started=None):
+        """Сообщить контроллеру параллельности результат запроса
+        
+        Args:
+            outcome (str): 'ok', 'error' или причина перегрузки
+                ('throttled', 'timeout', 'challenge')
+            started (float): time.monotonic() начала запроса (для 'ok')
+        """
+        if self.limiter is None:
+            return
+        if outcome == 'ok':
+            self.limiter.on_success(time.monotonic() - started)
+        elif outcome == 'error':
+            self.limiter.on_error()
+        else:
+            self.limiter.on_congestion(outcome)
+    
+    async def _read_streaming(self, response):
+        """Читать тело кусками и закрыть соединение, как только данные получены
+        
+        Куски копятся в буфер (он уходит в HTTP-кэш). При USE_PAGE_STATE
+        чтение обрывается, как только из JSON-состояния получилась запись;
+        блок без ``card`` раннюю остановку не вызывает, и DOM строится по
+        полному телу. В режиме raw JSON здесь не декодируется (это делает
+        ParsePool): чтение обрывается, когда блок получен целиком и в нём
+        есть ключ ``card``. Без USE_PAGE_STATE куски сразу идут в
+        StreamingExtraction (STREAM_PARSE, кроме raw), и чтение обрывается,
+        когда DOM-разбор нашёл обязательные поля. Оборванное тело помечается
+        ``self.partial``.
+        
+        Returns:
+            bytes: Прочитанная часть тела
+        """
+        content = bytearray()
+        # ✅ Параллельный DOM-разбор рядом с JSON-состоянием не нужен: состояние - в конце
+        # страницы, и pull-парсер прошёл бы её целиком ради отбрасываемого результата
+        streaming = STREAM_PARSE and not self.raw and not USE_PAGE_STATE
+        stream = StreamingExtraction(encoding=response.charset) if streaming else None
+        # ✅ Сканер смотрит только новые байты, а не весь буфер на каждом куске
+        scanner = self.STATE.scanner() if USE_PAGE_STATE else None
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            content.extend(chunk)
+            raw = scanner.feed(content) if scanner is not None else None
+            if raw is not None and self.raw:
+                scanner = None
+                # ✅ JSON декодирует ParsePool; здесь - только байтовая проверка карточки в блоке
+                if self.STATE.has_card(raw):
+                    self.partial = True
+                    break
+            elif raw is not None:
+                scanner = None  # ✅ Блок получен целиком - проверяем его один раз
+                with metrics.timed('extract'):
+                    self.record = self.STATE.decode(raw, self.car_url)
+                if self.record is not None:
+                    self.partial = True
+                    break
+            if stream is not None and stream.feed(chunk):
+                # ✅ Все поля найдены в DOM - остаток страницы (скрипты, футер) не качаем
+                self.partial = True
+                break
+        
+        if self.partial:
+            response.close()
+        if stream is not None and len(content) > 100:
+            with metrics.timed('parse'):
+                self.tree, self.record = stream.finish(self.car_url)
+        
+        content = bytes(content)
+        self.bytes_read = len(content)
+        return content
     
-    async def _load_page(self, session, retry=0, max_retries=3):
-        """Загрузить страницу асинхронно с повторными попытками"""
+    def _accept(self, content):
+        """Принять тело ответа: сохранить байты (raw) или разобрать JSON-состояние / DOM"""
+        if self.raw:
+            self.content = content
+            return True
+        if self.record is not None:
+            return True  # ✅ Уже разобрано по ходу загрузки
+        if USE_PAGE_STATE:
+            with metrics.timed('extract'):
+                self.record = self.STATE.extract(content, self.car_url)
+        if self.record is None:
+            with metrics.timed('parse'):
+                self.tree = html.fromstring(content)
+        return True
+    
+    async def _read_body(self, response):
+        """Прочитать тело: потоково (с ранней остановкой) или целиком"""
+        if STREAM_PARSE or USE_PAGE_STATE:
+            return await self._read_streaming(response)
+        content = await response.read()
+        self.bytes_read = len(content)
+        return content
+    
+    async def _load_page(self, session):
+        """Загрузить страницу асинхронно (через HTTP-кэш)
+        
+        Повторов здесь нет: при временной ошибке заполняются ``retry_reason``
+        и ``retry_after``, а повтор планирует RetryScheduler парсера - слот
+        параллельности освобождается сразу. Обращения к HTTP-кэшу (SQLite,
+        распаковка и сжатие zlib) идут в пуле потоков, а не в event loop.
+        """
+        cache = get_http_cache()
         try:
+            entry = None
+            if cache is not None:
+                entry = await asyncio.to_thread(cache.lookup, self.car_url, USE_PAGE_STATE)
+            if entry is not None and entry.fresh:
+                return self._accept(entry.body)
+            
+            await throttle_async(self.car_url)  # ✅ Общий лимит запросов к сайту
+            started = time.monotonic()
             async with session.get(
                 self.car_url, 
                 timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=3),
                 ssl=False,
                 allow_redirects=True,
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+                    **HttpCache.conditional_headers(entry)
+                }
             ) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    if content and len(content) > 100:  # ✅ Проверяем, не пустой ли ответ
-                        self.tree = html.fromstring(content)
-                        return True
-                elif response.status == 429 and retry < max_retries:
-                    # ✅ Too Many Requests - повторить позже
-                    await asyncio.sleep(0.5)
-                    return await self._load_page(session, retry + 1, max_retries)
+                if response.status != 200:
+                    metrics.request('card', response.status, time.monotonic() - started)
+                if response.status == 304 and entry is not None:
+                    # ✅ Страница не изменилась - берём тело из кэша
+                    self._report('ok', started)
+                    await asyncio.to_thread(cache.revalidated, self.car_url, response.headers)
+                    return self._accept(entry.body)
+                elif response.status == 200:
+                    if 'captcha' in str(response.url):
+                        metrics.request('card', 'challenge', time.monotonic() - started)
+                        self._report('challenge')
+                        self.retry_reason = 'challenge'
+                        return False
+                    with metrics.timed('download'):  # ✅ Включая разбор по ходу загрузки
+                        content = await self._read_body(response)
+                    metrics.request('card', response.status, time.monotonic() - started)
+                    if HttpListingPage.is_challenge(content, response.url):
+                        self._report('challenge')
+                        self.retry_reason = 'challenge'
+                        return False
+                    if len(content) > 100:  # ✅ Проверяем, не пустой ли ответ
+                        self._report('ok', started)
+                        if cache is not None:
+                            # ✅ Оборванное тело помечается: полному DOM-разбору оно не отдаётся
+                            await asyncio.to_thread(
+                                cache.store, self.car_url, content, response.headers, self.partial
+                            )
+                        return self._accept(content)
+                    self._report('error')
+                elif response.status in (429, 503):
+                    # ✅ Too Many Requests - сигнал снизить параллельность и повторить позже
+                    self._report('throttled')
+                    self.retry_reason = 'throttled'
+                    self.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if self.retry_after is not None:
+                        backoff(self.car_url, self.retry_after)  # ✅ Пауза для всех запросов к хосту
+                elif response.status >= 500:
+                    self._report('error')
+                    self.retry_reason = 'server'
+                else:
+                    self._report('error')
         except asyncio.TimeoutError:
-            if retry < max_retries:
-                await asyncio.sleep(0.2)
-                return await self._load_page(session, retry + 1, max_retries)
+            metrics.error('request', 'timeout')
+            self._report('timeout')
+            self.retry_reason = 'timeout'
         except Exception as e:
-            if retry < max_retries:
-                await asyncio.sleep(0.1)
-                return await self._load_page(session, retry + 1, max_retries)
+            metrics.error('request', type(e).__name__)
+            self._report('error')
+            self.retry_reason = 'network'
         return False
     
-    def _get_text(self, xpath, index=0):
-        """Получить текст по XPath"""
-        if self.tree is None:
-            return "N/A"
-        try:
-            result = self.tree.xpath(xpath)
-            if result and len(result) > index:
-                text = str(result[index]).strip()
-                return text if text else "N/A"
-        except:
-            pass
-        return "N/A"
+    def _field(self, name):
+        """Значение поля: из уже готовой записи, если она есть, иначе из DOM"""
+        if self.record is not None:
+            return self.record.value(name)
+        return CarRecord.normalize(name, self.PLAN.extract_field(self.tree, name))
     
     def get_date_posted(self):
         """Получить дату объявления"""
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            date_patterns = [
-                '//div[contains(@class, "CardHead__creationDate")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__creationDate"]/text()',
-            ]
-            
-            for xpath in date_patterns:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        for r in result:
-                            text = str(r).strip()
-                            if text and len(text) > 3:
-                                return text
-                except:
-                    pass
-            
-            return "N/A"
-        except:
-            return "N/A"
+        return self._field('date_posted')
     
     def get_views(self):
         """Получить количество просмотров"""
-        try:
-            if self.tree is None:
-                return "0"
-            
-            view_patterns = [
-                '//div[contains(@class, "CardHead__views")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__views"]/text()',
-            ]
-            
-            for xpath in view_patterns:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        for r in result:
-                            text = str(r).strip()
-                            numbers = ''.join(filter(str.isdigit, text))
-                            if numbers:
-                                return numbers
-                except:
-                    pass
-            
-            return "0"
-        except:
-            return "0"
+        return self._field('views')
     
     def get_condition(self):
         """Получить состояние"""
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            conditions = [
-                '//span[contains(text(), "Исправное")]/text()',
-                '//span[contains(text(), "Деформированное")]/text()',
-                '//span[contains(text(), "Битые окна")]/text()',
-                '//span[contains(text(), "Перекрашено")]/text()',
-                '//span[contains(., "Исправн") or contains(., "Деформ") or contains(., "Битые") or contains(., "Перекр")]/text()',
-            ]
-            
-            for xpath in conditions:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        text = str(result[0]).strip()
-                        if text and text != "N/A":
-                            return text
-                except:
-                    pass
-            
-            return "N/A"
-        except:
-            return "N/A"
+        return self._field('condition')
     
     def get_price(self):
         """Получить цену"""
-        try:
-            price_text = self._get_text(self.PRICE)
-            if price_text != "N/A":
-                numbers = ''.join(filter(str.isdigit, price_text))
-                if numbers:
-                    return int(numbers)
-        except:
-            pass
-        return 0
+        return self._field('price')
     
     def get_car_data(self):
         """Получить все данные"""
-        return {
-            'Марка': self._get_text(self.TITLE),
-            'Год выпуска': self._get_text(self.YEAR),
-            'Пробег': self._get_text(self.MILEAGE),
-            'Владельцы': self._get_text(self.OWNERS),
-            'Состояние': self.get_condition(),
-            'Коробка': self._get_text(self.TRANSMISSION),
-            'Двигатель': self._get_text(self.ENGINE),
-            'Дата объявления': self.get_date_posted(),
-            'Количество просмотров': self.get_views(),
-            'Цена': self.get_price(),
-            'URL': self.car_url
-        }
+        if self.record is not None:
+            return self.record
+        with metrics.timed('extract'):
+            return self.EXTRACTOR.extract(self.tree, self.car_url)
 
 
 class AsyncAutoRuParser:
     """Асинхронный парсер auto.ru - ВСЕ объявления"""
     
-    def __init__(self, max_price=MAX_PRICE, concurrent_requests=NUM_THREADS * 2):
-        self.base_url = BASE_URL_TEMPLATE
+    def __init__(self, max_price=MAX_PRICE, concurrent_requests=NUM_THREADS * 2,
+                 listing_concurrency=LISTING_CONCURRENCY, pipeline=PIPELINE_MODE, sink=None,
+                 parse_processes=PARSE_PROCESSES, incremental=INCREMENTAL_MODE, resume=False,
+                 adaptive=ADAPTIVE_CONCURRENCY):
+        self.base_url = search_url(BASE_URL_TEMPLATE, max_price)  # ✅ price_to из max_price
         self.max_price = max_price
-        self.cars = []
+        self.http_listing = create_listing(self.base_url)  # ✅ Выдача по срезам цены (QUERY_PLANNER)
+        
+        # ✅ Контрольная точка: при продолжении результаты дописываются в тот же файл
+        self.checkpoint = Checkpoint() if CHECKPOINT_ENABLED or resume else None
+        resumed = self.checkpoint is not None and self.checkpoint.start(self.base_url, resume)
+        self.sink = sink if sink is not None else create_sink(append=resumed)  # ✅ Потоковая запись результатов
         self.driver = None
         self.concurrent_requests = concurrent_requests
-        self.stats = {'processed': 0, 'errors': 0, 'skipped': 0}
+        self.listing_concurrency = listing_concurrency
+        # ✅ Лимит одновременных запросов к объявлениям (фиксированный, если adaptive=False)
+        self.limiter = AdaptiveLimiter(concurrent_requests) if adaptive else AdaptiveLimiter(
+            concurrent_requests, min_limit=concurrent_requests, max_limit=concurrent_requests
+        )
+        self.pipeline = pipeline
+        self.parse_processes = parse_processes
+        self.parse_pool = None  # ✅ Создаётся на время run_async, если parse_processes > 0
+        self.stats = {'processed': 0, 'errors': 0, 'skipped': 0, 'retried': 0}
+        self.first_record = None  # ✅ Через сколько секунд пришла первая запись
+        self.retry = RetryScheduler()  # ✅ Отложенные повторы, слот не держится во время ожидания
+        self.seen_store = SeenStore() if incremental else None  # ✅ Инкрементальный режим
+        self.index = ListingIndex()  # ✅ Дедупликация по ID объявления
+    
+    @property
+    def cars(self):
+        """Все собранные записи (читаются из потокового хранилища)"""
+        return self.sink.read_records()
     
     def setup_driver(self):
         """Инициализировать Selenium"""
@@ -220,32 +325,27 @@ class AsyncAutoRuParser:
             print(f"❌ Ошибка: {e}")
             raise
     
-    def collect_all_links(self, max_pages=MAX_PAGES):
-        """Собрать ВСЕ ссылки"""
-        listing_page = ListingPage(self.driver, self.base_url)
-        
-        print(f"🔍 Определяю количество страниц...")
-        total_pages = listing_page.get_total_pages()
-        
-        if max_pages:
-            total_pages = min(total_pages, max_pages)
-        
-        print(f"📊 Будут собраны ссылки со ВСЕХ {total_pages} страниц\n")
-        
-        all_links = []
+    def get_listing_page(self):
+        """Получить Selenium ListingPage (браузер запускается только при необходимости)"""
+        if self.driver is None:
+            self.setup_driver()
+        return ListingPage(self.driver, self.base_url, page_url=self.http_listing.get_page_url)
+    
+    def collect_with_selenium(self, pages):
+        """Добрать через браузер страницы, которые не удалось разобрать по HTTP"""
+        listing_page = self.get_listing_page()
+        links_by_page = {}
         failed_pages = []
         
-        for page in range(1, total_pages + 1):
+        for page in pages:
             try:
-                print(f"📄 Страница {page}/{total_pages}...", end=' ', flush=True)
+                print(f"📄 Страница {page} (браузер)...", end=' ', flush=True)
                 listing_page.open_page(page)
                 
-                links = listing_page.get_car_links()
-                all_links.extend(links)
-                print(f"✅ {len(links)} ссылок (всего: {len(all_links)})")
-                
-                if PAGINATION_DELAY > 0:
-                    time.sleep(PAGINATION_DELAY)
+                links_by_page[page] = listing_page.get_car_links()
+                print(f"✅ {len(links_by_page[page])} ссылок")
+                if self.checkpoint is not None:
+                    self.checkpoint.save_page(page, links_by_page[page])
             
             except Exception as e:
                 print(f"⚠️  Ошибка: {e}")
@@ -254,45 +354,111 @@ class AsyncAutoRuParser:
         if failed_pages:
             print(f"\n⚠️  Ошибки на страницах: {failed_pages}")
         
-        return all_links
+        return links_by_page
     
-    async def parse_car_async(self, session, car_url, semaphore):
-        """Парсить объявление асинхронно"""
-        async with semaphore:
-            try:
-                detail_page = AsyncCarDetailPage(car_url)
-                if not await detail_page._load_page(session):
+    async def get_total_pages(self, session, http_listing, max_pages=MAX_PAGES):
+        """Количество страниц выдачи (из контрольной точки или с сайта)"""
+        if self.checkpoint is not None and self.checkpoint.total_pages is not None:
+            http_listing.load_plan(self.checkpoint.plan)
+            return self.checkpoint.total_pages
+        
+        print(f"🔍 Определяю количество страниц...")
+        total_pages = await http_listing.get_total_pages_async(session)
+        if total_pages is None:
+            total_pages = await asyncio.to_thread(lambda: self.get_listing_page().get_total_pages())
+        
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
+        if self.checkpoint is not None:
+            self.checkpoint.set_total_pages(total_pages, http_listing.plan_state())
+        return total_pages
+    
+    def get_pages_to_collect(self, total_pages):
+        """Номера страниц, которые ещё нужно собрать"""
+        if self.checkpoint is not None:
+            return self.checkpoint.remaining_pages(total_pages)
+        return list(range(1, total_pages + 1))
+    
+    async def collect_all_links(self, session, max_pages=MAX_PAGES):
+        """Собрать ВСЕ ссылки (aiohttp + lxml, Selenium как запасной вариант)"""
+        http_listing = self.http_listing
+        
+        total_pages = await self.get_total_pages(session, http_listing, max_pages)
+        pages = self.get_pages_to_collect(total_pages)
+        
+        print(f"📊 Будут собраны ссылки с {len(pages)} из {total_pages} страниц\n")
+        
+        links_by_page, fallback_pages = await http_listing.collect_async(
+            session, pages, self.listing_concurrency
+        )
+        print(f"✅ По HTTP: {len(links_by_page)} страниц | через браузер: {len(fallback_pages)}")
+        
+        if self.checkpoint is not None:
+            self.checkpoint.save_pages(links_by_page)
+            self.checkpoint.fail_pages(fallback_pages)
+        
+        if fallback_pages:
+            # ✅ Selenium блокирующий - уводим его из event loop
+            links_by_page.update(await asyncio.to_thread(self.collect_with_selenium, fallback_pages))
+        
+        if self.checkpoint is not None:
+            return self.checkpoint.frontier()  # ✅ Включая страницы, собранные в прошлом запуске
+        return HttpListingPage.merge_links(links_by_page)
+    
+    async def parse_car(self, session, car_url):
+        """Загрузить и распарсить одно объявление"""
+        try:
+            detail_page = AsyncCarDetailPage(car_url, raw=self.parse_pool is not None, limiter=self.limiter)
+            async with self.limiter:  # ✅ Слот занят только на время сетевого запроса
+                loaded = await detail_page._load_page(session)
+            if not loaded:
+                reason = detail_page.retry_reason
+                if reason is not None and self.retry.schedule(car_url, reason, detail_page.retry_after):
+                    self.stats['retried'] += 1
+                else:
+                    self.stats['errors'] += 1
+                return
+            self.retry.done(car_url)
+            
+            if detail_page.record is not None:
+                car_data = detail_page.record  # ✅ Уже извлечено из JSON-состояния при чтении
+            elif self.parse_pool is not None:
+                # ✅ lxml и извлечение - в отдельном процессе, loop свободен для сети
+                car_data = await self.parse_pool.parse(detail_page.content, car_url)
+                if car_data is None:
                     self.stats['errors'] += 1
                     return
-                
+            else:
                 car_data = detail_page.get_car_data()
-                
-                # ✅ Принимаем ВСЕ объявления
-                self.cars.append(car_data)
-                self.stats['processed'] += 1
-                
-                if self.stats['processed'] % 100 == 0:
-                    success_rate = (self.stats['processed'] / (self.stats['processed'] + self.stats['errors'])) * 100 if (self.stats['processed'] + self.stats['errors']) > 0 else 0
-                    print(f"  ⚡ Обработано: {self.stats['processed']} | Успех: {success_rate:.1f}%")
             
-            except Exception:
-                self.stats['errors'] += 1
-    
-    async def parse_all_async(self, all_links):
-        """Парсить все объявления асинхронно"""
-        print(f"\n{'='*60}")
-        print(f"📊 Всего собрано ссылок: {len(all_links)}")
-        print(f"⚡ Одновременных запросов: {self.concurrent_requests}")
-        print(f"{'='*60}\n")
-        
-        start_parsing = time.time()
-        
-        semaphore = asyncio.Semaphore(self.concurrent_requests)
+            # ✅ Принимаем ВСЕ объявления
+            self.sink.add(car_data)
+            self.stats['processed'] += 1
+            self.index.mark_fetched(car_url)
+            if self.seen_store is not None:
+                self.seen_store.mark_fetched(car_url)
+            
+            if self.stats['processed'] % 100 == 0:
+                success_rate = (self.stats['processed'] / (self.stats['processed'] + self.stats['errors'])) * 100 if (self.stats['processed'] + self.stats['errors']) > 0 else 0
+                print(f"  ⚡ Обработано: {self.stats['processed']} | Успех: {success_rate:.1f}% | "
+                      f"Параллельно: {self.limiter.current}")
         
+        except Exception:
+            self.stats['errors'] += 1
+    
+    def describe_concurrency(self):
+        """Параллельность объявлений для вывода"""
+        if self.limiter.adaptive:
+            return (f"адаптивно, старт {self.limiter.current} "
+                    f"({self.limiter.min_limit}-{self.limiter.max_limit})")
+        return str(self.limiter.current)
+    
+    def create_session(self):
+        """Создать aiohttp-сессию с настроенным пулом соединений"""
         # ✅ УЛУЧШЕНО: Лучшая конфигурация коннектора
         connector = aiohttp.TCPConnector(
-            limit=self.concurrent_requests,
-            limit_per_host=5,  # ✅ Снижаем нагрузку на хост
+            limit=self.limiter.max_limit + self.listing_concurrency,
+            limit_per_host=self.limiter.max_limit + self.listing_concurrency,  # ✅ Нагрузку на хост держит limiter
             ttl_dns_cache=300,
             enable_cleanup_closed=True,
             keepalive_timeout=30,
@@ -301,62 +467,298 @@ class AsyncAutoRuParser:
         )
         
         timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=3, sock_read=3)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=metrics.trace_configs())
+    
+    async def parse_all_async(self, session, all_links):
+        """Парсить все объявления пулом воркеров
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            tasks = [
-                self.parse_car_async(session, url, semaphore)
-                for url in all_links
-            ]
-            
-            await asyncio.gather(*tasks, return_exceptions=True)
+        Ссылки подаются в ограниченную очередь, которую разбирает
+        фиксированное число воркеров - память зависит от числа воркеров,
+        а не от числа ссылок.
+        """
+        print(f"\n{'='*60}")
+        print(f"📊 Всего собрано ссылок: {len(all_links)}")
+        print(f"⚡ Одновременных запросов: {self.describe_concurrency()}")
+        print(f"{'='*60}\n")
+        
+        start_parsing = time.time()
+        link_queue = asyncio.Queue(maxsize=LINK_QUEUE_SIZE)
+        workers = self.start_detail_workers(session, link_queue, start_parsing)
+        retry_task = asyncio.create_task(self.feed_retries(link_queue))
+        
+        try:
+            for url in all_links:
+                await link_queue.put(url)  # ✅ Ждёт, если очередь заполнена (backpressure)
+            await self.finish_detail_workers(link_queue, workers)
+        
+        except asyncio.CancelledError:
+            await self.abort_detail_workers(link_queue, workers)
+            raise
+        
+        finally:
+            retry_task.cancel()
+            for task in workers:
+                task.cancel()
         
         elapsed_parsing = time.time() - start_parsing
         print(f"\n⚡ Асинхронный парсинг занял: {elapsed_parsing:.1f} сек")
         return elapsed_parsing
     
+    # ==================== DETAIL WORKERS ====================
+    def start_detail_workers(self, session, link_queue, start_parsing):
+        """Запустить пул воркеров деталей
+        
+        Воркеров - по верхней границе лимита, реально параллельно работает
+        ``limiter.current``.
+        
+        Returns:
+            list: Задачи воркеров
+        """
+        return [
+            asyncio.create_task(self.detail_worker(session, link_queue, start_parsing))
+            for _ in range(self.limiter.max_limit)
+        ]
+    
+    async def detail_worker(self, session, link_queue, start_parsing):
+        """Брать ссылки из очереди, пока не придёт None"""
+        while True:
+            car_url = await link_queue.get()
+            try:
+                if car_url is None:
+                    return
+                await self.parse_car(session, car_url)
+                if self.first_record is None and self.sink.count:
+                    self.first_record = time.time() - start_parsing
+                    print(f"  🚀 Первая запись через {self.first_record:.1f} сек")
+            finally:
+                link_queue.task_done()
+    
+    async def feed_retries(self, link_queue):
+        """Возвращать в очередь ссылок повторы, время которых подошло"""
+        while True:
+            delay = self.retry.next_delay()
+            await asyncio.sleep(0.25 if delay is None else min(delay, 0.25))
+            for car_url in self.retry.pop_due():
+                await link_queue.put(car_url)
+    
+    async def finish_detail_workers(self, link_queue, workers):
+        """Дождаться, пока очередь разобрана и повторов не осталось, и остановить воркеров"""
+        while True:
+            await link_queue.join()
+            if not self.retry.pending:
+                break
+            await asyncio.sleep(self.retry.next_delay())
+        
+        for _ in workers:
+            await link_queue.put(None)
+        await asyncio.gather(*workers)
+    
+    async def abort_detail_workers(self, link_queue, workers):
+        """Ctrl-C: новые ссылки не брать, текущим запросам дать завершиться
+        
+        Записи, которые успели скачаться за SHUTDOWN_GRACE секунд, попадают
+        в хранилище (и сбрасываются на диск в parse_all_pages), остальные
+        ссылки останутся в контрольной точке для --resume.
+        """
+        print(f"\n⏹️  Остановка: дожидаюсь текущих запросов (до {SHUTDOWN_GRACE:g} сек)...")
+        while True:
+            try:
+                link_queue.get_nowait()
+                link_queue.task_done()
+            except asyncio.QueueEmpty:
+                break
+        for _ in workers:
+            link_queue.put_nowait(None)
+        await asyncio.wait(workers, timeout=SHUTDOWN_GRACE)
+    
+    async def run_async(self, max_pages=MAX_PAGES):
+        """Собрать ссылки и распарсить объявления в одной aiohttp-сессии"""
+        if self.parse_processes > 0:
+            self.parse_pool = ParsePool(processes=self.parse_processes)
+            print(f"🧮 Разбор страниц в {self.parse_processes} процессах")
+        
+        try:
+            async with self.create_session() as session:
+                if self.pipeline:
+                    await self.run_pipeline(session, max_pages)
+                else:
+                    all_links = self.index.filter(await self.collect_all_links(session, max_pages))
+                    if self.checkpoint is not None:
+                        # ✅ Пропускаем объявления, обработанные до прерывания
+                        all_links = self.checkpoint.pending(all_links, self.checkpoint.completed_urls(self.sink))
+                    if self.seen_store is not None:
+                        all_links = self.seen_store.observe(all_links)
+                    await self.parse_all_async(session, all_links)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.print_stats()
+                self.parse_pool.close()
+                self.parse_pool = None
+    
+    # ==================== PIPELINE ====================
+    async def run_pipeline(self, session, max_pages=MAX_PAGES):
+        """Конвейер: страницы выдачи -> очередь ссылок -> парсинг объявлений
+        
+        Листинг и детали работают одновременно: каждая собранная ссылка
+        сразу уходит в ограниченную очередь, которую разбирают воркеры
+        деталей. Если очередь заполнена, сбор страниц ждёт (backpressure).
+        У каждой стадии своя параллельность: ``listing_concurrency`` и
+        ``concurrent_requests``.
+        """
+        http_listing = self.http_listing
+        
+        total_pages = await self.get_total_pages(session, http_listing, max_pages)
+        pages = self.get_pages_to_collect(total_pages)
+        
+        # ✅ При продолжении: ссылки уже собранных страниц, ещё не обработанные
+        completed, resumed_links = set(), []
+        if self.checkpoint is not None:
+            completed = self.checkpoint.completed_urls(self.sink)
+            resumed_links = self.checkpoint.pending(self.index.filter(self.checkpoint.frontier()), completed)
+            if self.seen_store is not None:
+                resumed_links = self.seen_store.observe(resumed_links)
+        
+        print(f"\n{'='*60}")
+        print(f"🔀 КОНВЕЙЕР: {len(pages)} из {total_pages} страниц")
+        print(f"📄 Параллельно страниц: {self.listing_concurrency}")
+        print(f"⚡ Параллельно объявлений: {self.describe_concurrency()}")
+        print(f"{'='*60}\n")
+        
+        start_parsing = time.time()
+        page_queue = asyncio.Queue()
+        link_queue = asyncio.Queue(maxsize=LINK_QUEUE_SIZE)
+        fallback_pages = []
+        pipeline_stats = {'pages': 0, 'links': 0}
+        
+        for page in pages:
+            page_queue.put_nowait(page)
+        
+        async def listing_worker():
+            while True:
+                try:
+                    page = page_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                links = await http_listing.fetch_page_async(session, page)
+                if links is None:
+                    fallback_pages.append(page)
+                    continue
+                pipeline_stats['pages'] += 1
+                if self.checkpoint is not None:
+                    self.checkpoint.save_page(page, links)
+                links = self.index.filter(links)  # ✅ Объявление уже встречалось на другой странице
+                if self.checkpoint is not None:
+                    links = self.checkpoint.pending(links, completed)
+                if self.seen_store is not None:
+                    # ✅ В очередь идут только новые и устаревшие объявления
+                    links = self.seen_store.observe(links)
+                for link in links:
+                    await link_queue.put(link)
+                pipeline_stats['links'] += len(links)
+        
+        detail_tasks = self.start_detail_workers(session, link_queue, start_parsing)
+        retry_task = asyncio.create_task(self.feed_retries(link_queue))
+        
+        try:
+            for link in resumed_links:
+                await link_queue.put(link)
+            pipeline_stats['links'] += len(resumed_links)
+            
+            await asyncio.gather(*(listing_worker() for _ in range(self.listing_concurrency)))
+            print(f"✅ По HTTP: {pipeline_stats['pages']} страниц | через браузер: {len(fallback_pages)}")
+            
+            if self.checkpoint is not None:
+                self.checkpoint.fail_pages(fallback_pages)
+            
+            if fallback_pages:
+                # ✅ Selenium блокирующий - уводим его из event loop
+                links_by_page = await asyncio.to_thread(self.collect_with_selenium, sorted(fallback_pages))
+                for links in links_by_page.values():
+                    links = self.index.filter(links)
+                    if self.checkpoint is not None:
+                        links = self.checkpoint.pending(links, completed)
+                    if self.seen_store is not None:
+                        links = self.seen_store.observe(links)
+                    for link in links:
+                        await link_queue.put(link)
+                    pipeline_stats['links'] += len(links)
+            
+            print(f"📊 Всего собрано ссылок: {pipeline_stats['links']}")
+            await self.finish_detail_workers(link_queue, detail_tasks)
+        
+        except asyncio.CancelledError:
+            await self.abort_detail_workers(link_queue, detail_tasks)
+            raise
+        
+        finally:
+            retry_task.cancel()
+            for task in detail_tasks:
+                task.cancel()
+        
+        elapsed_parsing = time.time() - start_parsing
+        print(f"\n⚡ Конвейер занял: {elapsed_parsing:.1f} сек")
+        return elapsed_parsing
+    
     def parse_all_pages(self, max_pages=MAX_PAGES):
         """Основной метод парсинга"""
-        self.setup_driver()
-        
+        completed = False
+        metrics.start_server()  # ✅ /metrics, если задан METRICS_PORT
         try:
-            all_links = self.collect_all_links(max_pages)
-            asyncio.run(self.parse_all_async(all_links))
+            if self.seen_store is not None:
+                self.seen_store.begin_run()
+            asyncio.run(self.run_async(max_pages))
+            completed = True
         
         except KeyboardInterrupt:
             print("\n\n⚠️  Парсинг прерван пользователем")
         
         finally:
-            self.driver.quit()
-            print("🔴 Browser закрыт")
+            self.sink.close()  # ✅ Сбрасываем буфер даже при ошибке
+            self.index.close()
+            self.index.print_stats()
+            if self.seen_store is not None:
+                self.seen_store.flush()  # ✅ Отметки о скачивании пишутся пачками
+                if completed and not max_pages:
+                    self.seen_store.finish_run()  # ✅ Пометить снятые с продажи
+                self.seen_store.print_stats()
+            if self.limiter.adaptive:
+                self.limiter.print_stats()
+            if self.checkpoint is not None:
+                if completed:
+                    self.checkpoint.finish()
+                else:
+                    print("💾 Прогресс сохранён - продолжить: python auto_parser_async.py --resume")
+            cache = get_http_cache()
+            if cache is not None:
+                cache.flush()  # ✅ Отложенные LRU-отметки попаданий
+                cache.print_stats()
+            rate_limiter = get_rate_limiter()
+            if rate_limiter is not None:
+                rate_limiter.print_stats()
+            metrics.print_summary()
+            self.retry.print_stats()
+            if self.driver is not None:
+                self.driver.quit()
+                self.driver = None
+                print("🔴 Browser закрыт")
         
-        return self.cars
+        return self.sink
     
     def save_to_excel(self, filename=OUTPUT_FILENAME):
         """Сохранить ВСЕ данные"""
-        if not self.cars:
+        if not self.sink.count:
             print("❌ Нет данных для сохранения")
             return
         
         start_save = time.time()
-        print(f"\n⏳ Сохраняю {len(self.cars)} объявлений...")
+        print(f"\n⏳ Сохраняю {self.sink.count} объявлений...")
         
-        df = pd.DataFrame(self.cars)
-        
-        # ✅ Очистка данных
-        try:
-            df['Дата объявления'] = pd.to_datetime(df['Дата объявления'], 
-                                                   format='%d %B %Y', 
-                                                   errors='coerce')
-            df = df.sort_values('Дата объявления', ascending=False, na_position='last')
-            df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
-        except:
-            pass
-        
-        # ✅ Конвертируем просмотры в числа
-        try:
-            df['Количество просмотров'] = pd.to_numeric(df['Количество просмотров'], errors='coerce').fillna(0).astype(int)
-        except:
-            pass
+        # ✅ Читаем уже сброшенные на диск записи
+        df = self.sink.read_dataframe()
+        # ✅ Векторная нормализация: даты «12 октября» / «вчера», пробег, двигатель
+        df = sort_by_date(normalize_frame(df))
+        df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
         
         df = df.drop('URL', axis=1)
         df.to_excel(filename, index=False, engine='openpyxl')
@@ -381,11 +783,17 @@ class AsyncAutoRuParser:
 
 def main():
     """Главная функция"""
+    arg_parser = argparse.ArgumentParser(description="Асинхронный парсер auto.ru")
+    arg_parser.add_argument('--resume', action='store_true', help="Продолжить прерванный запуск")
+    profiling.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    
     total_start = time.time()
     
     parser = AsyncAutoRuParser(
         max_price=MAX_PRICE, 
-        concurrent_requests=NUM_THREADS * 2  # ✅ Уменьшено с 3x до 2x
+        concurrent_requests=NUM_THREADS * 2,  # ✅ Уменьшено с 3x до 2x
+        resume=args.resume
     )
     
     print("\n" + "="*60)
@@ -393,11 +801,15 @@ def main():
     print("   НАДЁЖНАЯ ВЕРСИЯ С ОБРАБОТКОЙ ОШИБОК")
     print("="*60)
     print(f"💰 Максимальная цена: {MAX_PRICE:,} руб")
-    print(f"⚡ Параллельных запросов: {parser.concurrent_requests}")
+    print(f"⚡ Параллельных запросов: {parser.describe_concurrency()}")
     print("="*60)
     
-    parser.parse_all_pages(max_pages=MAX_PAGES)
-    parser.save_to_excel(OUTPUT_FILENAME)
+    with Profiler(args.profile, args.profile_memory, output=OUTPUT_FILENAME) as profiler:
+        with profiler.phase('crawl'):
+            parser.parse_all_pages(max_pages=MAX_PAGES)
+        if EXCEL_EXPORT:
+            with profiler.phase('save'):
+                parser.save_to_excel(OUTPUT_FILENAME)
     
     total_elapsed = time.time() - total_start
     
@@ -405,14 +817,14 @@ def main():
     print(f"✅ ПАРСИНГ УСПЕШНО ЗАВЕРШЁН!")
     print("="*60)
     print(f"⏱️  Общее время: {total_elapsed:.1f} сек")
-    print(f"📊 Всего объявлений в файле: {len(parser.cars)}")
+    print(f"📊 Всего объявлений в файле: {parser.sink.count}")
     
-    if total_elapsed > 0 and len(parser.cars) > 0:
-        speed = len(parser.cars) / total_elapsed
+    if total_elapsed > 0 and parser.sink.count > 0:
+        speed = parser.sink.count / total_elapsed
         print(f"⚡ Скорость парсинга: ~{speed:.1f} объявл/сек 🚀")
     
     print("="*60)
-    print(f"📁 Файл сохранён: {OUTPUT_FILENAME}\n")
+    print(f"📁 Файл сохранён: {OUTPUT_FILENAME if EXCEL_EXPORT else parser.sink.path}\n")
 
 
 if __name__ == "__main__":
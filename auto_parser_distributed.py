@@ -0,0 +1,427 @@
+# auto_parser_distributed.py
+"""
+Распределённый парсер auto.ru: координатор + воркеры
+Координатор делит работу на задания в общей очереди (SQLite),
+воркеры на одной или нескольких машинах берут их в аренду
+"""
+
+import asyncio
+import aiohttp
+import json
+import time
+import os
+import socket
+import subprocess
+import sys
+import argparse
+import requests
+import urllib3
+from selenium import webdriver
+
+from pages.listing_page import ListingPage
+from pages.http_listing_page import HttpListingPage
+from pages.query_planner import create_listing, search_url
+from crawler.jobs import JobStore
+from crawler.sinks import create_sink
+from crawler.normalize import normalize_frame, sort_by_date
+from crawler.concurrency import AdaptiveLimiter
+from crawler.retry import RetryScheduler
+from crawler.http_cache import get_http_cache
+from crawler.rate_limit import get_rate_limiter
+from crawler import metrics, profiling
+from crawler.profiling import Profiler
+from auto_parser_async import AsyncCarDetailPage
+from config import (
+    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME, EXCEL_EXPORT,
+    BASE_URL_TEMPLATE, CHROMEDRIVER_PATH, CHROME_ARGS, REQUEST_TIMEOUT,
+    LISTING_CONCURRENCY, ADAPTIVE_CONCURRENCY,
+    JOBS_PATH, LISTING_JOB_PAGES, DETAIL_JOB_SIZE, JOB_MAX_ATTEMPTS,
+    WORKER_JOB_SLOTS, WORKER_POLL_INTERVAL
+)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class Coordinator:
+    """Координатор: планирует задания и собирает результаты
+
+    1. Определяет количество страниц выдачи и ставит задания ``listing``
+       по ``LISTING_JOB_PAGES`` страниц.
+    2. Собранные воркерами ссылки дедуплицирует и режет на задания
+       ``detail`` по ``DETAIL_JOB_SIZE`` URL. Страницы и объявления,
+       не собранные воркером за все повторы, ставит заново (до
+       ``JOB_MAX_ATTEMPTS`` раз).
+    3. Сданные записи переносит в потоковое хранилище (ResultSink).
+
+    Сам координатор объявления не качает - пропускная способность
+    растёт с числом воркеров.
+    """
+
+    def __init__(self, max_price=MAX_PRICE, store_path=JOBS_PATH, sink=None, resume=False):
+        self.base_url = search_url(BASE_URL_TEMPLATE, max_price)  # ✅ price_to из max_price
+        self.max_price = max_price
+        self.store = JobStore(store_path)
+        self.resumed = resume and self.store.get_meta('base_url') == self.base_url \
+            and self.store.get_meta('state') != 'done'
+        self.sink = sink if sink is not None else create_sink(append=self.resumed)
+        self.http_listing = create_listing(self.base_url)  # ✅ Выдача по срезам цены (QUERY_PLANNER)
+        self.driver = None
+        self.stats = {'processed': 0, 'relisted': 0, 'requeued': 0, 'lost_urls': 0}
+
+    # ==================== PLANNING ====================
+    def get_total_pages(self, max_pages=MAX_PAGES):
+        """Количество страниц выдачи (HTTP, Selenium как запасной вариант)"""
+        print(f"🔍 Определяю количество страниц...")
+        with requests.Session() as session:
+            total_pages = self.http_listing.get_total_pages(session)
+        if total_pages is None:
+            options = webdriver.ChromeOptions()
+            for arg in CHROME_ARGS:
+                options.add_argument(arg)
+            if os.path.exists(CHROMEDRIVER_PATH):
+                self.driver = webdriver.Chrome(CHROMEDRIVER_PATH, options=options)
+            else:
+                self.driver = webdriver.Chrome(options=options)
+            total_pages = ListingPage(self.driver, self.base_url).get_total_pages()
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
+        return total_pages
+
+    def plan(self, max_pages=MAX_PAGES):
+        """Поставить задания 'listing' (или продолжить прошлый запуск)"""
+        if self.resumed:
+            counts = self.store.counts()
+            done = sum(n for (kind, status), n in counts.items() if status == 'done')
+            print(f"♻️  Продолжаю прошлый запуск: {done} заданий уже выполнено")
+            return
+
+        self.store.reset()
+        total_pages = self.get_total_pages(max_pages)
+        pages = list(range(1, total_pages + 1))
+        chunks = [pages[i:i + LISTING_JOB_PAGES] for i in range(0, len(pages), LISTING_JOB_PAGES)]
+        self.store.add_jobs('listing', [{'pages': chunk} for chunk in chunks])
+        self.store.set_meta(base_url=self.base_url, plan=json.dumps(self.http_listing.plan_state()),
+                            state='running', started_at=time.time())
+        print(f"📋 Заданий 'listing': {len(chunks)} ({total_pages} страниц по {LISTING_JOB_PAGES})")
+
+    # ==================== MAIN LOOP ====================
+    def step(self):
+        """Один проход: нарезать ссылки на задания и выгрузить записи"""
+        new_jobs, failed = self.store.split_listings(DETAIL_JOB_SIZE)
+
+        # ✅ Страницы, которые воркер не смог собрать (капча), - отдельным заданием
+        relist = []
+        for payload, pages in failed:
+            attempt = payload.get('attempt', 1)
+            if attempt < JOB_MAX_ATTEMPTS:
+                relist.append({'pages': pages, 'attempt': attempt + 1})
+            else:
+                print(f"⚠️  Страницы не собраны: {pages}")
+        if relist:
+            self.stats['relisted'] += self.store.add_jobs('listing', relist)
+
+        # ✅ Объявления, не скачанные воркером после всех повторов, - новым заданием
+        requeue = []
+        for payload, urls in self.store.collect_failed_details():
+            attempt = payload.get('attempt', 1)
+            if attempt < JOB_MAX_ATTEMPTS:
+                requeue.append({'urls': urls, 'attempt': attempt + 1})
+            else:
+                self.stats['lost_urls'] += len(urls)
+                print(f"⚠️  Объявления не скачаны ({len(urls)}): {urls[0]}{' ...' if len(urls) > 1 else ''}")
+        if requeue:
+            self.stats['requeued'] += self.store.add_jobs('detail', requeue)
+
+        while True:
+            rows = self.store.drain_results()
+            for row in rows:
+                self.sink.add(row)
+            self.stats['processed'] += len(rows)
+            if not rows:
+                break
+        return new_jobs
+
+    def print_progress(self):
+        counts = self.store.counts()
+        parts = []
+        for kind in ('listing', 'detail'):
+            done = counts.get((kind, 'done'), 0)
+            total = sum(n for (k, _), n in counts.items() if k == kind)
+            parts.append(f"{kind} {done}/{total}")
+        failed = sum(n for (_, status), n in counts.items() if status == 'failed')
+        print(f"  🌐 Задания: {' | '.join(parts)} | провалено {failed} | повторно {self.stats['requeued']} | "
+              f"записей {self.stats['processed']} | воркеров {self.store.active_workers()}")
+
+    def run(self, poll_interval=WORKER_POLL_INTERVAL, report_every=10.0):
+        """Ждать, пока воркеры выполнят спланированную работу (после plan())"""
+        completed = False
+        try:
+            last_report = 0.0
+            while True:
+                self.step()
+                if not self.store.unfinished():
+                    self.step()  # ✅ Забрать записи, сданные между проверками
+                    break
+                if time.monotonic() - last_report >= report_every:
+                    self.print_progress()
+                    last_report = time.monotonic()
+                time.sleep(poll_interval)
+
+            self.store.set_meta(state='done')  # ✅ Воркеры увидят и завершатся
+            self.print_progress()
+            completed = True
+
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Координатор остановлен - воркеры продолжат работу")
+            print("💾 Продолжить: python auto_parser_distributed.py coordinator --resume")
+
+        finally:
+            self.sink.close()
+            if self.driver is not None:
+                self.driver.quit()
+                self.driver = None
+
+        return completed
+
+    def save_to_excel(self, filename=OUTPUT_FILENAME):
+        """Сохранить все записи в Excel"""
+        if not self.sink.count:
+            print("❌ Нет данных для сохранения")
+            return
+
+        print(f"\n⏳ Сохраняю {self.sink.count} объявлений...")
+        df = sort_by_date(normalize_frame(self.sink.read_dataframe()))
+        df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
+        df.drop('URL', axis=1).to_excel(filename, index=False, engine='openpyxl')
+        print(f"✅ Данные сохранены в {filename} ({len(df)} записей)")
+
+
+class DistributedWorker:
+    """Воркер: берёт задания из очереди, продлевает аренду, сдаёт результат
+
+    Использует те же компоненты, что и асинхронный парсер:
+    HttpListingPage, AsyncCarDetailPage, AdaptiveLimiter и RetryScheduler.
+    Одновременно выполняется ``slots`` заданий, чтобы хвост одной пачки
+    не простаивал сеть. Лимит частоты (RATE_LIMIT_RPS) действует на
+    процесс - при N воркерах суммарная частота в N раз выше.
+    """
+
+    def __init__(self, store_path=JOBS_PATH, name=None, concurrent_requests=NUM_THREADS * 2,
+                 listing_concurrency=LISTING_CONCURRENCY, slots=WORKER_JOB_SLOTS,
+                 adaptive=ADAPTIVE_CONCURRENCY, poll_interval=WORKER_POLL_INTERVAL):
+        self.store = JobStore(store_path)
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.listing = None  # ✅ URL выдачи и срезы берутся из очереди - их задаёт координатор
+        self.listing_concurrency = listing_concurrency
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self.limiter = AdaptiveLimiter(concurrent_requests) if adaptive else AdaptiveLimiter(
+            concurrent_requests, min_limit=concurrent_requests, max_limit=concurrent_requests
+        )
+        self.stats = {'jobs': 0, 'processed': 0, 'errors': 0, 'lost': 0}
+
+    def create_session(self):
+        """Создать aiohttp-сессию (пул соединений под максимальный лимит)"""
+        connector = aiohttp.TCPConnector(
+            limit=self.limiter.max_limit + self.listing_concurrency,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            ssl=False
+        )
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=3, sock_read=3)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=metrics.trace_configs())
+
+    # ==================== JOBS ====================
+    async def run_listing(self, session, payload):
+        """Собрать ссылки с диапазона страниц"""
+        if self.listing is None:
+            base_url = await asyncio.to_thread(self.store.get_meta, 'base_url')
+            plan = await asyncio.to_thread(self.store.get_meta, 'plan')
+            self.listing = create_listing(base_url or BASE_URL_TEMPLATE)
+            self.listing.load_plan(json.loads(plan) if plan else None)  # ✅ Срезы выдачи координатора
+        links_by_page, failed_pages = await self.listing.collect_async(
+            session, payload['pages'], self.listing_concurrency
+        )
+        return {'links': HttpListingPage.merge_links(links_by_page), 'failed': failed_pages}, ()
+
+    async def fetch_car(self, session, url, retry, records, failed):
+        detail_page = AsyncCarDetailPage(url, limiter=self.limiter)
+        async with self.limiter:
+            loaded = await detail_page._load_page(session)
+        if loaded:
+            records.append(detail_page.get_car_data())
+            retry.done(url)
+        elif detail_page.retry_reason is None or not retry.schedule(url, detail_page.retry_reason,
+                                                                    detail_page.retry_after):
+            failed.append(url)
+
+    async def run_detail(self, session, payload):
+        """Скачать пачку объявлений (с отложенными повторами)"""
+        retry = RetryScheduler()
+        records, failed = [], []
+        urls = payload['urls']
+        while urls or retry.pending:
+            if not urls:
+                await asyncio.sleep(retry.next_delay() or 0)
+                urls = retry.pop_due()
+                continue
+            await asyncio.gather(*(self.fetch_car(session, url, retry, records, failed) for url in urls))
+            urls = retry.pop_due()
+
+        self.stats['processed'] += len(records)
+        self.stats['errors'] += len(failed)
+        return {'count': len(records), 'failed': failed}, records
+
+    async def keep_lease(self, job_id, task):
+        """Продлевать аренду, пока задание выполняется; потеряли - отменить его"""
+        while not task.done():
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id, self.name):
+                self.stats['lost'] += 1
+                task.cancel()
+                return
+
+    async def run_job(self, session, job_id, kind, payload):
+        handler = self.run_listing if kind == 'listing' else self.run_detail
+        task = asyncio.create_task(handler(session, payload))
+        keeper = asyncio.create_task(self.keep_lease(job_id, task))
+        try:
+            result, records = await task
+        except asyncio.CancelledError:
+            if keeper.done():
+                return  # ✅ Аренда потеряна - задание уже у другого воркера
+            await asyncio.to_thread(self.store.release, job_id, self.name)
+            raise
+        except Exception as e:
+            print(f"⚠️  Задание {job_id} ({kind}) упало: {e}")
+            await asyncio.to_thread(self.store.release, job_id, self.name, True)
+            return
+        finally:
+            keeper.cancel()
+
+        if await asyncio.to_thread(self.store.complete, job_id, self.name, result, records):
+            self.stats['jobs'] += 1
+        else:
+            self.stats['lost'] += 1
+
+    async def job_loop(self, session):
+        """Брать задания, пока координатор не объявит конец работы"""
+        while True:
+            job = await asyncio.to_thread(self.store.lease, self.name)
+            if job is not None:
+                await self.run_job(session, *job)
+                continue
+            if await asyncio.to_thread(self.store.get_meta, 'state') == 'done':
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def run_async(self):
+        async with self.create_session() as session:
+            await asyncio.gather(*(self.job_loop(session) for _ in range(self.slots)))
+
+    def run(self):
+        """Запустить воркер (до конца работы или Ctrl+C)"""
+        print(f"👷 Воркер {self.name}: {self.slots} заданий одновременно, очередь {self.store.path}")
+        start = time.time()
+        metrics.start_server()
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n⚠️  Воркер остановлен - его задания вернулись в очередь")
+        finally:
+            s = self.stats
+            print(f"👷 {self.name}: заданий {s['jobs']} | объявлений {s['processed']} | "
+                  f"ошибок {s['errors']} | потеряно аренд {s['lost']} | {time.time() - start:.1f} сек")
+            if self.limiter.adaptive:
+                self.limiter.print_stats()
+            cache = get_http_cache()
+            if cache is not None:
+                cache.flush()  # ✅ Отложенные LRU-отметки попаданий
+                cache.print_stats()
+            rate_limiter = get_rate_limiter()
+            if rate_limiter is not None:
+                rate_limiter.print_stats()
+            metrics.print_summary()
+            self.store.close()
+
+
+def spawn_workers(count, store_path, extra_args=()):
+    """Запустить ``count`` локальных процессов-воркеров
+
+    Args:
+        extra_args (iterable): Дополнительные аргументы командной строки (флаги профилирования)
+    """
+    return [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', '--store', store_path, *extra_args])
+        for _ in range(count)
+    ]
+
+
+def main():
+    """Главная функция"""
+    arg_parser = argparse.ArgumentParser(description="Распределённый парсер auto.ru")
+    arg_parser.add_argument('role', choices=('coordinator', 'worker'), help="Роль процесса")
+    arg_parser.add_argument('--store', default=JOBS_PATH, help="Файл очереди заданий (общий для всех)")
+    arg_parser.add_argument('--resume', action='store_true', help="Координатор: продолжить прерванный запуск")
+    arg_parser.add_argument('--local-workers', type=int, default=0,
+                            help="Координатор: сразу запустить N воркеров на этой машине")
+    arg_parser.add_argument('--concurrency', type=int, default=NUM_THREADS * 2,
+                            help="Воркер: начальная параллельность запросов")
+    arg_parser.add_argument('--slots', type=int, default=WORKER_JOB_SLOTS,
+                            help="Воркер: заданий одновременно")
+    profiling.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    if args.role == 'worker':
+        worker = DistributedWorker(args.store, concurrent_requests=args.concurrency, slots=args.slots)
+        # ✅ Отчёты каждого воркера - в свои файлы
+        with Profiler(args.profile, args.profile_memory, OUTPUT_FILENAME, label=worker.name) as profiler:
+            with profiler.phase('crawl'):
+                worker.run()
+        return
+
+    total_start = time.time()
+    coordinator = Coordinator(max_price=MAX_PRICE, store_path=args.store, resume=args.resume)
+
+    print("\n" + "="*60)
+    print("🌐 РАСПРЕДЕЛЁННЫЙ ПАРСЕР AUTO.RU - КООРДИНАТОР")
+    print("="*60)
+    print(f"💰 Максимальная цена: {MAX_PRICE:,} руб")
+    print(f"📋 Очередь заданий: {args.store}")
+    print(f"👷 Воркеры: python auto_parser_distributed.py worker --store {args.store}")
+    print("="*60)
+
+    with Profiler(args.profile, args.profile_memory, OUTPUT_FILENAME, label='coordinator') as profiler:
+        with profiler.phase('plan'):
+            coordinator.plan(max_pages=MAX_PAGES)
+        worker_args = (['--profile', args.profile] if args.profile else []) + \
+            (['--profile-memory', args.profile_memory] if args.profile_memory else [])
+        workers = spawn_workers(args.local_workers, args.store, worker_args)
+        completed = False
+        try:
+            with profiler.phase('crawl'):
+                completed = coordinator.run()
+        finally:
+            for process in workers:
+                if not completed:
+                    process.terminate()
+                process.wait()
+
+        if completed and EXCEL_EXPORT:
+            with profiler.phase('save'):
+                coordinator.save_to_excel(OUTPUT_FILENAME)
+
+    total_elapsed = time.time() - total_start
+    print("\n" + "="*60)
+    print(f"⏱️  Общее время: {total_elapsed:.1f} сек")
+    print(f"📊 Всего объявлений: {coordinator.sink.count}")
+    if coordinator.stats['lost_urls']:
+        print(f"⚠️  Не скачано объявлений: {coordinator.stats['lost_urls']}")
+    if total_elapsed > 0 and coordinator.sink.count > 0:
+        print(f"⚡ Скорость: ~{coordinator.sink.count / total_elapsed:.1f} объявл/сек")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
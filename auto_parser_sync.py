@@ -10,13 +10,31 @@ from selenium import webdriver
 import pandas as pd
 import urllib3
 import os
+import argparse
 from lxml import html
+from urllib3.util.retry import Retry
 
 from pages.listing_page import ListingPage
+from pages.http_listing_page import HttpListingPage
+from pages.query_planner import create_listing, search_url
+from pages.extraction import DEFAULT_PLAN, get_extractor
+from pages.page_state import DEFAULT_STATE_EXTRACTOR
+from crawler.records import CarRecord
+from crawler.http_cache import HttpCache, get_http_cache
+from crawler.rate_limit import throttle, backoff, get_rate_limiter
+from crawler.retry import RetryScheduler, parse_retry_after
+from crawler.sinks import create_sink
+from crawler.normalize import normalize_frame, sort_by_date
+from crawler.seen_store import SeenStore
+from crawler.dedupe import ListingIndex
+from crawler.checkpoint import Checkpoint
+from crawler import metrics, profiling
+from crawler.profiling import Profiler
 from config import (
-    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME,
+    MAX_PRICE, NUM_THREADS, MAX_PAGES, OUTPUT_FILENAME, EXCEL_EXPORT,
     BASE_URL_TEMPLATE, CHROMEDRIVER_PATH, CHROME_ARGS,
-    PAGINATION_DELAY, REQUEST_TIMEOUT
+    REQUEST_TIMEOUT, LISTING_CONCURRENCY, USE_PAGE_STATE,
+    INCREMENTAL_MODE, CHECKPOINT_ENABLED
 )
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -25,206 +43,160 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class SyncCarDetailPage:
     """Синхронный Page Object для деталей объявления"""
     
-    TITLE = '//h1[@class="CardHead__title"]/text()'
-    YEAR = '(//a[@class="Link Link_color_black"]/text())[2]'
-    MILEAGE = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[1]'
-    OWNERS = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[2]'
-    CONDITION = '//span[contains(text(), "Исправн") or contains(text(), "Деформ") or contains(text(), "Битые") or contains(text(), "Перекр")]/text()'
-    TRANSMISSION = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[2]'
-    ENGINE = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[1]'
-    DATE_POSTED = '//div[contains(@class, "CardHead__creationDate")]/text()'
-    VIEWS = '//div[contains(@class, "CardHead__views")]/text()'
-    PRICE = '//span[@class="OfferPriceCaption__price"]/text()'
+    # ✅ XPath-цепочки полей описаны в config.CAR_DETAIL_FIELDS и скомпилированы один раз
+    PLAN = DEFAULT_PLAN
+    EXTRACTOR = get_extractor()  # ✅ get_car_data() - один проход по DOM
+    STATE = DEFAULT_STATE_EXTRACTOR  # ✅ JSON-состояние страницы вместо DOM
     
     def __init__(self, car_url):
         self.car_url = car_url
         self.tree = None
+        self.record = None
+        self.retry_reason = None  # ✅ Причина неудачи, если запрос стоит повторить
+        self.retry_after = None
     
-    def _load_page(self, session, retry=0, max_retries=5):
-        """Загрузить страницу синхронно с повторными попытками"""
+    def _accept(self, content):
+        """Разобрать тело ответа: JSON-состояние или DOM"""
+        if USE_PAGE_STATE:
+            with metrics.timed('extract'):
+                self.record = self.STATE.extract(content, self.car_url)
+        if self.record is None:
+            with metrics.timed('parse'):
+                self.tree = html.fromstring(content)
+    
+    def _load_page(self, session):
+        """Загрузить страницу синхронно (через HTTP-кэш)
+        
+        Повторов здесь нет: при временной ошибке заполняются ``retry_reason``
+        и ``retry_after``, а повтор планирует RetryScheduler парсера.
+        """
         try:
+            cache = get_http_cache()
+            entry = cache.lookup(self.car_url, allow_partial=USE_PAGE_STATE) if cache is not None else None
+            if entry is not None and entry.fresh:
+                self._accept(entry.body)
+                return True
+            
             headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                **HttpCache.conditional_headers(entry)
             }
             
-            response = session.get(
-                self.car_url,
-                headers=headers,
-                timeout=REQUEST_TIMEOUT,
-                verify=False,
-                allow_redirects=True
-            )
+            throttle(self.car_url)  # ✅ Общий лимит запросов к сайту
+            started = time.perf_counter()
+            try:
+                response = session.get(
+                    self.car_url,
+                    headers=headers,
+                    timeout=REQUEST_TIMEOUT,
+                    verify=False,
+                    allow_redirects=True
+                )
+            except requests.RequestException as e:
+                metrics.request('card', type(e).__name__, time.perf_counter() - started)
+                metrics.error('request', type(e).__name__)
+                raise
+            metrics.response('card', response.status_code, started, response.elapsed)
             
-            if response.status_code == 200:
+            if response.status_code == 304 and entry is not None:
+                # ✅ Страница не изменилась - берём тело из кэша
+                cache.revalidated(self.car_url, response.headers)
+                self._accept(entry.body)
+                return True
+            
+            elif response.status_code == 200:
                 content = response.content
-                if content and len(content) > 500:  # ✅ Проверяем размер ответа
-                    self.tree = html.fromstring(content)
+                if HttpListingPage.is_challenge(content, response.url):
+                    # ✅ Капчу не кэшируем и не разбираем - повторим позже
+                    self.retry_reason = 'challenge'
+                elif content and len(content) > 500:  # ✅ Проверяем размер ответа
+                    if cache is not None:
+                        cache.store(self.car_url, content, response.headers)
+                    self._accept(content)
                     return True
             
-            elif response.status_code == 429 and retry < max_retries:
-                # Too Many Requests - ждём и повторяем
-                wait_time = 2 ** retry  # Экспоненциальная задержка
-                print(f"      ⏳ 429 Error - ожидание {wait_time}с перед повтором...")
-                time.sleep(wait_time)
-                return self._load_page(session, retry + 1, max_retries)
+            elif response.status_code in (429, 503):
+                # ✅ Too Many Requests - повтор через Retry-After или backoff
+                self.retry_reason = 'throttled'
+                self.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if self.retry_after is not None:
+                    backoff(self.car_url, self.retry_after)  # ✅ Пауза и для сбора выдачи
+            
+            elif response.status_code >= 500:
+                self.retry_reason = 'server'
         
         except requests.Timeout:
-            if retry < max_retries:
-                print(f"      ⏳ Timeout - повтор {retry + 1}/{max_retries}...")
-                time.sleep(1)
-                return self._load_page(session, retry + 1, max_retries)
+            self.retry_reason = 'timeout'
         
-        except Exception as e:
-            if retry < max_retries:
-                print(f"      ⏳ Ошибка: {str(e)[:30]} - повтор {retry + 1}/{max_retries}...")
-                time.sleep(0.5)
-                return self._load_page(session, retry + 1, max_retries)
+        except Exception:
+            self.retry_reason = 'network'
         
         return False
     
-    def _get_text(self, xpath, index=0):
-        """Получить текст по XPath"""
-        if self.tree is None:
-            return "N/A"
-        try:
-            result = self.tree.xpath(xpath)
-            if result and len(result) > index:
-                text = str(result[index]).strip()
-                return text if text else "N/A"
-        except:
-            pass
-        return "N/A"
+    def _field(self, name):
+        """Значение поля: из уже готовой записи, если она есть, иначе из DOM"""
+        if self.record is not None:
+            return self.record.value(name)
+        return CarRecord.normalize(name, self.PLAN.extract_field(self.tree, name))
     
     def get_date_posted(self):
         """Получить дату объявления"""
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            date_patterns = [
-                '//div[contains(@class, "CardHead__creationDate")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__creationDate"]/text()',
-            ]
-            
-            for xpath in date_patterns:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        for r in result:
-                            text = str(r).strip()
-                            if text and len(text) > 3:
-                                return text
-                except:
-                    pass
-            
-            return "N/A"
-        except:
-            return "N/A"
+        return self._field('date_posted')
     
     def get_views(self):
         """Получить количество просмотров"""
-        try:
-            if self.tree is None:
-                return "0"
-            
-            view_patterns = [
-                '//div[contains(@class, "CardHead__views")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__views"]/text()',
-            ]
-            
-            for xpath in view_patterns:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        for r in result:
-                            text = str(r).strip()
-                            numbers = ''.join(filter(str.isdigit, text))
-                            if numbers:
-                                return numbers
-                except:
-                    pass
-            
-            return "0"
-        except:
-            return "0"
+        return self._field('views')
     
     def get_condition(self):
         """Получить состояние"""
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            conditions = [
-                '//span[contains(text(), "Исправное")]/text()',
-                '//span[contains(text(), "Деформированное")]/text()',
-                '//span[contains(text(), "Битые окна")]/text()',
-                '//span[contains(text(), "Перекрашено")]/text()',
-                '//span[contains(., "Исправн") or contains(., "Деформ") or contains(., "Битые") or contains(., "Перекр")]/text()',
-            ]
-            
-            for xpath in conditions:
-                try:
-                    result = self.tree.xpath(xpath)
-                    if result:
-                        text = str(result[0]).strip()
-                        if text and text != "N/A":
-                            return text
-                except:
-                    pass
-            
-            return "N/A"
-        except:
-            return "N/A"
+        return self._field('condition')
     
     def get_price(self):
         """Получить цену"""
-        try:
-            price_text = self._get_text(self.PRICE)
-            if price_text != "N/A":
-                numbers = ''.join(filter(str.isdigit, price_text))
-                if numbers:
-                    return int(numbers)
-        except:
-            pass
-        return 0
+        return self._field('price')
     
     def get_car_data(self):
         """Получить все данные"""
-        return {
-            'Марка': self._get_text(self.TITLE),
-            'Год выпуска': self._get_text(self.YEAR),
-            'Пробег': self._get_text(self.MILEAGE),
-            'Владельцы': self._get_text(self.OWNERS),
-            'Состояние': self.get_condition(),
-            'Коробка': self._get_text(self.TRANSMISSION),
-            'Двигатель': self._get_text(self.ENGINE),
-            'Дата объявления': self.get_date_posted(),
-            'Количество просмотров': self.get_views(),
-            'Цена': self.get_price(),
-            'URL': self.car_url
-        }
+        if self.record is not None:
+            return self.record
+        with metrics.timed('extract'):
+            return self.EXTRACTOR.extract(self.tree, self.car_url)
 
 
 class SyncAutoRuParser:
     """Синхронный парсер auto.ru - ВЫСОКАЯ ТОЧНОСТЬ"""
     
-    def __init__(self, max_price=MAX_PRICE):
-        self.base_url = BASE_URL_TEMPLATE
+    def __init__(self, max_price=MAX_PRICE, sink=None, incremental=INCREMENTAL_MODE, resume=False):
+        self.base_url = search_url(BASE_URL_TEMPLATE, max_price)  # ✅ price_to из max_price
         self.max_price = max_price
-        self.cars = []
+        self.http_listing = create_listing(self.base_url)  # ✅ Выдача по срезам цены (QUERY_PLANNER)
+        
+        # ✅ Контрольная точка: при продолжении результаты дописываются в тот же файл
+        self.checkpoint = Checkpoint() if CHECKPOINT_ENABLED or resume else None
+        resumed = self.checkpoint is not None and self.checkpoint.start(self.base_url, resume)
+        self.sink = sink if sink is not None else create_sink(append=resumed)  # ✅ Потоковая запись результатов
         self.driver = None
-        self.stats = {'processed': 0, 'errors': 0, 'skipped': 0}
+        self.stats = {'processed': 0, 'errors': 0, 'skipped': 0, 'retried': 0}
+        self.seen_store = SeenStore() if incremental else None  # ✅ Инкрементальный режим
+        self.index = ListingIndex()  # ✅ Дедупликация по ID объявления
+        self.retry = RetryScheduler()  # ✅ Отложенные повторы вместо сна внутри загрузки
         
         # ✅ Создаём session для переиспользования соединений
         self.session = requests.Session()
         adapter = requests.adapters.HTTPAdapter(
             pool_connections=5,
-            pool_maxsize=5,
-            max_retries=3
+            pool_maxsize=max(5, LISTING_CONCURRENCY),
+            # ✅ Только повторы соединения; 429/Retry-After обрабатывает RetryScheduler без блокировки
+            max_retries=Retry(total=3, status_forcelist=(), respect_retry_after_header=False)
         )
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
     
+    @property
+    def cars(self):
+        """Все собранные записи (читаются из потокового хранилища)"""
+        return self.sink.read_records()
+    
     def setup_driver(self):
         """Инициализировать Selenium"""
         options = webdriver.ChromeOptions()
@@ -241,32 +213,27 @@ class SyncAutoRuParser:
             print(f"❌ Ошибка: {e}")
             raise
     
-    def collect_all_links(self, max_pages=MAX_PAGES):
-        """Собрать ВСЕ ссылки"""
-        listing_page = ListingPage(self.driver, self.base_url)
-        
-        print(f"🔍 Определяю количество страниц...")
-        total_pages = listing_page.get_total_pages()
-        
-        if max_pages:
-            total_pages = min(total_pages, max_pages)
-        
-        print(f"📊 Будут собраны ссылки со ВСЕХ {total_pages} страниц\n")
-        
-        all_links = []
+    def get_listing_page(self):
+        """Получить Selenium ListingPage (браузер запускается только при необходимости)"""
+        if self.driver is None:
+            self.setup_driver()
+        return ListingPage(self.driver, self.base_url, page_url=self.http_listing.get_page_url)
+    
+    def collect_with_selenium(self, pages):
+        """Добрать через браузер страницы, которые не удалось разобрать по HTTP"""
+        listing_page = self.get_listing_page()
+        links_by_page = {}
         failed_pages = []
         
-        for page in range(1, total_pages + 1):
+        for page in pages:
             try:
-                print(f"📄 Страница {page}/{total_pages}...", end=' ', flush=True)
+                print(f"📄 Страница {page} (браузер)...", end=' ', flush=True)
                 listing_page.open_page(page)
                 
-                links = listing_page.get_car_links()
-                all_links.extend(links)
-                print(f"✅ {len(links)} ссылок (всего: {len(all_links)})")
-                
-                if PAGINATION_DELAY > 0:
-                    time.sleep(PAGINATION_DELAY)
+                links_by_page[page] = listing_page.get_car_links()
+                print(f"✅ {len(links_by_page[page])} ссылок")
+                if self.checkpoint is not None:
+                    self.checkpoint.save_page(page, links_by_page[page])
             
             except Exception as e:
                 print(f"⚠️  Ошибка: {e}")
@@ -275,6 +242,47 @@ class SyncAutoRuParser:
         if failed_pages:
             print(f"\n⚠️  Ошибки на страницах: {failed_pages}")
         
+        return links_by_page
+    
+    def collect_all_links(self, max_pages=MAX_PAGES):
+        """Собрать ВСЕ ссылки (HTTP + lxml, Selenium как запасной вариант)"""
+        http_listing = self.http_listing
+        checkpoint = self.checkpoint
+        
+        total_pages = checkpoint.total_pages if checkpoint is not None else None
+        if total_pages is not None:
+            http_listing.load_plan(checkpoint.plan)
+        else:
+            print(f"🔍 Определяю количество страниц...")
+            total_pages = http_listing.get_total_pages(self.session)
+            if total_pages is None:
+                total_pages = self.get_listing_page().get_total_pages()
+            
+            if max_pages:
+                total_pages = min(total_pages, max_pages)
+            if checkpoint is not None:
+                checkpoint.set_total_pages(total_pages, http_listing.plan_state())
+        
+        pages = checkpoint.remaining_pages(total_pages) if checkpoint is not None else range(1, total_pages + 1)
+        print(f"📊 Будут собраны ссылки с {len(pages)} из {total_pages} страниц\n")
+        
+        links_by_page, fallback_pages = http_listing.collect_threaded(
+            self.session, pages, LISTING_CONCURRENCY
+        )
+        print(f"✅ По HTTP: {len(links_by_page)} страниц | через браузер: {len(fallback_pages)}")
+        
+        if checkpoint is not None:
+            checkpoint.save_pages(links_by_page)
+            checkpoint.fail_pages(fallback_pages)
+        
+        if fallback_pages:
+            links_by_page.update(self.collect_with_selenium(fallback_pages))
+        
+        if checkpoint is not None:
+            all_links = checkpoint.frontier()  # ✅ Включая страницы, собранные в прошлом запуске
+        else:
+            all_links = HttpListingPage.merge_links(links_by_page)
+        print(f"📊 Всего ссылок: {len(all_links)}")
         return all_links
     
     def parse_car_sync(self, car_url):
@@ -282,25 +290,46 @@ class SyncAutoRuParser:
         try:
             detail_page = SyncCarDetailPage(car_url)
             if not detail_page._load_page(self.session):
-                self.stats['errors'] += 1
+                reason = detail_page.retry_reason
+                if reason is not None and self.retry.schedule(car_url, reason, detail_page.retry_after):
+                    self.stats['retried'] += 1
+                else:
+                    self.stats['errors'] += 1
                 return
+            self.retry.done(car_url)
             
             car_data = detail_page.get_car_data()
             
             # ✅ Принимаем ВСЕ объявления
-            self.cars.append(car_data)
+            self.sink.add(car_data)
             self.stats['processed'] += 1
+            self.index.mark_fetched(car_url)
+            if self.seen_store is not None:
+                self.seen_store.mark_fetched(car_url)
         
         except Exception:
             self.stats['errors'] += 1
     
     def parse_all_pages(self, max_pages=MAX_PAGES):
         """Основной метод парсинга"""
-        self.setup_driver()
-        
+        completed = False
+        metrics.start_server()  # ✅ /metrics, если задан METRICS_PORT
         try:
+            if self.seen_store is not None:
+                self.seen_store.begin_run()
+            
             all_links = self.collect_all_links(max_pages)
             
+            all_links = self.index.filter(all_links)  # ✅ Одно объявление - одна загрузка
+            
+            if self.checkpoint is not None:
+                # ✅ Пропускаем объявления, обработанные до прерывания
+                all_links = self.checkpoint.pending(all_links, self.checkpoint.completed_urls(self.sink))
+            
+            if self.seen_store is not None:
+                # ✅ Инкрементальный режим: только новые и устаревшие объявления
+                all_links = self.seen_store.observe(all_links)
+            
             print(f"\n{'='*60}")
             print(f"📊 Всего собрано ссылок: {len(all_links)}")
             print(f"⚙️  СИНХРОННЫЙ ПАРСИНГ (99% точность, медленно)")
@@ -314,50 +343,70 @@ class SyncAutoRuParser:
                     success_rate = (self.stats['processed'] / (self.stats['processed'] + self.stats['errors'])) * 100 if (self.stats['processed'] + self.stats['errors']) > 0 else 0
                     print(f"  ⚙️  Обработано: {idx}/{len(all_links)} | Успех: {success_rate:.1f}%")
                 
-                # ✅ Парсим объявление
+                # ✅ Парсим объявление (частоту запросов держит общий RateLimiter)
                 self.parse_car_sync(url)
                 
-                # ✅ ЗАДЕРЖКА 0.5 сек для избежания блокировки
-                time.sleep(0.5)
+                # ✅ Повторы, время которых подошло, - между новыми объявлениями
+                for retry_url in self.retry.pop_due():
+                    self.parse_car_sync(retry_url)
+            
+            # ✅ Остались только отложенные повторы - ждём ближайший
+            while self.retry.pending:
+                time.sleep(self.retry.next_delay())
+                for retry_url in self.retry.pop_due():
+                    self.parse_car_sync(retry_url)
             
             elapsed_parsing = time.time() - start_parsing
             print(f"\n⚙️  Синхронный парсинг занял: {elapsed_parsing:.1f} сек")
+            completed = True
         
         except KeyboardInterrupt:
             print("\n\n⚠️  Парсинг прерван пользователем")
         
         finally:
-            self.driver.quit()
-            print("🔴 Browser закрыт")
+            self.sink.close()  # ✅ Сбрасываем буфер даже при ошибке
+            self.index.close()
+            self.index.print_stats()
+            if self.seen_store is not None:
+                self.seen_store.flush()  # ✅ Отметки о скачивании пишутся пачками
+                if completed and not max_pages:
+                    self.seen_store.finish_run()
+                self.seen_store.print_stats()
+            if self.checkpoint is not None:
+                if completed:
+                    self.checkpoint.finish()
+                else:
+                    print("💾 Прогресс сохранён - продолжить: python auto_parser_sync.py --resume")
+            cache = get_http_cache()
+            if cache is not None:
+                cache.flush()  # ✅ Отложенные LRU-отметки попаданий
+                cache.print_stats()
+            rate_limiter = get_rate_limiter()
+            if rate_limiter is not None:
+                rate_limiter.print_stats()
+            metrics.print_summary()
+            self.retry.print_stats()
+            if self.driver is not None:
+                self.driver.quit()
+                self.driver = None
+                print("🔴 Browser закрыт")
         
-        return self.cars
+        return self.sink
     
     def save_to_excel(self, filename=OUTPUT_FILENAME):
         """Сохранить ВСЕ данные"""
-        if not self.cars:
+        if not self.sink.count:
             print("❌ Нет данных для сохранения")
             return
         
         start_save = time.time()
-        print(f"\n⏳ Сохраняю {len(self.cars)} объявлений...")
-        
-        df = pd.DataFrame(self.cars)
-        
-        # ✅ Очистка данных
-        try:
-            df['Дата объявления'] = pd.to_datetime(df['Дата объявления'], 
-                                                   format='%d %B %Y', 
-                                                   errors='coerce')
-            df = df.sort_values('Дата объявления', ascending=False, na_position='last')
-            df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
-        except:
-            pass
+        print(f"\n⏳ Сохраняю {self.sink.count} объявлений...")
         
-        # ✅ Конвертируем просмотры в числа
-        try:
-            df['Количество просмотров'] = pd.to_numeric(df['Количество просмотров'], errors='coerce').fillna(0).astype(int)
-        except:
-            pass
+        # ✅ Читаем уже сброшенные на диск записи
+        df = self.sink.read_dataframe()
+        # ✅ Векторная нормализация: даты «12 октября» / «вчера», пробег, двигатель
+        df = sort_by_date(normalize_frame(df))
+        df['Дата объявления'] = df['Дата объявления'].dt.strftime('%d.%m.%Y')
         
         df = df.drop('URL', axis=1)
         df.to_excel(filename, index=False, engine='openpyxl')
@@ -382,9 +431,14 @@ class SyncAutoRuParser:
 
 def main():
     """Главная функция"""
+    arg_parser = argparse.ArgumentParser(description="Синхронный парсер auto.ru")
+    arg_parser.add_argument('--resume', action='store_true', help="Продолжить прерванный запуск")
+    profiling.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    
     total_start = time.time()
     
-    parser = SyncAutoRuParser(max_price=MAX_PRICE)
+    parser = SyncAutoRuParser(max_price=MAX_PRICE, resume=args.resume)
     
     print("\n" + "="*60)
     print("🚗 СИНХРОННЫЙ ПАРСЕР AUTO.RU")
@@ -394,8 +448,12 @@ def main():
     print(f"⚙️  Режим: СИНХРОННЫЙ (медленный но точный)")
     print("="*60)
     
-    parser.parse_all_pages(max_pages=MAX_PAGES)
-    parser.save_to_excel(OUTPUT_FILENAME)
+    with Profiler(args.profile, args.profile_memory, output=OUTPUT_FILENAME) as profiler:
+        with profiler.phase('crawl'):
+            parser.parse_all_pages(max_pages=MAX_PAGES)
+        if EXCEL_EXPORT:
+            with profiler.phase('save'):
+                parser.save_to_excel(OUTPUT_FILENAME)
     
     total_elapsed = time.time() - total_start
     
@@ -403,14 +461,14 @@ def main():
     print(f"✅ ПАРСИНГ УСПЕШНО ЗАВЕРШЁН!")
     print("="*60)
     print(f"⏱️  Общее время: {total_elapsed:.1f} сек (~{total_elapsed/60:.1f} мин)")
-    print(f"📊 Всего объявлений в файле: {len(parser.cars)}")
+    print(f"📊 Всего объявлений в файле: {parser.sink.count}")
     
-    if total_elapsed > 0 and len(parser.cars) > 0:
-        speed = len(parser.cars) / total_elapsed
+    if total_elapsed > 0 and parser.sink.count > 0:
+        speed = parser.sink.count / total_elapsed
         print(f"⚙️  Скорость парсинга: ~{speed:.2f} объявл/сек (медленно но надёжно)")
     
     print("="*60)
-    print(f"📁 Файл сохранён: {OUTPUT_FILENAME}\n")
+    print(f"📁 Файл сохранён: {OUTPUT_FILENAME if EXCEL_EXPORT else parser.sink.path}\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,6 @@
+"""Локальный стенд и сравнение движков парсера без обращения к auto.ru
+
+Модули импортируются напрямую (``benchmarks.stand``, ``benchmarks.fixtures``):
+процесс движка должен успеть перенастроить config до первого импорта
+crawler и pages, поэтому пакет ничего не импортирует сам.
+"""
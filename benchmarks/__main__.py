@@ -0,0 +1,5 @@
+"""python -m benchmarks - сравнение движков на локальном стенде"""
+
+from benchmarks.run import main
+
+main()
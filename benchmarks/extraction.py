@@ -0,0 +1,283 @@
+"""Микро-бенчмарки разбора и извлечения на сохранённых страницах
+
+Замеряет CPU на документ без сети: разбор lxml, get_car_data всех
+Page Object'ов, каждый способ извлечения, каждое поле по отдельности и
+сбор ссылок со страницы выдачи, а также выделение памяти на документ:
+
+    python -m benchmarks.extraction --save baseline.json
+    python -m benchmarks.extraction --compare baseline.json   # код выхода 1 при регрессии
+
+Корпус - каталог ``cards/*.html`` и ``listings/*.html`` (можно положить
+страницы, сохранённые с сайта); если его нет, он генерируется из
+FixtureCorpus.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from lxml import html
+
+from benchmarks.fixtures import FixtureCorpus
+from benchmarks.run import code_version
+from pages.listing_page import CARS_PER_PAGE, extract_car_links
+from pages.http_listing_page import HttpListingPage
+from pages.extraction import DEFAULT_PLAN, DEFAULT_EXTRACTOR, StreamingExtraction
+from pages.page_state import DEFAULT_STATE_EXTRACTOR
+from pages.car_detail_page import CarDetailPage
+from config import (
+    BENCH_CORPUS_PATH, BENCH_ROUNDS, BENCH_REGRESSION_THRESHOLD, STREAM_CHUNK_SIZE, MAX_PRICE
+)
+
+CORPUS_CARDS = 50
+CORPUS_LISTINGS = 5
+CORPUS_DATE = datetime.date(2024, 10, 15)  # ✅ Фиксированная дата - одинаковые страницы в любой день
+
+
+# ==================== CORPUS ====================
+class Document:
+    """Сохранённая страница: байты, текст (как page_source Selenium) и URL"""
+
+    __slots__ = ('url', 'content', 'text', 'tree')
+
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+        self.text = content.decode('utf-8', errors='replace')
+        self.tree = html.fromstring(content)
+
+
+def generate_corpus(directory, cards=CORPUS_CARDS, listings=CORPUS_LISTINGS):
+    """Сохранить страницы FixtureCorpus в каталог корпуса"""
+    corpus = FixtureCorpus(size=cards * 2, seed=1, today=CORPUS_DATE)
+    base_url = 'https://auto.ru'
+    os.makedirs(os.path.join(directory, 'cards'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'listings'), exist_ok=True)
+    for listing in corpus.listings[:cards]:
+        name = f"{listing.brand}_{listing.model}_{listing.sale_id}-{listing.slug}.html"
+        with open(os.path.join(directory, 'cards', name), 'wb') as f:
+            f.write(corpus.card_page(listing.sale_id))
+    for page in range(1, listings + 1):
+        with open(os.path.join(directory, 'listings', f"page_{page}.html"), 'wb') as f:
+            f.write(corpus.listing_page(base_url, '/moskva/cars/all/', {'price_to': MAX_PRICE, 'page': page}))
+
+
+def card_url(path):
+    """URL карточки по имени файла ``<марка>_<модель>_<id>-<hash>.html``"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    parts = name.split('_', 2)
+    if len(parts) == 3:
+        return f"https://auto.ru/cars/used/sale/{parts[0]}/{parts[1]}/{parts[2]}/"
+    return f"https://auto.ru/cars/used/sale/unknown/unknown/{name}/"
+
+
+def load_corpus(directory):
+    """Прочитать корпус
+
+    Returns:
+        tuple: (list карточек, list страниц выдачи) - объекты Document
+    """
+    if not glob.glob(os.path.join(directory, 'cards', '*.html')):
+        print(f"📦 Корпус не найден - генерирую в {directory}")
+        generate_corpus(directory)
+
+    def read(pattern, url_for):
+        documents = []
+        for path in sorted(glob.glob(os.path.join(directory, pattern))):
+            with open(path, 'rb') as f:
+                documents.append(Document(url_for(path), f.read()))
+        return documents
+
+    cards = read(os.path.join('cards', '*.html'), card_url)
+    listings = read(os.path.join('listings', '*.html'), lambda path: 'https://auto.ru/moskva/cars/all/')
+    return cards, listings
+
+
+# ==================== CASES ====================
+def stream(document):
+    extraction = StreamingExtraction(encoding='utf-8')
+    content = document.content
+    for offset in range(0, len(content), STREAM_CHUNK_SIZE):
+        if extraction.feed(content[offset:offset + STREAM_CHUNK_SIZE]):
+            break
+    return extraction.finish(document.url)
+
+
+def page_object_case(page_class):
+    """get_car_data Page Object'а по уже скачанному телу (JSON-состояние или DOM)"""
+    def run(document):
+        page = page_class(document.url)
+        page._accept(document.content)
+        return page.get_car_data()
+    return run
+
+
+def build_cases():
+    """Замеры: имя -> (вид документов, функция от Document)"""
+    from auto_parser_async import AsyncCarDetailPage
+    from auto_parser_sync import SyncCarDetailPage
+
+    cases = {
+        'card.parse': ('cards', lambda doc: html.fromstring(doc.content)),
+        'card.page_state': ('cards', lambda doc: DEFAULT_STATE_EXTRACTOR.extract(doc.content, doc.url)),
+        'card.extract.xpath': ('cards', lambda doc: DEFAULT_PLAN.extract(doc.tree, doc.url)),
+        'card.extract.single_pass': ('cards', lambda doc: DEFAULT_EXTRACTOR.extract(doc.tree, doc.url)),
+        'card.streaming': ('cards', stream),
+        'CarDetailPage.get_car_data': ('cards', lambda doc: CarDetailPage(doc.url, doc.content).get_car_data()),
+        'AsyncCarDetailPage.get_car_data': ('cards', page_object_case(AsyncCarDetailPage)),
+        'SyncCarDetailPage.get_car_data': ('cards', page_object_case(SyncCarDetailPage)),
+        'listing.parse': ('listings', lambda doc: html.fromstring(doc.text)),
+        # ✅ То же, что ListingPage.get_car_links делает с driver.page_source
+        'ListingPage.get_car_links': ('listings', lambda doc: extract_car_links(html.fromstring(doc.text))),
+        'listing.extract_car_links': ('listings', lambda doc: extract_car_links(doc.tree)),
+        'listing.parse_probe': ('listings', lambda doc: HttpListingPage.parse_probe(doc.content, doc.url)),
+    }
+    for spec in DEFAULT_PLAN.fields:
+        cases[f"field.{spec.name}"] = ('cards', lambda doc, name=spec.name: DEFAULT_PLAN.extract_field(doc.tree, name))
+    return cases
+
+
+# ==================== MEASURE ====================
+def time_case(function, documents, rounds):
+    """Лучшее и медианное время на документ (мкс) за ``rounds`` проходов по корпусу"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for document in documents:
+            function(document)
+        timings.append((time.perf_counter() - started) / len(documents) * 1e6)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def allocations(function, documents):
+    """Пик памяти Python на документ (КБ)
+
+    tracemalloc видит только кучу Python: память libxml2 (дерево lxml)
+    сюда не входит, поэтому цифра - это объекты, созданные извлечением.
+    """
+    tracemalloc.start()
+    try:
+        peaks = []
+        for document in documents:
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = function(document)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+            del result
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def run_cases(cases, cards, listings, rounds, pattern=None):
+    """Прогнать замеры
+
+    Returns:
+        dict: {имя: {'best_us', 'median_us', 'alloc_kb', 'docs'}}
+    """
+    documents = {'cards': cards, 'listings': listings}
+    results = {}
+    for name, (kind, function) in cases.items():
+        if pattern and not fnmatch.fnmatch(name, pattern):
+            continue
+        docs = documents[kind]
+        if not docs:
+            continue
+        for document in docs[:3]:
+            function(document)  # ✅ Прогрев: ленивые импорты, кэши XPath
+        best, median = time_case(function, docs, rounds)
+        alloc_kb = allocations(function, docs[:10])
+        results[name] = {
+            'best_us': round(best, 1), 'median_us': round(median, 1),
+            'alloc_kb': round(alloc_kb, 1), 'docs': len(docs),
+        }
+    return results
+
+
+# ==================== REPORT ====================
+def compare(results, baseline, threshold):
+    """Найти регрессии относительно базы (по лучшему времени)
+
+    Returns:
+        list: Имена замеров, замедлившихся больше чем на ``threshold``
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or not base['best_us']:
+            continue
+        change = result['best_us'] / base['best_us'] - 1
+        result['change'] = round(change, 3)
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results, regressions=()):
+    print(f"\n{'='*84}")
+    print(f"{'замер':<36} {'лучшее, мкс':>12} {'медиана, мкс':>13} {'КБ/док':>8} {'изменение':>11}")
+    print('-' * 84)
+    for name, r in results.items():
+        change = f"{r['change'] * 100:+.1f}%" if 'change' in r else ''
+        mark = ' ❌' if name in regressions else ''
+        print(f"{name:<36} {r['best_us']:>12.1f} {r['median_us']:>13.1f} {r['alloc_kb']:>8.1f} {change:>11}{mark}")
+    print(f"{'='*84}\n")
+
+
+# ==================== MAIN ====================
+def main():
+    """Главная функция"""
+    arg_parser = argparse.ArgumentParser(description="Микро-бенчмарки разбора и извлечения")
+    arg_parser.add_argument('--corpus', default=BENCH_CORPUS_PATH, help="Каталог сохранённых страниц")
+    arg_parser.add_argument('--rounds', type=int, default=BENCH_ROUNDS, help="Проходов по корпусу")
+    arg_parser.add_argument('--cases', help="Только замеры по маске (например 'field.*')")
+    arg_parser.add_argument('--save', help="Сохранить результаты как базу (JSON)")
+    arg_parser.add_argument('--compare', help="Сравнить с базой; код выхода 1 при регрессии")
+    arg_parser.add_argument('--threshold', type=float, default=BENCH_REGRESSION_THRESHOLD,
+                            help="Допустимое замедление (0.10 = +10%%)")
+    args = arg_parser.parse_args()
+
+    cards, listings = load_corpus(args.corpus)
+    print(f"🧪 Корпус {args.corpus}: карточек {len(cards)}, страниц выдачи {len(listings)} "
+          f"(~{CARS_PER_PAGE} ссылок на странице), проходов {args.rounds}")
+    results = run_cases(build_cases(), cards, listings, args.rounds, args.cases)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['cases'], args.threshold)
+    print_results(results, regressions)
+
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'commit': code_version(),
+                'python': platform.python_version(),
+                'corpus': {'path': args.corpus, 'cards': len(cards), 'listings': len(listings)},
+                'rounds': args.rounds,
+                'cases': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"📁 База сохранена: {args.save}")
+
+    if regressions:
+        print(f"❌ Замедление больше {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+    if args.compare:
+        print(f"✅ Регрессий нет (порог {args.threshold * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Синтетическая выдача auto.ru для стенда: страницы выдачи и карточки объявлений"""
+
+import bisect
+import datetime
+import html
+import json
+import math
+import random
+
+from pages.listing_page import CARS_PER_PAGE
+from config import (
+    BENCH_LISTINGS, BENCH_CARD_BYTES, BENCH_LISTING_BYTES, BENCH_PROMOTED,
+    LISTING_PAGE_CAP, MAX_PRICE
+)
+
+
+MODELS = (
+    ('toyota', 'camry', 'Toyota', 'Camry'), ('toyota', 'corolla', 'Toyota', 'Corolla'),
+    ('kia', 'rio', 'Kia', 'Rio'), ('hyundai', 'solaris', 'Hyundai', 'Solaris'),
+    ('vaz', 'granta', 'LADA (ВАЗ)', 'Granta'), ('volkswagen', 'polo', 'Volkswagen', 'Polo'),
+    ('skoda', 'octavia', 'Skoda', 'Octavia'), ('renault', 'logan', 'Renault', 'Logan'),
+    ('ford', 'focus', 'Ford', 'Focus'), ('nissan', 'qashqai', 'Nissan', 'Qashqai'),
+)
+MONTHS = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря',
+)
+# Значение из JSON -> текст на странице (как CAR_STATE_ENUMS)
+TRANSMISSIONS = (('AUTOMATIC', 'автоматическая'), ('MECHANICAL', 'механическая'),
+                 ('ROBOT', 'роботизированная'), ('VARIATOR', 'вариатор'))
+FUELS = (('GASOLINE', 'Бензин'), ('DIESEL', 'Дизель'), ('HYBRID', 'Гибрид'))
+CONDITIONS = (('CONDITION_OK', 'Не требует ремонта'), ('BEATEN', 'Битый / не на ходу'))
+
+
+def spaced(number):
+    """Число с пробелами между разрядами, как на странице: 1 234 000"""
+    return f"{number:,}".replace(',', ' ')
+
+
+def filler(size, prefix):
+    """Разметка-балласт до ``size`` байт (скрипты, меню, футер настоящей страницы)"""
+    block = f'<div class="{prefix}__item"><span>Текст блока</span><a href="/{prefix}/">ссылка</a></div>'
+    return block * max(0, size // len(block.encode()))
+
+
+class Listing:
+    """Одно объявление синтетической выдачи"""
+
+    __slots__ = ('sale_id', 'slug', 'brand', 'model', 'mark', 'model_name', 'price', 'year',
+                 'mileage', 'owners', 'transmission', 'fuel', 'displacement', 'power',
+                 'condition', 'posted', 'views')
+
+    def __init__(self, sale_id, rng, today):
+        self.sale_id = sale_id
+        self.slug = f"{rng.getrandbits(32):08x}"
+        self.brand, self.model, self.mark, self.model_name = rng.choice(MODELS)
+        self.price = rng.randrange(150, MAX_PRICE // 1000 + 1) * 1000
+        self.year = rng.randint(2000, today.year)
+        self.mileage = rng.randrange(0, 400) * 1000
+        self.owners = rng.randint(1, 4)
+        self.transmission = rng.choice(TRANSMISSIONS)
+        self.fuel = rng.choice(FUELS)
+        self.displacement = rng.choice((1398, 1596, 1798, 1998, 2494))
+        self.power = rng.randint(70, 250)
+        self.condition = rng.choice(CONDITIONS)
+        self.posted = today - datetime.timedelta(days=rng.randint(0, 60))
+        self.views = rng.randint(0, 5000)
+
+    def path(self):
+        return f"/cars/used/sale/{self.brand}/{self.model}/{self.sale_id}-{self.slug}/"
+
+    def state(self):
+        """JSON-состояние карточки (пути - как в CAR_STATE_FIELDS)"""
+        posted = datetime.datetime.combine(self.posted, datetime.time(12))
+        return {'card': {
+            'price_info': {'RUR': self.price},
+            'documents': {'year': self.year, 'owners_number': self.owners},
+            'state': {'mileage': self.mileage, 'condition': self.condition[0]},
+            'vehicle_info': {
+                'mark_info': {'name': self.mark}, 'model_info': {'name': self.model_name},
+                'tech_param': {'displacement': self.displacement, 'power': self.power,
+                               'engine_type': self.fuel[0], 'transmission': self.transmission[0]},
+            },
+            'additional_info': {'creation_date': str(int(posted.timestamp() * 1000))},
+            'counters': {'all': self.views},
+        }}
+
+
+class FixtureCorpus:
+    """Детерминированный набор объявлений и их страниц
+
+    Одинаковые ``size`` и ``seed`` дают одинаковые страницы, поэтому
+    прогоны разных версий сравнимы. Выдача поддерживает фильтры
+    ``price_from`` / ``price_to`` / ``year_from`` / ``year_to``, счётчик
+    «найдено N» и лимит страниц на запрос, как настоящий сайт.
+    """
+
+    def __init__(self, size=BENCH_LISTINGS, seed=1, card_bytes=BENCH_CARD_BYTES,
+                 listing_bytes=BENCH_LISTING_BYTES, promoted=BENCH_PROMOTED,
+                 page_cap=LISTING_PAGE_CAP, today=None):
+        """Инициализация FixtureCorpus
+
+        Args:
+            size (int): Количество объявлений
+            seed (int): Зерно генератора
+            card_bytes (int): Примерный размер карточки
+            listing_bytes (int): Примерный размер страницы выдачи
+            promoted (int): Объявлений, поднятых на каждую страницу выдачи
+            page_cap (int): Сколько страниц отдаётся на один запрос
+            today (datetime.date): Дата «сегодня» для дат объявлений
+        """
+        rng = random.Random(seed)
+        today = today or datetime.date.today()
+        self.listings = sorted(
+            (Listing(1_100_000_000 + i, rng, today) for i in range(size)),
+            key=lambda listing: (listing.price, listing.sale_id)
+        )
+        self.prices = [listing.price for listing in self.listings]
+        self.by_id = {listing.sale_id: listing for listing in self.listings}
+        self.promoted = rng.sample(self.listings, min(promoted, size))
+        self.page_cap = page_cap
+        self.card_filler = filler(card_bytes, 'CardFooter').encode()
+        self.listing_filler = filler(listing_bytes, 'ListingFooter')
+
+    def __len__(self):
+        return len(self.listings)
+
+    # ==================== LISTING ====================
+    def search(self, query):
+        """Объявления, подходящие под фильтры запроса (по возрастанию цены)"""
+        price_from = int(query.get('price_from') or 0)
+        price_to = int(query.get('price_to') or MAX_PRICE)
+        found = self.listings[bisect.bisect_left(self.prices, price_from):bisect.bisect_right(self.prices, price_to)]
+        if 'year_from' in query or 'year_to' in query:
+            year_from = int(query.get('year_from') or 0)
+            year_to = int(query.get('year_to') or 9999)
+            found = [listing for listing in found if year_from <= listing.year <= year_to]
+        return found
+
+    def listing_page(self, base_url, path, query):
+        """HTML страницы выдачи для запроса ``path?query``"""
+        found = self.search(query)
+        page = int(query.get('page') or 1)
+        shown = found[(page - 1) * CARS_PER_PAGE:page * CARS_PER_PAGE] if page <= self.page_cap else []
+        pages = min(self.page_cap, math.ceil(len(found) / CARS_PER_PAGE))
+
+        cards = ''.join(
+            f'<div class="ListingItem"><a class="ListingItemTitle__link" href="{base_url}{listing.path()}?from=search">'
+            f'{html.escape(listing.mark)} {html.escape(listing.model_name)}</a>'
+            f'<div class="ListingItemPrice__content">{spaced(listing.price)} ₽</div></div>'
+            for listing in self.promoted + shown
+        )
+        params = '&'.join(f'{key}={value}' for key, value in query.items() if key != 'page')
+        pagination = ''.join(
+            f'<a class="Pagination__page" href="{path}?{params}&page={number}">{number}</a>'
+            for number in range(1, pages + 1)
+        )
+        return (
+            '<html><head><meta charset="utf-8"><title>Купить авто</title></head><body>'
+            f'<span class="ButtonWithLoader__content">Показать найдено {len(found)} предложений</span>'
+            f'<div class="ListingCars">{cards}</div><div class="Pagination">{pagination}</div>'
+            f'{self.listing_filler}</body></html>'
+        ).encode()
+
+    # ==================== CARD ====================
+    def card_page(self, sale_id):
+        """HTML карточки объявления (DOM и JSON-состояние) или None"""
+        listing = self.by_id.get(sale_id)
+        if listing is None:
+            return None
+        posted = f"{listing.posted.day} {MONTHS[listing.posted.month - 1]}"
+        title = html.escape(f"{listing.mark} {listing.model_name}")
+        state = json.dumps(listing.state(), ensure_ascii=False)
+        head = (
+            '<html><head><meta charset="utf-8"><title>Объявление</title></head><body>'
+            f'<div class="CardHead"><h1 class="CardHead__title">{title}</h1>'
+            '<div class="CardHead__info">'
+            f'<div class="CardHead__infoItem CardHead__creationDate">{posted}</div>'
+            f'<div class="CardHead__infoItem CardHead__views">{listing.views} просмотров</div></div></div>'
+            f'<a class="Link Link_color_black">{html.escape(listing.mark)}</a>'
+            f'<a class="Link Link_color_black">{listing.year}</a>'
+            f'<div class="CardInfoSummarySimpleRow"><div class="CardInfoSummarySimpleRow__content-IIKcj">{spaced(listing.mileage)} км</div></div>'
+            f'<div class="CardInfoSummarySimpleRow"><div class="CardInfoSummarySimpleRow__content-IIKcj">{listing.owners} владельца</div></div>'
+            f'<div class="CardInfoSummarySimpleRow"><span>{listing.condition[1]}</span></div>'
+            f'<div class="CardInfoSummaryComplexRow__cellValue-Hka8p">{listing.displacement / 1000:.1f} л / {listing.power} л.с. / {listing.fuel[1]}</div>'
+            f'<div class="CardInfoSummaryComplexRow__cellValue-Hka8p">{listing.transmission[1]}</div>'
+            f'<span class="OfferPriceCaption__price">{spaced(listing.price)} ₽</span>'
+        ).encode()
+        # ✅ Как на сайте: JSON-состояние - в конце страницы, после основной разметки
+        tail = f'<script id="initial-state" type="application/json">{state}</script></body></html>'.encode()
+        return head + self.card_filler + tail
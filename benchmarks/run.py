@@ -0,0 +1,247 @@
+"""Сравнение движков парсера на локальном стенде
+
+Каждый движок запускается в отдельном процессе (чтобы время CPU и пик
+памяти относились только к нему) против одного и того же стенда:
+
+    python -m benchmarks --engines threaded async sync --listings 1000
+    python -m benchmarks --engines async --latency 0.2 --bandwidth 500000
+
+Результаты дописываются в BENCH_RESULTS_PATH (JSONL): одна строка на
+прогон движка с версией кода, параметрами стенда и метриками.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # ✅ Windows: пик памяти и CPU без модуля resource не считаем
+    resource = None
+
+ENGINES = ('threaded', 'async', 'sync')
+
+
+# ==================== ENGINE PROCESS ====================
+def configure(listing_url, rate_limit=False):
+    """Направить парсер на стенд (до импорта движков: они читают config при импорте)"""
+    import config
+
+    config.BASE_URL_TEMPLATE = listing_url
+    config.MAX_PAGES = None
+    config.HTTP_CACHE_ENABLED = False  # ✅ Иначе второй прогон не пойдёт в сеть
+    config.CHECKPOINT_ENABLED = False
+    config.INCREMENTAL_MODE = False
+    config.DEDUPE_BLOOM_PATH = None
+    config.RATE_LIMIT_ENABLED = rate_limit
+
+
+def create_parser(engine, sink, concurrency):
+    """Создать движок с потоковым хранилищем во временном каталоге"""
+    if engine == 'threaded':
+        from auto_parser import AutoRuParser
+        return AutoRuParser(sink=sink, **({'num_threads': concurrency} if concurrency else {}))
+    if engine == 'async':
+        from auto_parser_async import AsyncAutoRuParser
+        return AsyncAutoRuParser(sink=sink, **({'concurrent_requests': concurrency} if concurrency else {}))
+    if engine == 'sync':
+        from auto_parser_sync import SyncAutoRuParser
+        return SyncAutoRuParser(sink=sink)
+    raise ValueError(f"Неизвестный движок: {engine} (доступны: {', '.join(ENGINES)})")
+
+
+def usage():
+    """Время CPU (сек) и пик RSS (МБ) текущего процесса"""
+    if resource is None:
+        return None, None
+    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    # ✅ ru_maxrss: килобайты в Linux, байты в macOS
+    peak = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return rusage.ru_utime + rusage.ru_stime, peak
+
+
+def run_engine(engine, listing_url, workdir, concurrency=None, rate_limit=False):
+    """Прогнать движок против стенда (вызывается в отдельном процессе)
+
+    Returns:
+        dict: Записей, время, CPU и пик памяти процесса
+    """
+    configure(listing_url, rate_limit)
+    from crawler.sinks import create_sink
+
+    sink = create_sink('jsonl', path=os.path.join(workdir, f"{engine}.jsonl"))
+    parser = create_parser(engine, sink, concurrency)
+
+    cpu_before, _ = usage()
+    started = time.perf_counter()
+    parser.parse_all_pages()
+    wall = time.perf_counter() - started
+    cpu_after, peak_rss = usage()
+
+    return {
+        'records': parser.sink.count,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu_after - cpu_before, 3) if cpu_after is not None else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+# ==================== REPORT ====================
+def percentiles(values):
+    """p50 / p95 / p99 в миллисекундах"""
+    if len(values) < 2:
+        value = round(values[0] * 1000, 1) if values else None
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {name: round(cuts[index] * 1000, 1) for name, index in (('p50', 49), ('p95', 94), ('p99', 98))}
+
+
+def code_version():
+    """Коммит, на котором запущен бенчмарк (None вне git)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    """Таблица результатов в консоль"""
+    print(f"\n{'='*96}")
+    print(f"{'движок':<10} {'объявл.':>8} {'объявл/сек':>11} {'сек':>8} {'CPU, сек':>9} {'RSS, МБ':>8} "
+          f"{'МБ отдано':>10} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8}")
+    print('-' * 96)
+    for r in results:
+        latency = r['latency_ms']
+        print(f"{r['engine']:<10} {r['records']:>8} {r['listings_per_sec']:>11.1f} {r['wall_seconds']:>8.1f} "
+              f"{r['cpu_seconds'] if r['cpu_seconds'] is not None else '-':>9} "
+              f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>8} "
+              f"{r['bytes_sent'] / 1024 / 1024:>10.1f} {latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8}")
+    print(f"{'='*96}\n")
+
+
+# ==================== MAIN ====================
+def main():
+    """Главная функция"""
+    from config import (
+        BENCH_LISTINGS, BENCH_LATENCY, BENCH_JITTER, BENCH_BANDWIDTH, BENCH_CARD_BYTES,
+        BENCH_LISTING_BYTES, BENCH_RESULTS_PATH, LISTING_PAGE_CAP
+    )
+
+    arg_parser = argparse.ArgumentParser(description="Сравнение движков парсера на локальном стенде")
+    arg_parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    arg_parser.add_argument('--listings', type=int, default=BENCH_LISTINGS, help="Объявлений в выдаче стенда")
+    arg_parser.add_argument('--latency', type=float, default=BENCH_LATENCY, help="Задержка ответа, сек")
+    arg_parser.add_argument('--jitter', type=float, default=BENCH_JITTER, help="Разброс задержки, сек")
+    arg_parser.add_argument('--bandwidth', type=float, default=BENCH_BANDWIDTH, help="Байт/сек на ответ")
+    arg_parser.add_argument('--card-bytes', type=int, default=BENCH_CARD_BYTES)
+    arg_parser.add_argument('--listing-bytes', type=int, default=BENCH_LISTING_BYTES)
+    arg_parser.add_argument('--page-cap', type=int, default=LISTING_PAGE_CAP, help="Страниц на запрос выдачи")
+    arg_parser.add_argument('--concurrency', type=int, default=None, help="Потоков / одновременных запросов")
+    arg_parser.add_argument('--rate-limit', action='store_true', help="Не отключать RATE_LIMIT")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="Прогонов каждого движка")
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--output', default=BENCH_RESULTS_PATH, help="Файл результатов (JSONL)")
+    arg_parser.add_argument('--verbose', action='store_true', help="Показывать вывод движков")
+    # ✅ Служебный режим: прогон одного движка в дочернем процессе
+    arg_parser.add_argument('--child', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--url', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        result = run_engine(args.child, args.url, args.workdir, args.concurrency, args.rate_limit)
+        with open(os.path.join(args.workdir, 'result.json'), 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return
+
+    from benchmarks.fixtures import FixtureCorpus
+    from benchmarks.stand import Stand
+
+    corpus = FixtureCorpus(
+        size=args.listings, seed=args.seed, card_bytes=args.card_bytes,
+        listing_bytes=args.listing_bytes, page_cap=args.page_cap
+    )
+    params = {
+        'listings': args.listings, 'latency': args.latency, 'jitter': args.jitter,
+        'bandwidth': args.bandwidth, 'card_bytes': args.card_bytes, 'listing_bytes': args.listing_bytes,
+        'page_cap': args.page_cap, 'concurrency': args.concurrency, 'rate_limit': args.rate_limit,
+        'seed': args.seed,
+    }
+    run_info = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': code_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    results = []
+
+    with Stand(corpus, latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth, seed=args.seed) as stand:
+        print(f"🧪 Стенд {stand.base_url}: {len(corpus)} объявлений, задержка {args.latency * 1000:.0f} мс")
+        for engine in args.engines:
+            for attempt in range(args.repeat):
+                stand.reset_stats()
+                print(f"▶️  {engine} ({attempt + 1}/{args.repeat})...", flush=True)
+                with tempfile.TemporaryDirectory() as workdir:
+                    command = [
+                        sys.executable, '-m', 'benchmarks.run', '--child', engine,
+                        '--url', stand.listing_url, '--workdir', workdir,
+                    ]
+                    if args.concurrency:
+                        command += ['--concurrency', str(args.concurrency)]
+                    if args.rate_limit:
+                        command.append('--rate-limit')
+                    log_path = os.path.join(workdir, 'engine.log')
+                    with open(log_path, 'w', encoding='utf-8') as log:
+                        completed = subprocess.run(
+                            command, env={**os.environ, 'PYTHONIOENCODING': 'utf-8'},
+                            stdout=None if args.verbose else log, stderr=subprocess.STDOUT
+                        )
+                    if completed.returncode != 0:
+                        if not args.verbose:
+                            with open(log_path, encoding='utf-8') as log:
+                                print(log.read()[-3000:])
+                        print(f"❌ {engine}: код выхода {completed.returncode}")
+                        continue
+                    with open(os.path.join(workdir, 'result.json'), encoding='utf-8') as f:
+                        result = json.load(f)
+
+                wall = result['wall_seconds']
+                results.append({
+                    **run_info,
+                    'engine': engine,
+                    'attempt': attempt + 1,
+                    'params': params,
+                    **result,
+                    'expected': len(corpus),
+                    'listings_per_sec': round(result['records'] / wall, 2) if wall else None,
+                    'requests': {'listing': stand.stats['listing'], 'card': stand.stats['card']},
+                    'aborted_responses': stand.stats['aborted'],
+                    'bytes_sent': stand.stats['bytes'],
+                    'latency_ms': percentiles(stand.latencies),
+                })
+
+    if not results:
+        return
+    print_results(results)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'a', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    print(f"📁 Результаты дописаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Локальный HTTP-стенд вместо auto.ru с настраиваемой задержкой и скоростью"""
+
+import asyncio
+import random
+import threading
+import time
+
+from aiohttp import web
+
+from benchmarks.fixtures import FixtureCorpus
+from config import BENCH_LATENCY, BENCH_JITTER, BENCH_BANDWIDTH, REGION, MAX_PRICE
+
+
+class Stand:
+    """aiohttp-сервер в фоновом потоке, отдающий страницы FixtureCorpus
+
+    Каждый ответ задерживается на ``latency`` (± ``jitter``) и отдаётся
+    кусками со скоростью ``bandwidth`` байт/сек. Стенд считает запросы,
+    реально отправленные байты (клиент может закрыть соединение раньше) и
+    время ответа: от приёма запроса до последнего отправленного байта.
+    """
+
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self, corpus=None, latency=BENCH_LATENCY, jitter=BENCH_JITTER,
+                 bandwidth=BENCH_BANDWIDTH, host='127.0.0.1', port=0, seed=1):
+        """Инициализация Stand
+
+        Args:
+            corpus (FixtureCorpus): Страницы стенда (по умолчанию - с настройками config)
+            latency (float): Задержка перед ответом (в секундах)
+            jitter (float): Случайный разброс задержки (в секундах)
+            bandwidth (float): Скорость отдачи одного ответа (байт/сек, None - без ограничения)
+            host (str): Адрес
+            port (int): Порт (0 - любой свободный)
+            seed (int): Зерно разброса задержки
+        """
+        self.corpus = corpus if corpus is not None else FixtureCorpus()
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.loop = None
+        self.runner = None
+        self.thread = None
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def listing_url(self):
+        """URL выдачи для BASE_URL_TEMPLATE"""
+        return f"{self.base_url}/{REGION}/cars/all/?price_to={MAX_PRICE}"
+
+    def reset_stats(self):
+        """Обнулить счётчики (перед прогоном следующего движка)"""
+        self.stats = {'listing': 0, 'card': 0, 'not_found': 0, 'aborted': 0, 'bytes': 0}
+        self.latencies = []
+
+    # ==================== HANDLERS ====================
+    async def listing(self, request):
+        body = self.corpus.listing_page(self.base_url, request.path, request.query)
+        self.stats['listing'] += 1
+        return await self.respond(request, body)
+
+    async def card(self, request):
+        try:
+            sale_id = int(request.match_info['sale'].split('-', 1)[0])
+        except ValueError:
+            sale_id = None
+        body = self.corpus.card_page(sale_id)
+        if body is None:
+            self.stats['not_found'] += 1
+            raise web.HTTPNotFound()
+        self.stats['card'] += 1
+        return await self.respond(request, body)
+
+    async def respond(self, request, body):
+        """Отдать тело с задержкой и ограничением скорости"""
+        started = time.monotonic()
+        delay = self.latency + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8'})
+        response.content_length = len(body)
+        await response.prepare(request)
+        sent = 0
+        try:
+            for offset in range(0, len(body), self.CHUNK_SIZE):
+                chunk = body[offset:offset + self.CHUNK_SIZE]
+                await response.write(chunk)
+                sent += len(chunk)
+                if self.bandwidth:
+                    await asyncio.sleep(len(chunk) / self.bandwidth)
+            await response.write_eof()
+        except ConnectionError:
+            # ✅ Клиент закрыл соединение, дочитав нужное (потоковый разбор)
+            self.stats['aborted'] += 1
+        finally:
+            self.stats['bytes'] += sent
+            self.latencies.append(time.monotonic() - started)
+        return response
+
+    # ==================== LIFECYCLE ====================
+    def start(self):
+        """Запустить сервер в фоновом потоке
+
+        Returns:
+            str: Базовый URL стенда
+        """
+        app = web.Application()
+        app.router.add_get('/cars/used/sale/{brand}/{model}/{sale}/', self.card)
+        app.router.add_get('/{region}/cars/all/', self.listing)
+
+        self.loop = asyncio.new_event_loop()
+        self.runner = web.AppRunner(app, access_log=None)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, self.host, self.port, backlog=1024)
+        self.loop.run_until_complete(site.start())
+        self.port = self.runner.addresses[0][1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        """Остановить сервер"""
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+        self.loop.close()
+        self.loop = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -22,6 +22,21 @@ REGION = 'moskva'
 # Используется для сбора ВСЕ объявлений в регионе до 1000000 руб
 BASE_URL_TEMPLATE = f"https://auto.ru/{REGION}/cars/all/?price_to={MAX_PRICE}"
 
+# ==================== QUERY PLANNER ====================
+# Сайт отдаёт ограниченное число страниц на один запрос, поэтому выдача
+# режется на срезы по цене (и году), каждый из которых помещается в лимит
+QUERY_PLANNER = True
+
+# Сколько страниц сайт отдаёт на один запрос
+LISTING_PAGE_CAP = 99
+
+# Нижняя граница года выпуска при разбиении по году
+QUERY_YEAR_MIN = 1960
+
+# Сколько раз повторять неудавшийся замер среза (капча, ошибка сети);
+# не замерили и после повторов - от среза берётся одна страница
+QUERY_PROBE_RETRIES = 2
+
 # ==================== SELENIUM SETTINGS ====================
 # Путь к ChromeDriver
 CHROMEDRIVER_PATH = "./chromedriver.exe"
@@ -39,16 +54,158 @@ REQUEST_TIMEOUT = 3
 # User Agent для requests
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
-# ==================== PARSER DELAYS ====================
-# Задержка между загрузкой страниц (в секундах)
-PAGE_LOAD_DELAY = 0.3
+# Потоковый разбор деталей (async): тело читается кусками и соединение
+# закрывается, как только запись готова: из JSON-состояния (USE_PAGE_STATE)
+# или из DOM, когда найдены поля STREAM_REQUIRED_FIELDS. Прочитанная часть сохраняется
+# в HTTP-кэш с пометкой "неполное тело"
+STREAM_PARSE = True
+
+# Размер куска при потоковом чтении (в байтах)
+STREAM_CHUNK_SIZE = 16384
+
+# Поля, без которых DOM-разбор не обрывает чтение. Состояния ('condition')
+# на многих карточках нет - если ждать и его, страница дочитывается до конца;
+# оно добирается из уже прочитанной части (позиционный запасной вариант)
+STREAM_REQUIRED_FIELDS = (
+    'title', 'year', 'mileage', 'owners', 'transmission', 'engine', 'date_posted', 'views', 'price'
+)
+
+# Процессов для разбора страниц в async-парсере (0 = разбор в event loop)
+PARSE_PROCESSES = 0
+
+# Документов в одной пачке для пула процессов (амортизация IPC)
+PARSE_BATCH_SIZE = 8
+
+# Максимальное ожидание неполной пачки (в секундах)
+PARSE_FLUSH_INTERVAL = 0.05
+
+# ==================== HTTP CACHE ====================
+# Постоянный кэш страниц объявлений между запусками (crawler/http_cache.py)
+HTTP_CACHE_ENABLED = True
+
+# Файл кэша (SQLite, тела сжаты zlib)
+HTTP_CACHE_PATH = 'cache/http_cache.sqlite'
+
+# Максимальный размер кэша (в байтах), сверх - вытеснение LRU
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Сколько секунд запись считается свежей (без запроса к сайту);
+# после - условный запрос с If-None-Match / If-Modified-Since
+HTTP_CACHE_TTL = 3600
+
+# ==================== INCREMENTAL MODE ====================
+# Скачивать детали только для новых объявлений и тех, у кого истёк REFRESH_INTERVAL
+INCREMENTAL_MODE = False
+
+# Файл истории объявлений (SQLite)
+SEEN_STORE_PATH = 'cache/seen_listings.sqlite'
+
+# Через сколько секунд детали уже известного объявления скачиваются повторно
+REFRESH_INTERVAL = 24 * 3600
+
+# ==================== DEDUPE ====================
+# Объявления сравниваются по числовому ID из URL: каждое скачивается один раз
+# за запуск, даже если встретилось на нескольких страницах выдачи.
+# Bloom-фильтр истории: объявления, скачанные в прошлых запусках, пропускаются
+# (None = выключено; в отличие от INCREMENTAL_MODE - без повторного обновления)
+DEDUPE_BLOOM_PATH = None
+
+# Ожидаемое количество объявлений в истории и доля ложных срабатываний
+# (ложное срабатывание = пропущенное новое объявление)
+DEDUPE_BLOOM_CAPACITY = 2_000_000
+DEDUPE_BLOOM_ERROR_RATE = 0.001
+
+# ==================== ADAPTIVE CONCURRENCY ====================
+# Асинхронный парсер сам подбирает число одновременных запросов (AIMD):
+# растит, пока ответы быстрые, и снижает при 429, таймаутах и капче
+ADAPTIVE_CONCURRENCY = True
+
+# Границы лимита одновременных запросов к объявлениям
+ADAPTIVE_MIN_CONCURRENCY = 2
+ADAPTIVE_MAX_CONCURRENCY = 64
+
+# Снижать лимит, если средняя задержка выросла во столько раз относительно лучшей
+ADAPTIVE_LATENCY_FACTOR = 2.0
+
+# Не снижать лимит чаще, чем раз в столько секунд
+ADAPTIVE_COOLDOWN = 1.0
+
+# ==================== RETRY SCHEDULER ====================
+# Неудачные запросы (429/503, 5xx, таймауты) повторяются из отложенной
+# очереди, а не сном внутри загрузки
+RETRY_MAX_ATTEMPTS = 4
+
+# Повторов за весь запуск (защита от бесконечных повторов при блокировке)
+RETRY_MAX_TOTAL = 2000
+
+# Экспоненциальная задержка: случайно от 0 до min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^попытка)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Максимальное ожидание по заголовку Retry-After (в секундах)
+RETRY_AFTER_MAX = 300.0
+
+# ==================== DISTRIBUTED ====================
+# Координатор и воркеры (auto_parser_distributed.py) делят файл очереди
+# заданий. Для нескольких машин положите его на общий диск и выключите WAL.
+JOBS_PATH = 'cache/jobs.sqlite'
+JOBS_WAL = True
+
+# Срок аренды задания (сек): воркер продлевает её, пока работает;
+# задание умершего воркера через этот срок получит другой
+JOB_LEASE_SECONDS = 60
+
+# Сколько раз задание можно выдать, прежде чем считать его проваленным
+JOB_MAX_ATTEMPTS = 3
+
+# Размер заданий: страниц выдачи / URL объявлений
+LISTING_JOB_PAGES = 5
+DETAIL_JOB_SIZE = 50
+
+# Сколько заданий воркер выполняет одновременно и как часто опрашивает очередь
+WORKER_JOB_SLOTS = 2
+WORKER_POLL_INTERVAL = 1.0
+
+# ==================== CHECKPOINT ====================
+# Сохранять прогресс запуска (страницы, ссылки), чтобы продолжить его с --resume
+CHECKPOINT_ENABLED = True
+
+# Файл контрольной точки (SQLite)
+CHECKPOINT_PATH = 'cache/checkpoint.sqlite'
+
+# ==================== RATE LIMIT ====================
+# Общий лимит запросов к сайту (token bucket) для всех движков, потоков и
+# корутин - вместо фиксированных пауз запрос ждёт ровно столько, сколько
+# требует бюджет. Ответ 429/503 с Retry-After останавливает корзину хоста
+# целиком, так что паузу выдерживают все потоки разом. Фиксированных пауз в
+# движках больше нет - выключенный лимит снимает с них всякий потолок частоты
+RATE_LIMIT_ENABLED = True
+
+# Запросов в секунду к одному хосту (консервативно: у старого синхронного
+# движка с паузой 0.5 сек было около 2)
+RATE_LIMIT_RPS = 4.0
+
+# Сколько запросов подряд можно сделать без ожидания
+RATE_LIMIT_BURST = 8
 
-# Задержка между загрузкой объявлений (в секундах)
-CAR_LOAD_DELAY = 0.0
+# Свои лимиты для отдельных хостов: {'auto.ru': (rps, burst)}
+RATE_LIMIT_HOSTS = {}
 
-# Задержка между страницами при сборе ссылок (в секундах)
-PAGINATION_DELAY = 0.0
+# ==================== METRICS ====================
+# Гистограммы длительности стадий (dns, connect, ttfb, download, parse,
+# extract, export), запросов по коду ответа и счётчики ошибок
+METRICS_ENABLED = True
 
+# Порт эндпоинта /metrics в формате Prometheus (None - не поднимать, например 9108)
+METRICS_PORT = None
+
+# Адрес эндпоинта (0.0.0.0 - доступен снаружи)
+METRICS_HOST = '127.0.0.1'
+
+# Границы корзин гистограмм (в секундах)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# ==================== PARSER DELAYS ====================
 # Подключение к пулу (в секундах)
 CONNECTION_POOL_TIMEOUT = 1
 
@@ -85,6 +242,22 @@ CHROME_ARGS = [
     '--disable-sync-preferences',
 ]
 
+# ==================== LISTING (HTTP) ====================
+# Количество одновременных запросов при сборе ссылок без браузера
+LISTING_CONCURRENCY = NUM_THREADS
+
+# Конвейер: детали объявлений парсятся, пока ещё собираются страницы выдачи
+PIPELINE_MODE = True
+
+# Размер очереди ссылок между стадиями конвейера (backpressure)
+LINK_QUEUE_SIZE = 500
+
+# Сколько секунд после Ctrl-C ждать завершения уже начатых запросов
+SHUTDOWN_GRACE = 5.0
+
+# Маркеры капчи в ответе (такие страницы добираются через Selenium)
+CHALLENGE_MARKERS = (b'showcaptcha', b'SmartCaptcha', b'checkcaptcha')
+
 # ==================== PAGINATION ====================
 # XPath для ссылок на объявления
 CAR_LINK_XPATH = '//a[contains(@href, "/cars/used/sale/")]'
@@ -93,18 +266,128 @@ CAR_LINK_XPATH = '//a[contains(@href, "/cars/used/sale/")]'
 PAGINATION_XPATH = '//div[@class="Pagination__item"]/text()'
 
 # ==================== CAR DETAILS ====================
-# Locators для деталей объявлений
-CAR_DETAIL_LOCATORS = {
-    'title': '//h1[@class="CardHead__title"]/text()',
-    'year': '(//a[@class="Link Link_color_black"]/text())[2]',
-    'mileage': '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[1]',
-    'owners': '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[2]',
-    'condition': '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[5]',
-    'transmission': '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[2]',
-    'engine': '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[1]',
-    'date_posted': '//div[@class="CardHead__infoItem CardHead__creationDate"]/text()',
-    'views': '//div[@class="CardHead__infoItem CardHead__views"]/text()',
-    'price': '//span[@class="OfferPriceCaption__price"]/text()',
+# Декларативная таблица полей объявления. Порядок строк = порядок колонок.
+# Для каждого поля элементы цепочки пробуются по очереди (fallback):
+#   'xpath'          - отдельное XPath-выражение
+#   ('source', i)    - i-й элемент общего набора из CAR_DETAIL_SOURCES
+#                      (набор вычисляется один раз на страницу для всех полей)
+# Все выражения компилируются один раз в pages/extraction.py.
+#   type:    'text' - строка, 'digits' - только цифры, 'int' - число
+#   min_len: минимальная длина подходящего значения
+# Движок извлечения для get_car_data():
+#   'single_pass' - один обход DOM с диспетчеризацией по class (быстрее)
+#   'xpath'       - цепочки скомпилированных XPath из таблицы ниже
+EXTRACTION_ENGINE = 'single_pass'
+
+CAR_DETAIL_SOURCES = {
+    'black_links': '//a[@class="Link Link_color_black"]/text()',
+    'simple_row': '//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text()',
+    'complex_row': '//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text()',
+    'head_info': '//div[@class="CardHead__info"]/div/text()',
+}
+
+CAR_DETAIL_FIELDS = [
+    {
+        'field': 'title', 'column': 'Марка', 'type': 'text', 'default': 'N/A',
+        'xpaths': ['//h1[@class="CardHead__title"]/text()'],
+    },
+    {
+        'field': 'year', 'column': 'Год выпуска', 'type': 'text', 'default': 'N/A',
+        'xpaths': [('black_links', 1)],
+    },
+    {
+        'field': 'mileage', 'column': 'Пробег', 'type': 'text', 'default': 'N/A',
+        'xpaths': [('simple_row', 0)],
+    },
+    {
+        'field': 'owners', 'column': 'Владельцы', 'type': 'text', 'default': 'N/A',
+        'xpaths': [('simple_row', 1)],
+    },
+    {
+        'field': 'condition', 'column': 'Состояние', 'type': 'text', 'default': 'N/A',
+        'xpaths': [
+            '//div[contains(@class, "CardInfoSummarySimpleRow")]//text()[contains(., "Исправн") or contains(., "Деформ") or contains(., "Битые") or contains(., "Перекр")]',
+            '//span[contains(text(), "Исправн") or contains(text(), "Деформ") or contains(text(), "Битые") or contains(text(), "Перекр")]/text()',
+            '//span[contains(., "Исправн") or contains(., "Деформ") or contains(., "Битые") or contains(., "Перекр")]/text()',
+            ('simple_row', 2),
+            ('simple_row', 3),
+        ],
+    },
+    {
+        'field': 'transmission', 'column': 'Коробка', 'type': 'text', 'default': 'N/A',
+        'xpaths': [('complex_row', 1)],
+    },
+    {
+        'field': 'engine', 'column': 'Двигатель', 'type': 'text', 'default': 'N/A',
+        'xpaths': [('complex_row', 0)],
+    },
+    {
+        'field': 'date_posted', 'column': 'Дата объявления', 'type': 'text', 'default': 'N/A', 'min_len': 4,
+        'xpaths': [
+            '//div[contains(@class, "CardHead__creationDate")]/text()',
+            '//span[contains(text(), "Объавлено")]/following-sibling::text()',
+            ('head_info', 0),
+        ],
+    },
+    {
+        'field': 'views', 'column': 'Количество просмотров', 'type': 'digits', 'default': '0',
+        'xpaths': [
+            '//div[contains(@class, "CardHead__views")]/text()',
+            '//span[contains(text(), "Просмотр")]/preceding-sibling::text()',
+            '//div[contains(text(), "просмотр")]/preceding-sibling::text()',
+            ('head_info', 1),
+        ],
+    },
+    {
+        'field': 'price', 'column': 'Цена', 'type': 'int', 'default': 0,
+        'xpaths': ['//span[@class="OfferPriceCaption__price"]/text()'],
+    },
+]
+
+# ==================== PAGE STATE (JSON) ====================
+# Карточка auto.ru содержит данные объявления в JSON внутри <script>.
+# Если блок найден, поля берутся из него (без построения DOM), иначе -
+# обычное извлечение из DOM (pages/extraction.py).
+USE_PAGE_STATE = True
+
+# Байтовые маркеры тега <script> с состоянием страницы
+PAGE_STATE_MARKERS = (b'id="initial-state"', b"id='initial-state'")
+
+# Поле -> (тип, пути в JSON). Пути пробуются по очереди, берётся первый непустой.
+#   int     - целое число           join   - склеить все найденные значения
+#   enum    - перевод через CAR_STATE_ENUMS
+#   date_ms - timestamp в миллисекундах -> дата
+#   engine  - [объём см3, мощность л.с., тип топлива] -> "1.6 л / 102 л.с. / Бензин"
+CAR_STATE_FIELDS = {
+    'title': ('join', ['card.vehicle_info.mark_info.name', 'card.vehicle_info.model_info.name']),
+    'year': ('int', ['card.documents.year']),
+    'mileage': ('int', ['card.state.mileage']),
+    'owners': ('int', ['card.documents.owners_number']),
+    'condition': ('enum', ['card.state.condition']),
+    'transmission': ('enum', ['card.vehicle_info.tech_param.transmission']),
+    'engine': ('engine', [
+        'card.vehicle_info.tech_param.displacement',
+        'card.vehicle_info.tech_param.power',
+        'card.vehicle_info.tech_param.engine_type',
+    ]),
+    'date_posted': ('date_ms', ['card.additional_info.creation_date']),
+    'views': ('int', ['card.counters.all', 'card.additional_info.views']),
+    'price': ('int', ['card.price_info.RUR', 'card.price_info.price']),
+}
+
+# Перевод значений-перечислений из JSON в текст, как на странице
+CAR_STATE_ENUMS = {
+    'AUTOMATIC': 'автоматическая',
+    'MECHANICAL': 'механическая',
+    'ROBOT': 'роботизированная',
+    'VARIATOR': 'вариатор',
+    'GASOLINE': 'Бензин',
+    'DIESEL': 'Дизель',
+    'HYBRID': 'Гибрид',
+    'ELECTRO': 'Электро',
+    'LPG': 'Газ',
+    'CONDITION_OK': 'Не требует ремонта',
+    'BEATEN': 'Битый / не на ходу',
 }
 
 # ==================== EXCEL EXPORT ====================
@@ -112,16 +395,33 @@ CAR_DETAIL_LOCATORS = {
 EXPORT_COLUMNS = [
     'Марка',
     'Год выпуска',
-    'Пробег',
+    'Пробег, км',
     'Владельцы',
     'Состояние',
     'Коробка',
-    'Двигатель',
+    'Объём двигателя, л',
+    'Мощность, л.с.',
+    'Топливо',
     'Дата объявления',
     'Количество просмотров',
     'Цена'
 ]
 
+# Потоковое хранилище результатов: 'jsonl', 'csv', 'parquet' или 'dataset' (нужен pyarrow)
+# Файл создаётся рядом с OUTPUT_FILENAME (auto_ru_cars_all.jsonl и т.д.),
+# 'dataset' - каталог auto_ru_cars_all_dataset/crawl_date=YYYY-MM-DD/...
+SINK_FORMAT = 'jsonl'
+
+# 'dataset': дополнительно разбивать по марке (brand=toyota/...)
+DATASET_PARTITION_BY_BRAND = False
+
+# Писать итоговый Excel (xlsx медленный и ограничен ~1M строк;
+# при False данные остаются только в потоковом хранилище)
+EXCEL_EXPORT = True
+
+# Сколько записей копить в памяти перед сбросом на диск
+SINK_BATCH_SIZE = 100
+
 # Формат даты для Excel
 DATE_FORMAT = '%d.%m.%Y'
 
@@ -137,3 +437,59 @@ CONNECTION_POOL_MAXSIZE = 20
 
 # Повторные попытки подключения
 RETRIES = 3
+
+# ==================== PROFILING ====================
+# Профилирование запуска (флаги --profile / --profile-memory у main()).
+# Отчёты пишутся рядом с OUTPUT_FILENAME.
+# CPU: 'sample' - сэмплы стеков всех потоков (~1% накладных расходов,
+# файл .cpu.collapsed для flamegraph), 'cprofile' - точный, но медленный
+# (только основной поток), None - выключено
+PROFILE_MODE = None
+
+# Память по фазам запуска: 'sample' - RSS процесса на каждом сэмпле
+# (почти бесплатно, можно в рабочем запуске; разбивка по стадиям
+# приблизительная), 'trace' - tracemalloc (точно по строкам, но замедляет
+# каждое выделение памяти - для диагностики), None - выключено
+PROFILE_MEMORY = None
+
+# Интервал сэмплов стеков и RSS (в секундах)
+PROFILE_INTERVAL = 0.01
+
+# Глубина стека tracemalloc: глубже - точнее разбивка по стадиям, но
+# каждое выделение памяти дороже (25 рамок медленнее 5 в несколько раз)
+PROFILE_TRACEMALLOC_FRAMES = 5
+
+# Строк в отчёте о памяти
+PROFILE_TOP = 25
+
+# ==================== BENCHMARK ====================
+# Локальный стенд для сравнения движков (python -m benchmarks)
+# Объявлений в синтетической выдаче стенда
+BENCH_LISTINGS = 1000
+
+# Задержка ответа стенда и случайный разброс (в секундах)
+BENCH_LATENCY = 0.05
+BENCH_JITTER = 0.02
+
+# Скорость отдачи одного ответа (байт/сек, None = без ограничения)
+BENCH_BANDWIDTH = None
+
+# Размер страниц стенда (в байтах, примерно как у настоящих страниц auto.ru)
+BENCH_CARD_BYTES = 300 * 1024
+BENCH_LISTING_BYTES = 600 * 1024
+
+# Объявлений, поднятых на каждую страницу выдачи (повторы для дедупликации)
+BENCH_PROMOTED = 3
+
+# Файл результатов (JSONL, одна строка на прогон движка)
+BENCH_RESULTS_PATH = 'benchmarks/results.jsonl'
+
+# Микро-бенчмарки извлечения (python -m benchmarks.extraction):
+# каталог сохранённых страниц (cards/*.html, listings/*.html)
+BENCH_CORPUS_PATH = 'benchmarks/corpus'
+
+# Повторов каждого замера (берётся лучший - меньше всего шума)
+BENCH_ROUNDS = 5
+
+# Сравнение с базой: во сколько раз замедление считается регрессией (0.10 = +10%)
+BENCH_REGRESSION_THRESHOLD = 0.10
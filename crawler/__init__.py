@@ -0,0 +1,54 @@
+"""Инфраструктура краулера auto.ru (хранилища, сетевые утилиты)"""
+
+from crawler.records import CarRecord, Vocabulary
+from crawler.normalize import normalize_frame, parse_dates, sort_by_date
+from crawler.sinks import (
+    ResultSink, JsonlSink, CsvSink, ParquetSink, ParquetDatasetSink, create_sink, read_dataset
+)
+from crawler.parse_pool import ParsePool
+from crawler.http_cache import HttpCache, get_http_cache
+from crawler.dedupe import ListingIndex, BloomFilter, sale_key
+from crawler.seen_store import SeenStore
+from crawler.checkpoint import Checkpoint
+from crawler.concurrency import AdaptiveLimiter
+from crawler.rate_limit import TokenBucket, RateLimiter, get_rate_limiter
+from crawler.retry import RetryScheduler, parse_retry_after
+from crawler.jobs import JobStore
+from crawler.metrics import MetricsRegistry, REGISTRY, start_server, print_summary
+from crawler.profiling import Profiler, StackSampler
+
+__all__ = [
+    'CarRecord',
+    'Vocabulary',
+    'normalize_frame',
+    'parse_dates',
+    'sort_by_date',
+    'ResultSink',
+    'JsonlSink',
+    'CsvSink',
+    'ParquetSink',
+    'ParquetDatasetSink',
+    'create_sink',
+    'read_dataset',
+    'ParsePool',
+    'HttpCache',
+    'get_http_cache',
+    'ListingIndex',
+    'BloomFilter',
+    'sale_key',
+    'SeenStore',
+    'Checkpoint',
+    'AdaptiveLimiter',
+    'TokenBucket',
+    'RateLimiter',
+    'get_rate_limiter',
+    'RetryScheduler',
+    'parse_retry_after',
+    'JobStore',
+    'MetricsRegistry',
+    'REGISTRY',
+    'start_server',
+    'print_summary',
+    'Profiler',
+    'StackSampler'
+]
@@ -0,0 +1,199 @@
+"""Контрольные точки запуска для продолжения прерванного парсинга (SQLite)"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import CHECKPOINT_PATH
+
+
+class Checkpoint:
+    """Прогресс текущего запуска
+
+    Хранит количество страниц выдачи, уже собранные страницы со ссылками
+    (фронтир), страницы с ошибками и объявления, обработанные без записи.
+    Уже извлечённые записи лежат в хранилище результатов (ResultSink) -
+    при продолжении оно открывается в режиме дозаписи, а готовые URL
+    берутся прямо из него. Поэтому запись, не успевшая попасть на диск,
+    просто будет скачана ещё раз.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)',
+        'CREATE TABLE IF NOT EXISTS pages (page INTEGER PRIMARY KEY, status TEXT NOT NULL)',
+        '''CREATE TABLE IF NOT EXISTS links (
+            url TEXT PRIMARY KEY,
+            page INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            finished INTEGER NOT NULL DEFAULT 0
+        )''',
+    )
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        """Инициализация Checkpoint
+
+        Args:
+            path (str): Файл SQLite
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.resumed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    # ==================== META ====================
+    def _get_meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, str(value)))
+
+    def start(self, base_url, resume=False):
+        """Начать запуск: продолжить сохранённый или начать заново
+
+        Args:
+            base_url (str): URL выдачи (продолжить можно только тот же поиск)
+            resume (bool): Продолжить прерванный запуск
+
+        Returns:
+            bool: True, если прогресс прошлого запуска подхвачен
+        """
+        with self.lock:
+            saved_url = self._get_meta('base_url')
+            finished = self._get_meta('completed') == '1'
+
+            if resume and saved_url == base_url and not finished:
+                self.resumed = True
+                pages = self.conn.execute("SELECT COUNT(*) FROM pages WHERE status = 'done'").fetchone()[0]
+                links = self.conn.execute('SELECT COUNT(*) FROM links').fetchone()[0]
+                print(f"♻️  Продолжаю прошлый запуск: {pages} страниц, {links} ссылок уже собрано")
+                return True
+
+            if resume:
+                print("♻️  Незавершённого запуска нет - начинаю заново")
+
+            self.resumed = False
+            self.conn.execute('DELETE FROM meta')
+            self.conn.execute('DELETE FROM pages')
+            self.conn.execute('DELETE FROM links')
+            self._set_meta('base_url', base_url)
+            self._set_meta('started_at', time.time())
+            self.conn.commit()
+            return False
+
+    def finish(self):
+        """Запуск завершён полностью - следующий --resume начнёт заново"""
+        with self.lock:
+            self._set_meta('completed', 1)
+            self.conn.commit()
+
+    # ==================== PAGES ====================
+    @property
+    def total_pages(self):
+        """Количество страниц выдачи (None, если ещё не определено)"""
+        with self.lock:
+            value = self._get_meta('total_pages')
+        return int(value) if value is not None else None
+
+    def set_total_pages(self, total_pages, plan=None):
+        """Запомнить количество страниц выдачи
+
+        Args:
+            total_pages (int): Страниц (сквозная нумерация)
+            plan (list): Срезы выдачи (``plan_state()`` листинга), если она разбита
+        """
+        with self.lock:
+            self._set_meta('total_pages', total_pages)
+            if plan is not None:
+                self._set_meta('plan', json.dumps(plan))
+            self.conn.commit()
+
+    @property
+    def plan(self):
+        """Срезы выдачи прошлого запуска (None, если выдача не разбивалась)"""
+        with self.lock:
+            value = self._get_meta('plan')
+        return json.loads(value) if value is not None else None
+
+    def remaining_pages(self, total_pages):
+        """Страницы, которые ещё не собраны (включая страницы с ошибками)"""
+        with self.lock:
+            done = {row[0] for row in self.conn.execute("SELECT page FROM pages WHERE status = 'done'")}
+        return [page for page in range(1, total_pages + 1) if page not in done]
+
+    def save_page(self, page, links):
+        """Страница выдачи собрана - сохранить её ссылки"""
+        self.save_pages({page: links})
+
+    def save_pages(self, links_by_page):
+        """Сохранить несколько собранных страниц одной транзакцией
+
+        Args:
+            links_by_page (dict): {номер страницы: список ссылок}
+        """
+        with self.lock:
+            for page, links in links_by_page.items():
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO links (url, page, position) VALUES (?, ?, ?)',
+                    [(url, page, position) for position, url in enumerate(links)]
+                )
+                self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?)', (page, 'done'))
+            self.conn.commit()
+
+    def fail_pages(self, pages):
+        """Отметить страницы, которые пока не удалось собрать"""
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO pages VALUES (?, ?)', [(page, 'failed') for page in pages]
+            )
+            self.conn.commit()
+
+    # ==================== LINKS ====================
+    def frontier(self):
+        """Все собранные ссылки в порядке страниц"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT url FROM links ORDER BY page, position')]
+
+    def mark_finished(self, url):
+        """Объявление обработано, но записи нет (например, без цены) - не повторять"""
+        with self.lock:
+            self.conn.execute('UPDATE links SET finished = 1 WHERE url = ?', (url,))
+            self.conn.commit()
+
+    def completed_urls(self, sink):
+        """URL, по которым работа уже сделана: записи в хранилище + отмеченные
+
+        Args:
+            sink (ResultSink): Хранилище результатов (открыто в режиме дозаписи)
+
+        Returns:
+            set: Готовые URL
+        """
+        completed = set()
+        if self.resumed and sink.count:
+            df = sink.read_dataframe(columns=['URL'])
+            if 'URL' in df.columns:
+                completed.update(df['URL'].astype(str))
+        with self.lock:
+            completed.update(row[0] for row in self.conn.execute('SELECT url FROM links WHERE finished = 1'))
+        return completed
+
+    @staticmethod
+    def pending(links, completed):
+        """Оставить только ещё не обработанные ссылки"""
+        return [url for url in links if url not in completed]
+
+    def close(self):
+        """Закрыть базу"""
+        with self.lock:
+            self.conn.close()
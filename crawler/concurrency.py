@@ -0,0 +1,149 @@
+"""Адаптивное ограничение параллельности запросов (AIMD) для asyncio"""
+
+import asyncio
+import collections
+import time
+
+from config import (
+    ADAPTIVE_MIN_CONCURRENCY, ADAPTIVE_MAX_CONCURRENCY,
+    ADAPTIVE_LATENCY_FACTOR, ADAPTIVE_COOLDOWN
+)
+
+
+class AdaptiveLimiter:
+    """Лимит одновременных запросов, который подбирается сам
+
+    Работает как семафор (``async with limiter:``), но ёмкость меняется
+    по схеме AIMD:
+
+    - пока ответы быстрые и успешные, лимит растёт на ~1 за «окно»
+      (``+1 / limit`` на каждый успешный ответ);
+    - при 429/503, таймаутах, капче или росте задержки относительно
+      лучшей наблюдаемой лимит умножается на ``decrease`` - не чаще раза
+      в ``cooldown`` секунд, чтобы пачка одновременных ошибок не
+      обрушила его до минимума.
+
+    При ``min_limit == max_limit`` это обычный семафор фиксированного размера.
+    """
+
+    CONGESTION_REASONS = ('throttled', 'timeout', 'challenge', 'slow')
+    MIN_LATENCY_SLACK = 0.2  # ✅ Не считать «медленным» джиттер в пару десятков мс
+    HEALTHY_SUCCESS_RATE = 0.9
+
+    def __init__(self, initial, min_limit=ADAPTIVE_MIN_CONCURRENCY, max_limit=ADAPTIVE_MAX_CONCURRENCY,
+                 latency_factor=ADAPTIVE_LATENCY_FACTOR, cooldown=ADAPTIVE_COOLDOWN, decrease=0.5):
+        """Инициализация AdaptiveLimiter
+
+        Args:
+            initial (int): Начальный лимит
+            min_limit (int): Нижняя граница
+            max_limit (int): Верхняя граница
+            latency_factor (float): Во сколько раз задержка может превысить лучшую
+            cooldown (float): Минимальный интервал между снижениями (сек)
+            decrease (float): Множитель при снижении
+        """
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.decrease = decrease
+
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.latency = None  # ✅ Скользящее среднее задержки
+        self.baseline = None  # ✅ Лучшая наблюдаемая задержка
+        self.success_rate = 1.0
+        self.last_decrease = 0.0
+        self.peak = self.limit
+        self.stats = {'ok': 0, 'errors': 0, **{reason: 0 for reason in self.CONGESTION_REASONS}}
+
+    @property
+    def adaptive(self):
+        """Меняется ли лимит (False - фиксированный семафор)"""
+        return self.min_limit < self.max_limit
+
+    @property
+    def current(self):
+        """Текущий лимит (целое число слотов)"""
+        return int(self.limit)
+
+    # ==================== SLOTS ====================
+    async def acquire(self):
+        """Дождаться свободного слота"""
+        while self.in_flight >= self.current:
+            future = asyncio.get_running_loop().create_future()
+            self.waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future in self.waiters:
+                    self.waiters.remove(future)
+                self._wake()  # ✅ Передать пробуждение следующему
+                raise
+        self.in_flight += 1
+
+    def release(self):
+        """Освободить слот"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self.current - self.in_flight
+        while free > 0 and self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    # ==================== FEEDBACK ====================
+    def on_success(self, latency):
+        """Успешный ответ за ``latency`` секунд"""
+        self.stats['ok'] += 1
+        self.success_rate = self.success_rate * 0.9 + 0.1
+        self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+        self.baseline = latency if self.baseline is None else min(self.baseline, latency)
+
+        threshold = max(self.baseline * self.latency_factor, self.baseline + self.MIN_LATENCY_SLACK)
+        if self.latency > threshold:
+            self.on_congestion('slow')
+            return
+
+        if self.success_rate >= self.HEALTHY_SUCCESS_RATE and self.limit < self.max_limit:
+            # ✅ Аддитивный рост: примерно +1 слот за «окно» из limit ответов
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak = max(self.peak, self.limit)
+            self._wake()
+
+    def on_error(self):
+        """Ошибка, не связанная с перегрузкой (404, битый ответ)"""
+        self.stats['errors'] += 1
+        self.success_rate *= 0.9
+
+    def on_congestion(self, reason):
+        """Сигнал перегрузки: 'throttled', 'timeout', 'challenge' или 'slow'"""
+        self.stats[reason] += 1
+        if reason != 'slow':
+            self.success_rate *= 0.9
+
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        # ✅ Мультипликативное снижение
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+
+    # ==================== REPORT ====================
+    def print_stats(self):
+        """Вывести итог подбора параллельности"""
+        s = self.stats
+        print(f"🎚️  Параллельность: сейчас {self.current} | пик {int(self.peak)} | "
+              f"429/503 {s['throttled']} | таймаутов {s['timeout']} | капч {s['challenge']} | "
+              f"медленных ответов {s['slow']}")
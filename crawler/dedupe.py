@@ -0,0 +1,166 @@
+"""Дедупликация объявлений по числовому ID (за запуск и между запусками)"""
+
+import hashlib
+import math
+import os
+import struct
+import threading
+
+from config import DEDUPE_BLOOM_PATH, DEDUPE_BLOOM_CAPACITY, DEDUPE_BLOOM_ERROR_RATE
+
+
+def sale_key(url):
+    """Ключ объявления: ID из URL (или отрицательный хэш URL для нестандартных ссылок)
+
+    Returns:
+        int: Ключ, одинаковый для всех вариантов ссылки на одно объявление
+    """
+    from pages.listing_page import parse_sale_id  # ✅ pages сам импортирует crawler (rate_limit)
+
+    sale_id = parse_sale_id(url)
+    if sale_id is not None:
+        return sale_id
+    return -int.from_bytes(hashlib.blake2b(url.encode(), digest_size=7).digest(), 'big')
+
+
+class BloomFilter:
+    """Bloom-фильтр ключей объявлений, сохраняемый в файл между запусками
+
+    Занимает ``-n * ln(p) / ln(2)^2`` бит: 2 млн объявлений при доле ложных
+    срабатываний 0.1% - около 3.4 МБ. Ложное срабатывание значит, что новое
+    объявление будет пропущено, поэтому ``error_rate`` стоит держать малым.
+    """
+
+    MAGIC = b'BLM1'
+    HEADER = struct.Struct('<4sQI')
+
+    def __init__(self, path=None, capacity=DEDUPE_BLOOM_CAPACITY, error_rate=DEDUPE_BLOOM_ERROR_RATE):
+        """Инициализация BloomFilter
+
+        Args:
+            path (str): Файл фильтра (None - только в памяти)
+            capacity (int): Ожидаемое количество объявлений
+            error_rate (float): Допустимая доля ложных срабатываний
+        """
+        self.path = path
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = None
+        self.dirty = False
+
+        if path and os.path.exists(path):
+            self.load(path)
+        if self.bits is None:
+            self.bits = bytearray((self.size + 7) // 8)
+
+    def load(self, path):
+        """Прочитать фильтр (его размер берётся из файла, а не из настроек)"""
+        with open(path, 'rb') as f:
+            header = f.read(self.HEADER.size)
+            if len(header) != self.HEADER.size:
+                return
+            magic, size, hashes = self.HEADER.unpack(header)
+            bits = f.read()
+        if magic != self.MAGIC or len(bits) != (size + 7) // 8:
+            print(f"⚠️  Bloom-фильтр {path} повреждён - начинаю новый")
+            return
+        self.size, self.hashes, self.bits = size, hashes, bytearray(bits)
+
+    def _positions(self, key):
+        # ✅ Двойное хэширование: k позиций из одного blake2b
+        digest = hashlib.blake2b(key.to_bytes(8, 'little', signed=True), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.dirty = True
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self):
+        """Записать фильтр в файл (атомарно)"""
+        if not self.path or not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.size, self.hashes))
+            f.write(self.bits)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class ListingIndex:
+    """Глобальный индекс объявлений запуска
+
+    Одно и то же объявление попадает на несколько страниц выдачи
+    (поднятые объявления, сдвиг выдачи во время обхода) и встречается
+    под разными ссылками (с параметрами, другим регистром модели).
+    Индекс хранит только числовые ID (``set`` из int вместо строк URL)
+    и пропускает каждое объявление на скачивание один раз за запуск.
+
+    С ``bloom_path`` объявления, скачанные в прошлых запусках, тоже
+    пропускаются - лёгкая замена SeenStore для длинной истории, но без
+    повторного обновления устаревших объявлений.
+    """
+
+    def __init__(self, bloom_path=DEDUPE_BLOOM_PATH):
+        """Инициализация ListingIndex
+
+        Args:
+            bloom_path (str): Файл Bloom-фильтра истории (None - только текущий запуск)
+        """
+        self.ids = set()
+        self.lock = threading.Lock()
+        self.history = BloomFilter(bloom_path) if bloom_path else None
+        self.stats = {'unique': 0, 'duplicate': 0, 'history': 0}
+
+    def filter(self, urls):
+        """Отобрать ссылки на объявления, которые ещё не встречались
+
+        Args:
+            urls (list): Ссылки со страницы (или всех страниц)
+
+        Returns:
+            list: Ссылки в исходном порядке, по одной на объявление
+        """
+        fresh = []
+        keys = [sale_key(url) for url in urls]
+        with self.lock:
+            for url, key in zip(urls, keys):
+                if key in self.ids:
+                    self.stats['duplicate'] += 1
+                    continue
+                self.ids.add(key)
+                if self.history is not None and key in self.history:
+                    self.stats['history'] += 1
+                    continue
+                self.stats['unique'] += 1
+                fresh.append(url)
+        return fresh
+
+    def mark_fetched(self, url):
+        """Детали объявления скачаны (запоминается в истории)"""
+        if self.history is None:
+            return
+        key = sale_key(url)
+        with self.lock:
+            self.history.add(key)
+
+    def close(self):
+        """Сохранить историю"""
+        if self.history is not None:
+            with self.lock:
+                self.history.save()
+
+    def print_stats(self):
+        """Вывести статистику дедупликации"""
+        s = self.stats
+        history = f" | из прошлых запусков {s['history']}" if self.history is not None else ''
+        print(f"🧹 Дедупликация: уникальных {s['unique']} | повторов {s['duplicate']}{history}")
@@ -0,0 +1,287 @@
+"""Постоянный HTTP-кэш страниц объявлений (SQLite + zlib, LRU, TTL, ETag)"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import HTTP_CACHE_ENABLED, HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTL
+
+
+class CacheEntry:
+    """Запись кэша"""
+
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored_at', 'fresh', 'partial')
+
+    def __init__(self, url, body, etag, last_modified, stored_at, fresh, partial=False):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.fresh = fresh
+        self.partial = partial
+
+
+class HttpCache:
+    """Кэш ответов по URL с ограничением размера
+
+    - тела хранятся сжатыми (zlib);
+    - свежие записи (моложе ``ttl``) отдаются без запроса к сайту;
+    - для устаревших формируются условные заголовки
+      (If-None-Match / If-Modified-Since), ответ 304 продлевает запись;
+    - при превышении ``max_bytes`` удаляются давно не использованные (LRU);
+      время обращения при попадании не пишется сразу: отметки копятся и
+      уходят в базу вместе со следующей записью (или пачкой по
+      ``TOUCH_BATCH``), чтобы чтение из кэша не было коммитом;
+    - тело, дочитанное только до JSON-состояния, помечается как неполное:
+      его получают лишь те, кому хватает состояния (``allow_partial``),
+      для разбора DOM такая запись - промах;
+    - ошибка SQLite (например, "database is locked", когда файл делят
+      несколько процессов) не роняет запрос: поиск считается промахом,
+      запись пропускается, ошибка попадает в счётчик ``errors``.
+
+    Один экземпляр можно использовать из потоков и из asyncio.
+    """
+
+    TOUCH_BATCH = 256  # ✅ Отложенных LRU-отметок до принудительной записи
+    EVICT_BATCH = 64  # ✅ Кандидатов на вытеснение за один запрос
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            partial INTEGER NOT NULL DEFAULT 0
+        )
+    '''
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_BYTES, ttl=HTTP_CACHE_TTL):
+        """Инициализация HttpCache
+
+        Args:
+            path (str): Файл SQLite
+            max_bytes (int): Максимальный размер сжатых тел
+            ttl (int): Время свежести записи (в секундах)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.touched = {}  # ✅ url -> время последнего попадания (ещё не записано)
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0, 'errors': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(responses)')}
+        if 'partial' not in columns:
+            # ✅ Кэш прежней версии: все записи в нём - полные тела
+            self.conn.execute('ALTER TABLE responses ADD COLUMN partial INTEGER NOT NULL DEFAULT 0')
+        # ✅ Покрывающий индекс: сумма размеров и LRU-выборка не читают сами тела
+        self.conn.execute('DROP INDEX IF EXISTS responses_lru')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS responses_lru_size ON responses (last_access, size)')
+        self.conn.commit()
+        self.total_bytes = self._total_bytes()
+
+    # ==================== LOOKUP ====================
+    def lookup(self, url, allow_partial=False):
+        """Найти запись в кэше
+
+        Args:
+            url (str): URL
+            allow_partial (bool): Подходит ли тело, обрезанное после JSON-состояния
+
+        Returns:
+            CacheEntry | None: Запись (``fresh`` - можно не ходить в сеть)
+        """
+        now = time.time()
+        with self.lock:
+            try:
+                row = self.conn.execute(
+                    'SELECT body, etag, last_modified, stored_at, partial FROM responses WHERE url = ?', (url,)
+                ).fetchone()
+            except sqlite3.Error:
+                self._failed_locked()
+                return None
+            if row is None or (row[4] and not allow_partial):
+                self.stats['misses'] += 1
+                return None
+
+            self.touched[url] = now
+            if len(self.touched) >= self.TOUCH_BATCH:
+                self._commit_touched_locked()
+
+            body, etag, last_modified, stored_at, partial = row
+            fresh = now - stored_at < self.ttl
+            self.stats['hits' if fresh else 'stale'] += 1
+
+        return CacheEntry(url, zlib.decompress(body), etag, last_modified, stored_at, fresh, bool(partial))
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Заголовки условного запроса для устаревшей записи"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    # ==================== UPDATE ====================
+    def store(self, url, body, headers, partial=False):
+        """Сохранить ответ 200
+
+        Args:
+            url (str): URL
+            body (bytes): Тело ответа
+            headers: Заголовки ответа (requests / aiohttp)
+            partial (bool): Тело дочитано только до JSON-состояния
+        """
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self.lock:
+            self.touched.pop(url, None)  # ✅ Новая запись получит свежий last_access
+            try:
+                self._flush_touched_locked()
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO responses '
+                    '(url, body, size, etag, last_modified, stored_at, last_access, partial) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (url, compressed, len(compressed), headers.get('ETag'),
+                     headers.get('Last-Modified'), now, now, int(partial))
+                )
+                # ✅ Файл могут делить несколько процессов - размер считаем в этой же транзакции
+                self.total_bytes = self._total_bytes()
+                self.stats['stored'] += 1
+                self._evict_locked()
+                self.conn.commit()
+            except sqlite3.Error:
+                self._failed_locked()
+
+    def revalidated(self, url, headers=None):
+        """Сайт ответил 304 - запись снова свежая"""
+        now = time.time()
+        with self.lock:
+            etag = headers.get('ETag') if headers is not None else None
+            try:
+                if etag:
+                    self.conn.execute(
+                        'UPDATE responses SET stored_at = ?, last_access = ?, etag = ? WHERE url = ?',
+                        (now, now, etag, url)
+                    )
+                else:
+                    self.conn.execute(
+                        'UPDATE responses SET stored_at = ?, last_access = ? WHERE url = ?', (now, now, url)
+                    )
+                self.conn.commit()
+            except sqlite3.Error:
+                self._failed_locked()
+                return
+            self.stats['revalidated'] += 1
+
+    def flush(self):
+        """Записать отложенные отметки попаданий"""
+        with self.lock:
+            self._commit_touched_locked()
+
+    def _commit_touched_locked(self):
+        """Записать отложенные отметки отдельной транзакцией
+
+        При ошибке SQLite отметки теряются: это лишь порядок вытеснения.
+        """
+        if not self.touched:
+            return
+        try:
+            self._flush_touched_locked()
+            self.conn.commit()
+        except sqlite3.Error:
+            self._failed_locked()
+
+    def _flush_touched_locked(self):
+        """Отложенные LRU-отметки - одним executemany (commit - у вызывающего)"""
+        if self.touched:
+            touched, self.touched = self.touched, {}
+            self.conn.executemany(
+                'UPDATE responses SET last_access = ? WHERE url = ?',
+                [(when, url) for url, when in touched.items()]
+            )
+
+    def _failed_locked(self):
+        """Ошибка SQLite: откатить незавершённые изменения и продолжить без кэша"""
+        self.stats['errors'] += 1
+        try:
+            self.conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _total_bytes(self):
+        """Суммарный размер сжатых тел в базе (по покрывающему индексу)"""
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _evict_locked(self):
+        """Удалить давно не использованные записи до 90% лимита
+
+        Кандидаты выбираются пачками по ``EVICT_BATCH`` с LIMIT, а не всей
+        таблицей в память.
+        """
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        while self.total_bytes > target:
+            rows = self.conn.execute(
+                'SELECT rowid, size FROM responses ORDER BY last_access LIMIT ?', (self.EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for rowid, size in rows:
+                if self.total_bytes <= target:
+                    break
+                victims.append((rowid,))
+                self.total_bytes -= size
+            self.conn.executemany('DELETE FROM responses WHERE rowid = ?', victims)
+            self.stats['evicted'] += len(victims)
+
+    # ==================== REPORT ====================
+    def print_stats(self):
+        """Вывести счётчики кэша"""
+        s = self.stats
+        print(f"🗄️  HTTP-кэш: попаданий {s['hits']} | устаревших {s['stale']} | промахов {s['misses']} | "
+              f"304 {s['revalidated']} | записано {s['stored']} | вытеснено {s['evicted']} | "
+              f"ошибок {s['errors']} | размер {self.total_bytes / 1024 / 1024:.1f} МБ")
+
+    def close(self):
+        """Записать отложенные отметки и закрыть базу"""
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Общий кэш процесса (None, если HTTP_CACHE_ENABLED = False)"""
+    global _cache, _cache_failed
+    if HTTP_CACHE_ENABLED and _cache is None and not _cache_failed:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = HttpCache()
+                except sqlite3.Error as e:
+                    # ✅ Файл занят другим процессом - работаем без кэша
+                    _cache_failed = True
+                    print(f"⚠️  HTTP-кэш недоступен ({e}) - продолжаю без него")
+    return _cache
@@ -0,0 +1,303 @@
+"""Общая очередь заданий с арендой для распределённого парсинга (SQLite)"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from crawler.dedupe import sale_key
+from config import JOBS_PATH, JOBS_WAL, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+
+class JobStore:
+    """Очередь заданий, которую делят координатор и воркеры
+
+    Задание (``listing`` - диапазон страниц выдачи, ``detail`` - пачка URL
+    объявлений) выдаётся воркеру в аренду на ``lease_seconds``. Воркер
+    продлевает аренду, пока работает, и сдаёт результат; если он умер,
+    аренда истекает и задание получает следующий воркер. После
+    ``max_attempts`` аренд задание считается проваленным.
+
+    Все изменения - короткие транзакции ``BEGIN IMMEDIATE``, поэтому файл
+    можно открывать из любого числа процессов. Для общего сетевого диска
+    WAL нужно выключить (``JOBS_WAL = False``) - он работает только в
+    пределах одной машины.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)',
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker TEXT,
+            lease_until REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            split INTEGER NOT NULL DEFAULT 0
+        )''',
+        'CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, kind)',
+        'CREATE TABLE IF NOT EXISTS sale_ids (sale_id INTEGER PRIMARY KEY)',
+        '''CREATE TABLE IF NOT EXISTS results (
+            url TEXT PRIMARY KEY,
+            record TEXT NOT NULL,
+            exported INTEGER NOT NULL DEFAULT 0
+        )''',
+        'CREATE TABLE IF NOT EXISTS workers (name TEXT PRIMARY KEY, seen REAL NOT NULL, jobs INTEGER NOT NULL DEFAULT 0)',
+    )
+
+    def __init__(self, path=JOBS_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS, wal=JOBS_WAL):
+        """Инициализация JobStore
+
+        Args:
+            path (str): Файл SQLite (общий для всех процессов)
+            lease_seconds (float): Срок аренды задания
+            max_attempts (int): Сколько раз задание можно выдать
+            wal (bool): Режим WAL (только для локального диска)
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # ✅ Транзакции открываем сами (BEGIN IMMEDIATE), ожидание чужой блокировки - до 30 сек
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+
+    def _transaction(self, work):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(self.conn)
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+            return result
+
+    # ==================== META ====================
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, **values):
+        self._transaction(lambda conn: conn.executemany(
+            'INSERT OR REPLACE INTO meta VALUES (?, ?)', [(key, str(value)) for key, value in values.items()]
+        ))
+
+    def reset(self):
+        """Очистить очередь перед новым запуском"""
+        def work(conn):
+            for table in ('meta', 'jobs', 'sale_ids', 'results', 'workers'):
+                conn.execute(f'DELETE FROM {table}')
+        self._transaction(work)
+
+    # ==================== COORDINATOR ====================
+    def add_jobs(self, kind, payloads):
+        """Поставить задания в очередь
+
+        Args:
+            kind (str): 'listing' или 'detail'
+            payloads (list): Параметры заданий (сериализуются в JSON)
+        """
+        rows = [(kind, json.dumps(payload, ensure_ascii=False)) for payload in payloads]
+        self._transaction(lambda conn: conn.executemany('INSERT INTO jobs (kind, payload) VALUES (?, ?)', rows))
+        return len(rows)
+
+    def split_listings(self, batch_size):
+        """Превратить собранные страницы выдачи в пачки заданий 'detail'
+
+        Новые объявления отбираются по числовому ID через таблицу ``sale_ids`` -
+        объявление, попавшее на две страницы (выдача сдвигается во время
+        обхода) или под разными ссылками, качается один раз.
+
+        Returns:
+            tuple: (новых заданий 'detail', list страниц, которые не удалось собрать)
+        """
+        def work(conn):
+            rows = conn.execute(
+                "SELECT id, payload, result FROM jobs WHERE kind = 'listing' AND status = 'done' AND split = 0"
+            ).fetchall()
+            fresh, failed = [], []
+            for job_id, payload, result in rows:
+                result = json.loads(result or '{}')
+                for url in result.get('links', []):
+                    if conn.execute('INSERT OR IGNORE INTO sale_ids VALUES (?)', (sale_key(url),)).rowcount:
+                        fresh.append(url)
+                if result.get('failed'):
+                    failed.append((json.loads(payload), result['failed']))
+                conn.execute('UPDATE jobs SET split = 1 WHERE id = ?', (job_id,))
+
+            batches = [fresh[i:i + batch_size] for i in range(0, len(fresh), batch_size)]
+            conn.executemany(
+                "INSERT INTO jobs (kind, payload) VALUES ('detail', ?)",
+                [(json.dumps({'urls': batch}),) for batch in batches]
+            )
+            return len(batches), failed
+        return self._transaction(work)
+
+    def collect_failed_details(self):
+        """Забрать URL объявлений, которые воркеры не скачали за все повторы
+
+        Каждое выполненное задание 'detail' просматривается один раз
+        (флаг ``split``), как и страницы выдачи в ``split_listings``.
+
+        Returns:
+            list: (payload задания, list URL) - для повторной постановки
+        """
+        def work(conn):
+            rows = conn.execute(
+                "SELECT id, payload, result FROM jobs WHERE kind = 'detail' AND status = 'done' AND split = 0"
+            ).fetchall()
+            failed = []
+            for job_id, payload, result in rows:
+                urls = json.loads(result or '{}').get('failed')
+                if urls:
+                    failed.append((json.loads(payload), urls))
+            conn.executemany('UPDATE jobs SET split = 1 WHERE id = ?', [(job_id,) for job_id, _, _ in rows])
+            return failed
+        return self._transaction(work)
+
+    def drain_results(self, limit=1000):
+        """Забрать ещё не выгруженные записи
+
+        Returns:
+            list: Строки {колонка: значение}
+        """
+        def work(conn):
+            rows = conn.execute('SELECT url, record FROM results WHERE exported = 0 LIMIT ?', (limit,)).fetchall()
+            conn.executemany('UPDATE results SET exported = 1 WHERE url = ?', [(url,) for url, _ in rows])
+            return [json.loads(record) for _, record in rows]
+        return self._transaction(work)
+
+    def counts(self):
+        """Сколько заданий в каждом состоянии: {(kind, status): n}"""
+        with self.lock:
+            rows = self.conn.execute('SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status').fetchall()
+        return {(kind, status): count for kind, status, count in rows}
+
+    def unfinished(self):
+        """Есть ли ещё работа: невыполненные задания или непросмотренные результаты"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM jobs WHERE status IN ('pending', 'leased') "
+                "OR (status = 'done' AND split = 0))"
+            ).fetchone()[0] == 1
+
+    def active_workers(self, within=None):
+        """Воркеры, подававшие признаки жизни за последние ``within`` секунд"""
+        within = self.lease_seconds if within is None else within
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM workers WHERE seen > ?', (time.time() - within,)
+            ).fetchone()[0]
+
+    # ==================== WORKER ====================
+    def lease(self, worker):
+        """Взять задание в аренду (сначала 'detail', затем 'listing')
+
+        Задание с истёкшей арендой (воркер умер или завис) выдаётся снова.
+
+        Returns:
+            tuple | None: (id, kind, payload) или None, если выдавать нечего
+        """
+        def work(conn):
+            now = time.time()
+            # ✅ Исчерпавшие попытки задания больше не выдаём
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL "
+                "WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?)) AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY kind = 'listing', id LIMIT 1",
+                (now,)
+            ).fetchone()
+            conn.execute(
+                'INSERT INTO workers (name, seen) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET seen = excluded.seen',
+                (worker, now)
+            )
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now + self.lease_seconds, row[0])
+            )
+            return row[0], row[1], json.loads(row[2])
+        return self._transaction(work)
+
+    def renew(self, job_id, worker):
+        """Продлить аренду
+
+        Returns:
+            bool: False - аренда потеряна (задание уже выдано другому)
+        """
+        def work(conn):
+            now = time.time()
+            conn.execute('UPDATE workers SET seen = ? WHERE name = ?', (now, worker))
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_seconds, job_id, worker)
+            ).rowcount == 1
+        return self._transaction(work)
+
+    def complete(self, job_id, worker, result=None, records=()):
+        """Сдать задание вместе с результатом
+
+        Args:
+            job_id (int): Задание
+            worker (str): Имя воркера
+            result (dict): Результат задания (для 'listing' - ссылки)
+            records (iterable): Записи объявлений (CarRecord или dict)
+
+        Returns:
+            bool: False - аренда потеряна, результат отброшен
+        """
+        rows = [
+            (record['URL'], json.dumps(record, ensure_ascii=False, default=str))
+            for record in (r.to_row() if hasattr(r, 'to_row') else r for r in records)
+        ]
+
+        def work(conn):
+            done = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result or {}, ensure_ascii=False), job_id, worker)
+            ).rowcount == 1
+            if not done:
+                return False
+            # ✅ Повторно выполненное задание не создаёт дублей
+            conn.executemany('INSERT OR REPLACE INTO results (url, record) VALUES (?, ?)', rows)
+            conn.execute('UPDATE workers SET seen = ?, jobs = jobs + 1 WHERE name = ?', (time.time(), worker))
+            return True
+        return self._transaction(work)
+
+    def release(self, job_id, worker, error=False):
+        """Вернуть задание в очередь
+
+        Args:
+            job_id (int): Задание
+            worker (str): Имя воркера
+            error (bool): Задание упало (попытка засчитывается); False - воркер
+                просто останавливается
+        """
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL, lease_until = NULL, "
+            "attempts = attempts - ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (0 if error else 1, job_id, worker)
+        ))
+
+    def close(self):
+        """Закрыть базу"""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,298 @@
+"""Метрики стадий парсинга (счётчики и гистограммы) в формате Prometheus"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_BUCKETS
+
+
+class Counter:
+    """Счётчик с метками"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self, format_labels):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    """Гистограмма с метками (границы корзин - в секундах)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # ✅ метки -> [счётчики корзин (+Inf последняя), сумма, количество]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, key, q):
+        """Оценка квантиля по корзинам (верхняя граница корзины)"""
+        counts, _, total = self.values[key]
+        rank, seen = q * total, 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def render(self, format_labels):
+        for key, (counts, total_sum, total_count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ('le',), key + (str(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, key)} {total_sum:.6f}"
+            yield f"{self.name}_count{format_labels(self.labels, key)} {total_count}"
+
+
+class MetricsRegistry:
+    """Набор метрик процесса
+
+    Все изменения - под одной блокировкой: метрики пишут потоки пула,
+    корутины и HTTP-сервер метрик одновременно.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.started = time.time()
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=METRICS_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    @staticmethod
+    def format_labels(names, values):
+        if not names:
+            return ''
+        pairs = ','.join(
+            f'{name}="{value}"'
+            for name, value in ((name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                                for name, value in zip(names, values))
+        )
+        return '{' + pairs + '}'
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.render(self.format_labels))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram(
+    'autoru_stage_seconds', 'Длительность стадии: dns, connect, ttfb, download, parse, parse_wait, extract, listing_parse, export',
+    ('stage',)
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'autoru_request_seconds', 'Полное время запроса по виду страницы и коду ответа (или типу ошибки)',
+    ('kind', 'status')
+)
+ERRORS = REGISTRY.counter('autoru_errors_total', 'Ошибки по стадии и типу', ('stage', 'type'))
+RECORDS = REGISTRY.counter('autoru_records_total', 'Записей объявлений отдано в хранилище')
+
+
+# ==================== HOOKS ====================
+def observe(stage, seconds):
+    """Записать длительность стадии"""
+    if not METRICS_ENABLED:
+        return
+    with REGISTRY.lock:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def timed(stage):
+    """Замерить блок как стадию; исключение считается ошибкой стадии"""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        error(stage, type(e).__name__)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def request(kind, status, seconds):
+    """Записать запрос
+
+    Args:
+        kind (str): 'card' или 'listing'
+        status (int | str): Код ответа или тип ошибки ('timeout', имя исключения)
+        seconds (float): Время от отправки до конца чтения тела
+    """
+    if not METRICS_ENABLED:
+        return
+    with REGISTRY.lock:
+        REQUEST_SECONDS.observe(seconds, kind=kind, status=status)
+
+
+def response(kind, status, started, elapsed=None):
+    """Записать ответ requests: полное время и TTFB/загрузку по ``response.elapsed``
+
+    Args:
+        kind (str): 'card' или 'listing'
+        status (int): Код ответа
+        started (float): time.perf_counter() перед запросом
+        elapsed (datetime.timedelta): ``response.elapsed`` (до получения заголовков)
+    """
+    if not METRICS_ENABLED:
+        return
+    total = time.perf_counter() - started
+    request(kind, status, total)
+    if elapsed is not None:
+        ttfb = elapsed.total_seconds()
+        observe('ttfb', ttfb)
+        observe('download', max(0.0, total - ttfb))
+
+
+def error(stage, error_type):
+    """Посчитать ошибку стадии"""
+    if not METRICS_ENABLED:
+        return
+    with REGISTRY.lock:
+        ERRORS.inc(stage=stage, type=error_type)
+
+
+def record(count=1):
+    """Посчитать записи, отданные в хранилище"""
+    if not METRICS_ENABLED:
+        return
+    with REGISTRY.lock:
+        RECORDS.inc(count)
+
+
+def trace_configs():
+    """aiohttp TraceConfig: DNS, установка соединения и TTFB как отдельные стадии
+
+    Returns:
+        list: ``trace_configs`` для aiohttp.ClientSession (пустой, если метрики выключены)
+    """
+    if not METRICS_ENABLED:
+        return []
+    import aiohttp
+
+    def start(name):
+        async def hook(session, context, params):
+            setattr(context, name, time.perf_counter())
+        return hook
+
+    def end(name, stage):
+        async def hook(session, context, params):
+            started = getattr(context, name, None)
+            if started is not None:
+                observe(stage, time.perf_counter() - started)
+        return hook
+
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(start('dns_started'))
+    config.on_dns_resolvehost_end.append(end('dns_started', 'dns'))
+    config.on_connection_create_start.append(start('connect_started'))
+    config.on_connection_create_end.append(end('connect_started', 'connect'))
+    config.on_request_start.append(start('request_started'))
+    config.on_request_end.append(end('request_started', 'ttfb'))
+    return [config]
+
+
+# ==================== EXPORT ====================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # ✅ Опрос Prometheus не засоряет вывод парсера
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Поднять /metrics в фоновом потоке (один раз на процесс)
+
+    Returns:
+        ThreadingHTTPServer | None: Сервер или None (выключено, порт занят)
+    """
+    global _server
+    if not METRICS_ENABLED or port is None:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️  Метрики: порт {host}:{port} недоступен ({e})")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            print(f"📈 Метрики: http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+
+def print_summary():
+    """Вывести сводку по стадиям и запросам в конце запуска"""
+    if not METRICS_ENABLED:
+        return
+    with REGISTRY.lock:
+        if not STAGE_SECONDS.values and not REQUEST_SECONDS.values:
+            return
+        print("📈 Метрики стадий (мс):")
+        for key, (_, total, count) in sorted(STAGE_SECONDS.values.items()):
+            print(f"   {key[0]:<13} n={count:<7} среднее {total / count * 1000:8.1f} | "
+                  f"p50 ≤{STAGE_SECONDS.quantile(key, 0.5) * 1000:g} | p95 ≤{STAGE_SECONDS.quantile(key, 0.95) * 1000:g}")
+        for key, (_, total, count) in sorted(REQUEST_SECONDS.values.items()):
+            print(f"   {key[0]:<7} {key[1]:<20} n={count:<7} среднее {total / count * 1000:8.1f} | "
+                  f"p95 ≤{REQUEST_SECONDS.quantile(key, 0.95) * 1000:g}")
+        if ERRORS.values:
+            print("   ошибки: " + ', '.join(f"{stage}/{kind}: {n}" for (stage, kind), n in sorted(ERRORS.values.items())))
+        records = sum(RECORDS.values.values())
+        elapsed = time.time() - REGISTRY.started
+        print(f"   записей {records} | {records / elapsed:.1f} в сек за {elapsed:.0f} сек")
@@ -0,0 +1,190 @@
+"""Векторная нормализация таблицы результатов (даты, пробег, двигатель)"""
+
+import pandas as pd
+
+
+# Родительный падеж: на странице «12 октября», «3 мая 2023»
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12,
+}
+RELATIVE_DAYS = {'сегодня': 0, 'вчера': 1, 'позавчера': 2}
+# «3 дня назад», «5 часов назад»: основа слова -> дней в единице
+AGO_UNITS = {'мин': 0, 'час': 0, 'д': 1, 'нед': 7, 'мес': 30}
+
+DATE_RE = r'(?P<day>\d{1,2})\s+(?P<month>[а-я]+)(?:\s+(?P<year>\d{4}))?'
+ISO_RE = r'^(?P<iso>\d{4}-\d{2}-\d{2})'
+RELATIVE_RE = r'^(?P<word>' + '|'.join(RELATIVE_DAYS) + r')\b'
+AGO_RE = r'^(?P<count>\d+)\s+(?P<unit>мин|час|д|нед|мес)[а-я]*\s+назад'
+
+# Колонки старых файлов (до CarRecord) -> новые числовые колонки
+LEGACY_DIGITS = {'Пробег': 'Пробег, км'}
+ENGINE_COLUMN = 'Двигатель'
+# ✅ Один проход на строку: объём и мощность - где угодно (в опережающих
+# проверках), топливо - только последний сегмент после «/» без цифр
+ENGINE_RE = (
+    r'^(?=(?:.*?(?P<volume>\d+(?:[.,]\d+)?)\s*л(?!\.))?)'
+    r'(?=(?:.*?(?P<power>\d+)\s*л\.\s*с)?)'
+    r'(?:.*/)?\s*(?:(?P<fuel>[^/\d]*[^/\d\s])\s*$)?'
+)
+# Заглушки «нет значения» со страницы (как CarRecord.MISSING)
+MISSING_TEXT = ('', 'N/A')
+DIGIT_COLUMNS = ('Год выпуска', 'Пробег, км', 'Владельцы', 'Количество просмотров', 'Цена')
+
+
+def by_unique(values, parse):
+    """Применить векторный разбор к уникальным значениям и раздать результат
+
+    Дат, строк двигателя и т.п. в выдаче сотни, а строк - сотни тысяч:
+    регулярные выражения прогоняются по уникальным значениям, а
+    результат раскладывается обратно одним ``take`` по кодам ``factorize``.
+
+    Args:
+        values (pd.Series): Исходная колонка
+        parse (callable): Series уникальных значений -> Series или DataFrame
+
+    Returns:
+        pd.Series | pd.DataFrame: Результат с индексом ``values``
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques, dtype='object'))
+    result = parsed.take(codes)
+    result.index = values.index
+    return result
+
+
+def parse_dates(values, today=None):
+    """Разобрать даты объявлений без цикла по строкам
+
+    Понимает «12 октября», «12 октября 2023», ISO «2024-10-12» (из
+    JSON-состояния), «сегодня» / «вчера» / «позавчера» и «3 дня назад».
+    Дата без года относится к последним 12 месяцам: «28 декабря»,
+    разобранное 5 января, - это декабрь прошлого года.
+
+    Args:
+        values (pd.Series): Даты как текст
+        today (pd.Timestamp): Дата запуска (по умолчанию сегодня)
+
+    Returns:
+        pd.Series: datetime64 (NaT для неразобранных)
+    """
+    today = pd.Timestamp.now().normalize() if today is None else pd.Timestamp(today).normalize()
+    return by_unique(values, lambda uniques: _parse_dates(uniques, today))
+
+
+def _parse_dates(values, today):
+    text = values.astype('string').str.strip().str.lower()
+    result = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+
+    # ✅ Абсолютные даты: номер месяца через словарь, год - текущий, если не указан
+    parts = text.str.extract(DATE_RE)
+    month = parts['month'].map(MONTHS)
+    year = pd.to_numeric(parts['year'], errors='coerce').fillna(today.year)
+    day = pd.to_numeric(parts['day'], errors='coerce')
+    found = month.notna() & day.notna()
+    if found.any():
+        absolute = pd.to_datetime(
+            pd.DataFrame({'year': year[found], 'month': month[found], 'day': day[found]}),
+            errors='coerce'
+        )
+        # ✅ Дата без года «в будущем» - прошлогодняя
+        future = parts['year'][found].isna() & (absolute > today)
+        absolute[future] = absolute[future] - pd.DateOffset(years=1)
+        result[found] = absolute
+
+    iso = text.str.extract(ISO_RE)['iso']
+    result = result.fillna(pd.to_datetime(iso, format='%Y-%m-%d', errors='coerce'))
+
+    # ✅ Относительные даты: «вчера», «3 дня назад»
+    days = text.str.extract(RELATIVE_RE)['word'].map(RELATIVE_DAYS)
+    ago = text.str.extract(AGO_RE)
+    ago_days = pd.to_numeric(ago['count'], errors='coerce') * ago['unit'].map(AGO_UNITS)
+    days = days.fillna(ago_days)
+    result = result.fillna(today - pd.to_timedelta(days, unit='D'))
+
+    return result
+
+
+def digits(values):
+    """Оставить в тексте только цифры и привести к Int64 («123 000 км» -> 123000)"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('Int64')
+    return by_unique(values, _digits)
+
+
+def _digits(values):
+    cleaned = values.astype('string').str.replace(r'\D', '', regex=True)
+    return pd.to_numeric(cleaned.replace('', pd.NA), errors='coerce').astype('Int64')
+
+
+def split_engine(values):
+    """Разложить «1.6 л / 102 л.с. / Бензин» на объём, мощность и топливо
+
+    Returns:
+        pd.DataFrame: Колонки 'Объём двигателя, л', 'Мощность, л.с.', 'Топливо'
+    """
+    return by_unique(values, _split_engine)
+
+
+def _split_engine(values):
+    text = values.astype('string').str.strip()
+    # ✅ «N/A» до регулярного выражения: иначе «A» после «/» сошло бы за топливо
+    text = text.mask(text.isin(MISSING_TEXT))
+    parts = text.str.extract(ENGINE_RE)
+    volume = parts['volume'].str.replace(',', '.', regex=False)
+    return pd.DataFrame({
+        'Объём двигателя, л': pd.to_numeric(volume, errors='coerce').astype('Float64'),
+        'Мощность, л.с.': pd.to_numeric(parts['power'], errors='coerce').astype('Int64'),
+        'Топливо': parts['fuel'].astype('category'),
+    }, index=values.index)
+
+
+def normalize_frame(df, today=None):
+    """Привести таблицу результатов к типизированным колонкам
+
+    Работает только через векторные операции pandas, поэтому 100k строк
+    обрабатываются за доли секунды. Старые файлы (до CarRecord) с текстом
+    «123 000 км» и строкой двигателя тоже приводятся к новым колонкам.
+
+    Args:
+        df (pd.DataFrame): Результат ``sink.read_dataframe()``
+        today (pd.Timestamp): Дата, от которой считаются «вчера» и т.п.
+
+    Returns:
+        pd.DataFrame: Та же таблица с датой datetime64 и числовыми колонками
+    """
+    df = df.copy()
+
+    for old, new in LEGACY_DIGITS.items():
+        if old in df.columns:
+            legacy = digits(df.pop(old))
+            df[new] = legacy if new not in df.columns else df[new].fillna(legacy)
+
+    if ENGINE_COLUMN in df.columns:
+        engine = split_engine(df.pop(ENGINE_COLUMN))
+        for column in engine.columns:
+            if column not in df.columns:
+                df[column] = engine[column]
+            elif column == 'Топливо':
+                df[column] = df[column].astype('string').fillna(engine[column].astype('string')).astype('category')
+            else:
+                df[column] = df[column].fillna(engine[column])
+
+    for column in DIGIT_COLUMNS:
+        if column in df.columns:
+            df[column] = digits(df[column])
+    if 'Цена' in df.columns:
+        df['Цена'] = df['Цена'].fillna(0)
+
+    if 'Дата объявления' in df.columns:
+        df['Дата объявления'] = parse_dates(df['Дата объявления'], today=today)
+
+    return df
+
+
+def sort_by_date(df):
+    """Отсортировать от новых объявлений к старым (без даты - в конце)"""
+    if 'Дата объявления' not in df.columns:
+        return df
+    return df.sort_values('Дата объявления', ascending=False, na_position='last', kind='stable')
+
@@ -0,0 +1,154 @@
+"""Разбор страниц объявлений в пуле процессов (для асинхронного парсера)"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import html
+
+from crawler import metrics
+from config import PARSE_PROCESSES, PARSE_BATCH_SIZE, PARSE_FLUSH_INTERVAL
+
+
+def parse_document(content, url):
+    """Разобрать одну страницу: JSON-состояние или DOM
+
+    Выполняется в дочернем процессе, поэтому функция модульного уровня
+    (должна сериализоваться pickle). Стадии замеряются здесь же - метрики
+    пишет родительский процесс (реестр дочернего никто не читает).
+
+    Returns:
+        tuple: (CarRecord | None, list (стадия, секунды))
+    """
+    from pages.page_state import DEFAULT_STATE_EXTRACTOR
+    from pages.extraction import get_extractor
+    from config import USE_PAGE_STATE
+
+    timings = []
+    try:
+        record = None
+        if USE_PAGE_STATE:
+            started = time.perf_counter()
+            record = DEFAULT_STATE_EXTRACTOR.extract(content, url)
+            timings.append(('extract', time.perf_counter() - started))
+        if record is None:
+            started = time.perf_counter()
+            tree = html.fromstring(content)
+            timings.append(('parse', time.perf_counter() - started))
+            started = time.perf_counter()
+            record = get_extractor().extract(tree, url)
+            timings.append(('extract', time.perf_counter() - started))
+        return record, timings
+    except Exception:
+        return None, timings
+
+
+def parse_batch(batch):
+    """Разобрать пачку страниц [(content, url), ...] в одном вызове процесса"""
+    return [parse_document(content, url) for content, url in batch]
+
+
+class ParsePool:
+    """Пул процессов для CPU-работы: lxml-разбор и извлечение полей
+
+    Сырые ответы копятся в пачки по ``batch_size`` (или сбрасываются через
+    ``flush_interval`` секунд), чтобы амортизировать стоимость IPC. Назад
+    возвращаются записи CarRecord (``__slots__``, без дерева документа).
+    В пуле разбирается и JSON-состояние (USE_PAGE_STATE), и DOM - event
+    loop остаётся свободным для сетевой работы.
+
+    Метрики: стадии parse/extract замеряются внутри процесса-воркера, а
+    остаток пути документа (ожидание пачки, очередь пула, IPC) пишется
+    отдельной стадией ``parse_wait``.
+    """
+
+    def __init__(self, processes=PARSE_PROCESSES, batch_size=PARSE_BATCH_SIZE,
+                 flush_interval=PARSE_FLUSH_INTERVAL):
+        """Инициализация ParsePool
+
+        Args:
+            processes (int): Количество процессов
+            batch_size (int): Документов в одной пачке
+            flush_interval (float): Максимальное ожидание неполной пачки (сек)
+        """
+        self.processes = processes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.executor = ProcessPoolExecutor(max_workers=processes)
+        self.pending = []
+        self.flush_handle = None
+        self.stats = {'documents': 0, 'batches': 0, 'failed': 0}
+
+    async def parse(self, content, url):
+        """Поставить документ в очередь на разбор и дождаться записи
+
+        Returns:
+            CarRecord | None: Запись объявления или None при ошибке
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((content, url, future, time.perf_counter()))
+
+        if len(self.pending) >= self.batch_size:
+            self._dispatch()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.flush_interval, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        """Отправить накопленную пачку в пул"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        futures = [(future, queued) for _, _, future, queued in batch]
+        self.stats['documents'] += len(batch)
+        self.stats['batches'] += 1
+
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            self.executor, parse_batch, [(content, url) for content, url, _, _ in batch]
+        )
+
+        def deliver(done):
+            try:
+                results = done.result()
+            except Exception:
+                results = [(None, [])] * len(futures)
+            delivered = time.perf_counter()
+            for (future, queued), (record, timings) in zip(futures, results):
+                worked = 0.0
+                for stage, seconds in timings:
+                    metrics.observe(stage, seconds)
+                    worked += seconds
+                metrics.observe('parse_wait', max(0.0, delivered - queued - worked))
+                if record is None:
+                    self.stats['failed'] += 1
+                if not future.done():
+                    future.set_result(record)
+
+        task.add_done_callback(deliver)
+
+    def print_stats(self):
+        """Вывести счётчики пула"""
+        s = self.stats
+        average = s['documents'] / s['batches'] if s['batches'] else 0
+        print(f"🧮 Пул разбора: документов {s['documents']} | пачек {s['batches']} "
+              f"(в среднем {average:.1f}) | не разобрано {s['failed']}")
+
+    def close(self):
+        """Остановить процессы"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
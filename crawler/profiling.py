@@ -0,0 +1,418 @@
+"""Профилирование запуска: CPU (сэмплы стеков или cProfile) и память (сэмплы RSS или tracemalloc)"""
+
+import collections
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil  # ✅ Опционально: RSS там, где нет /proc (macOS, Windows)
+except ImportError:
+    psutil = None
+
+from config import (
+    OUTPUT_FILENAME, PROFILE_MODE, PROFILE_MEMORY, PROFILE_INTERVAL,
+    PROFILE_TRACEMALLOC_FRAMES, PROFILE_TOP
+)
+
+PROFILE_MODES = ('sample', 'cprofile')
+MEMORY_MODES = ('sample', 'trace')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# ==================== STAGES ====================
+# Стадия определяется по модулям в стеке. Сбор выдачи и сохранение -
+# «контекстные»: всё, что вызвано из них (requests, lxml, pandas), относится
+# к ним. Остальное - по самой глубокой рамке из известного модуля.
+CONTEXT_STAGES = (
+    ('pagination', ('pages/listing_page.py', 'pages/http_listing_page.py', 'pages/query_planner.py'),
+     ('collect_links', 'get_car_links', 'get_total_pages')),
+    ('save', ('crawler/sinks.py', 'crawler/normalize.py', 'pandas/', 'openpyxl/', 'xlsxwriter/'),
+     ('save_to_excel',)),
+)
+FRAME_STAGES = (
+    ('fetch', ('requests/', 'urllib3/', 'aiohttp/', 'http/client.py', 'socket.py', 'ssl.py',
+               'asyncio/selector_events.py', 'crawler/http_cache.py', 'crawler/rate_limit.py', 'selenium/')),
+    ('parse', ('lxml/', 'json/', 'crawler/parse_pool.py')),
+    ('extract', ('pages/extraction.py', 'pages/page_state.py', 'pages/car_detail_page.py',
+                 'crawler/records.py')),
+)
+# Самая глубокая рамка - ожидание без работы (очередь, select, join)
+IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py', 'concurrent/futures/thread.py')
+# То же для встроенных функций в cProfile (файл '~')
+IDLE_BUILTINS = ('acquire', 'select', 'poll', 'sleep')
+
+
+@functools.lru_cache(maxsize=None)
+def file_stages(filename):
+    """Стадии модуля: (контекстная или None, по рамке или None, ожидание ли)"""
+    filename = filename.replace('\\', '/')
+    context = next((stage for stage, paths, _ in CONTEXT_STAGES if any(path in filename for path in paths)), None)
+    frame = next((stage for stage, paths in FRAME_STAGES if any(path in filename for path in paths)), None)
+    return context, frame, filename.endswith(IDLE_FILES)
+
+
+def classify(frames):
+    """Стадия по стеку
+
+    Args:
+        frames (list): [(путь к файлу, имя функции), ...] от самой глубокой рамки
+
+    Returns:
+        str: pagination / fetch / parse / extract / save / idle / other
+    """
+    stages = [file_stages(filename) for filename, _ in frames]
+    if stages and stages[0][2]:
+        return 'idle'
+    functions = {function for _, function in frames}
+    for stage, _, names in CONTEXT_STAGES:
+        if any(context == stage for context, _, _ in stages) or not functions.isdisjoint(names):
+            return stage
+    return next((frame for _, frame, _ in stages if frame is not None), 'other')
+
+
+def frame_label(code):
+    """Подпись рамки для flamegraph: функция (файл:строка)"""
+    filename = code.co_filename.replace('\\', '/')
+    cwd = os.getcwd().replace('\\', '/') + '/'
+    if filename.startswith(cwd):
+        filename = filename[len(cwd):]
+    else:
+        filename = '/'.join(filename.rsplit('/', 2)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def current_rss():
+    """Резидентная память процесса в байтах (None, если узнать нельзя)"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+# ==================== SAMPLER ====================
+class StackSampler:
+    """Сэмплирующий профилировщик: раз в ``interval`` снимает стеки всех потоков
+
+    Накладные расходы - одна короткая пауза GIL на сэмпл (около 1% при
+    100 Гц), поэтому его можно держать включённым в рабочем запуске.
+    Считается время потоков, а не CPU: стеки, ждущие сеть, попадают в
+    fetch, простаивающие потоки - в idle. Процессы ParsePool не видны.
+
+    С ``memory`` на каждом сэмпле читается RSS процесса, и его изменение
+    с прошлого сэмпла делится между стеками занятых потоков. Выделения
+    не перехватываются, поэтому это почти бесплатно, но и приблизительно:
+    RSS растёт страницами, а освобождённая память часто остаётся у
+    аллокатора. Для точного разбора по строкам - tracemalloc (``trace``).
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, stacks=True, memory=False):
+        """Инициализация StackSampler
+
+        Args:
+            interval (float): Интервал сэмплов (в секундах)
+            stacks (bool): Копить сэмплы стеков (профиль CPU)
+            memory (bool): Копить прирост RSS по стекам
+        """
+        self.interval = interval
+        self.stacks = stacks
+        self.memory = memory
+        self.samples = collections.Counter()  # ✅ (code, ...) от самой глубокой рамки -> сэмплов
+        self.growth = collections.Counter()  # ✅ (code, ...) -> прирост RSS (байт) в текущей фазе
+        self.rss = current_rss() if memory else None
+        self.peak = self.rss
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    @staticmethod
+    def _snapshot(own):
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                stacks.append(tuple(stack))
+        return stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            stacks = self._snapshot(own) if self.stacks else None
+            if stacks is not None:
+                for stack in stacks:
+                    self.samples[stack] += 1
+            if self.memory:
+                self._sample_memory(own, stacks)
+
+    def _sample_memory(self, own, stacks):
+        rss = current_rss()
+        with self.lock:
+            delta = rss - self.rss
+            self.rss = rss
+            self.peak = max(self.peak, rss)
+        if not delta:
+            return
+        # ✅ Стеки снимаем только когда RSS изменился (без профиля CPU)
+        stacks = stacks if stacks is not None else self._snapshot(own)
+        busy = [stack for stack in stacks if not file_stages(stack[0].co_filename)[2]] or stacks
+        with self.lock:
+            for stack in busy:
+                self.growth[stack] += delta / len(busy)
+
+    def begin_phase(self):
+        """Начать фазу: сбросить пик и прирост RSS"""
+        with self.lock:
+            self.rss = current_rss()
+            self.peak = self.rss
+            self.growth = collections.Counter()
+
+    def end_phase(self):
+        """Закончить фазу
+
+        Returns:
+            tuple: (пик RSS, Counter прироста RSS по стекам)
+        """
+        with self.lock:
+            self.peak = max(self.peak, current_rss())
+            growth, self.growth = self.growth, collections.Counter()
+            return self.peak, growth
+
+    def write_collapsed(self, path):
+        """Стеки в формате collapsed (flamegraph.pl, speedscope, inferno)"""
+        lines = collections.Counter()
+        for stack, count in self.samples.items():
+            lines[';'.join(frame_label(code) for code in reversed(stack))] += count
+        with open(path, 'w', encoding='utf-8') as f:
+            for line, count in sorted(lines.items()):
+                f.write(f"{line} {count}\n")
+
+    def by_stage(self, samples=None):
+        """Сэмплы (или прирост RSS) по стадиям"""
+        stages = collections.Counter()
+        for stack, count in (self.samples if samples is None else samples).items():
+            stages[classify([(code.co_filename, code.co_name) for code in stack])] += count
+        return stages
+
+
+def add_arguments(arg_parser):
+    """Флаги профилирования для main() движков"""
+    arg_parser.add_argument('--profile', nargs='?', const='sample', default=PROFILE_MODE, choices=PROFILE_MODES,
+                            help="Профилировать CPU: sample (по умолчанию, для рабочих запусков) или cprofile")
+    arg_parser.add_argument('--profile-memory', nargs='?', const='sample', default=PROFILE_MEMORY,
+                            choices=MEMORY_MODES,
+                            help="Память по фазам запуска: sample (по умолчанию, сэмплы RSS - для рабочих "
+                                 "запусков) или trace (tracemalloc: точно по строкам, но заметно медленнее)")
+
+
+# ==================== PROFILER ====================
+class Profiler:
+    """Профилирование запуска парсера (включается флагом ``--profile``)
+
+    Файлы пишутся рядом с Excel: ``<имя>.cpu.collapsed`` (sample),
+    ``<имя>.cpu.pstats`` (cprofile) и ``<имя>.memory.txt``.
+    Память снимается по фазам запуска (``phase``): пик фазы и прирост
+    памяти по стадиям и по коду. ``memory='sample'`` - RSS процесса тем же
+    сэмплером, что и CPU (для рабочих запусков), ``memory='trace'`` -
+    tracemalloc (точнее, но замедляет каждое выделение памяти).
+    """
+
+    MEMORY_LABELS = {'sample': 'сэмплы RSS', 'trace': 'tracemalloc'}
+
+    def __init__(self, mode=PROFILE_MODE, memory=PROFILE_MEMORY, output=OUTPUT_FILENAME, label=None,
+                 interval=PROFILE_INTERVAL, frames=PROFILE_TRACEMALLOC_FRAMES, top=PROFILE_TOP):
+        """Инициализация Profiler
+
+        Args:
+            mode (str): 'sample', 'cprofile' или None (CPU не профилировать)
+            memory (str): 'sample', 'trace' или None (память не профилировать)
+            output (str): Файл результатов, рядом с которым кладутся отчёты
+            label (str): Добавка к имени отчётов (например, имя воркера)
+            interval (float): Интервал сэмплов (в секундах)
+            frames (int): Глубина стека tracemalloc
+            top (int): Строк в отчётах
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode} (доступны: {', '.join(PROFILE_MODES)})")
+        memory = memory or None
+        if memory is not None and memory not in MEMORY_MODES:
+            raise ValueError(f"Неизвестный режим памяти: {memory} (доступны: {', '.join(MEMORY_MODES)})")
+        self.mode = mode
+        self.memory = memory
+        self.interval = interval
+        self.frames = frames
+        self.top = top
+        base = os.path.splitext(output)[0]
+        self.base = f"{base}.{label}" if label else base
+        self.sampler = None
+        self.profile = None
+        self.phases = []  # ✅ [(фаза, пик, прирост по стадиям, топ строк)]
+        self.started = None
+
+    @property
+    def enabled(self):
+        return self.mode is not None or self.memory is not None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.started = time.perf_counter()
+        if self.memory == 'sample' and current_rss() is None:
+            print("⚠️  RSS процесса недоступен (нет /proc и psutil) - память не профилируется")
+            self.memory = None
+        if self.memory == 'trace':
+            tracemalloc.start(self.frames)
+        if self.mode == 'sample' or self.memory == 'sample':
+            self.sampler = StackSampler(self.interval, stacks=self.mode == 'sample', memory=self.memory == 'sample')
+            self.sampler.start()
+        elif self.mode == 'cprofile':
+            # ✅ cProfile видит только поток, в котором включён (у asyncio - весь конвейер)
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        """Остановить профилирование, записать отчёты и вывести сводку"""
+        if not self.enabled or self.started is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        self.started = None
+        directory = os.path.dirname(self.base)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        print(f"🔬 Профилирование ({elapsed:.1f} сек):")
+        if self.sampler is not None:
+            self.sampler.stop()
+            if self.sampler.stacks:
+                path = f"{self.base}.cpu.collapsed"
+                self.sampler.write_collapsed(path)
+                self._print_stages(self.sampler.by_stage(), 'сэмплов')
+                print(f"   CPU: {path} (flamegraph.pl / speedscope)")
+            self.sampler = None
+        if self.profile is not None:
+            self.profile.disable()
+            path = f"{self.base}.cpu.pstats"
+            self.profile.dump_stats(path)
+            self._print_stages(self._pstats_by_stage(pstats.Stats(self.profile)), 'сек')
+            print(f"   CPU: {path} (snakeviz / python -m pstats)")
+            self.profile = None
+        if self.memory is not None:
+            if self.memory == 'trace':
+                tracemalloc.stop()
+            path = f"{self.base}.memory.txt"
+            self._write_memory(path)
+            for name, peak, stages, _ in self.phases:
+                growth = sum(stages.values())
+                detail = ', '.join(f"{stage} {size / 2**20:+.1f}" for stage, size in stages.most_common()
+                                   if abs(size) >= 2**20 / 20)
+                print(f"   память {name}: пик {peak / 2**20:.1f} МБ | прирост {growth / 2**20:+.1f} МБ"
+                      + (f" ({detail})" if detail else ''))
+            print(f"   Память ({self.MEMORY_LABELS[self.memory]}): {path}")
+
+    @contextmanager
+    def phase(self, name):
+        """Фаза запуска для отчёта о памяти (сбор и парсинг, сохранение)"""
+        if self.memory == 'sample' and self.sampler is not None:
+            self.sampler.begin_phase()
+            try:
+                yield
+            finally:
+                peak, growth = self.sampler.end_phase()
+                self.phases.append((name, peak, self.sampler.by_stage(growth), self._top_frames(growth)))
+            return
+        if self.memory != 'trace' or not tracemalloc.is_tracing():
+            yield
+            return
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot()
+            top = [stat for stat in after.compare_to(before, 'lineno') if self._own(stat)][:self.top]
+            self.phases.append((name, peak, self._by_stage(after.compare_to(before, 'traceback')), top))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ==================== REPORTS ====================
+    def _top_frames(self, growth):
+        """Прирост RSS по самой глубокой рамке стека (вместо строк tracemalloc)"""
+        frames = collections.Counter()
+        for stack, size in growth.items():
+            frames[frame_label(stack[0])] += size
+        top = sorted(frames.items(), key=lambda item: -abs(item[1]))[:self.top]
+        return [f"{label}: {size / 1024:+.1f} КБ" for label, size in top]
+
+    @staticmethod
+    def _own(stat):
+        """Не служебное выделение (сам снимок tracemalloc, импорт модулей)"""
+        filename = stat.traceback[-1].filename
+        return filename != tracemalloc.__file__ and not filename.startswith('<frozen importlib')
+
+    @classmethod
+    def _by_stage(cls, diff):
+        """Прирост памяти по стадиям (по стеку выделения)"""
+        stages = collections.Counter()
+        for stat in diff:
+            if stat.size_diff and cls._own(stat):
+                # ✅ В tracemalloc рамки идут от самой внешней к самой глубокой
+                stages[classify([(frame.filename, '') for frame in stat.traceback[::-1]])] += stat.size_diff
+        return stages
+
+    @staticmethod
+    def _pstats_by_stage(stats):
+        """Собственное время функций cProfile по стадиям (без контекста вызова)"""
+        stages = collections.Counter()
+        for (filename, _, function), (_, _, own_time, _, _) in stats.stats.items():
+            if filename == '~' and any(name in function for name in IDLE_BUILTINS):
+                stages['idle'] += own_time
+            else:
+                stages[classify([(filename, function)])] += own_time
+        return stages
+
+    @staticmethod
+    def _print_stages(stages, unit):
+        total = sum(stages.values()) or 1
+        print("   " + ' | '.join(f"{stage} {value / total * 100:.0f}%" for stage, value in stages.most_common())
+              + f" (всего {round(sum(stages.values()), 1):g} {unit})")
+
+    def _write_memory(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# Режим: {self.MEMORY_LABELS[self.memory]}\n\n")
+            for name, peak, stages, top in self.phases:
+                f.write(f"# {name}: пик {peak / 2**20:.1f} МБ, прирост {sum(stages.values()) / 2**20:+.1f} МБ\n\n")
+                f.write("## По стадиям\n")
+                for stage, size in stages.most_common():
+                    f.write(f"{stage:<12} {size / 1024:+12.1f} КБ\n")
+                f.write(f"\n## Топ-{self.top} {'строк' if self.memory == 'trace' else 'функций'} по приросту\n")
+                for stat in top:
+                    f.write(f"{stat}\n")
+                f.write('\n')
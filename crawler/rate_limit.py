@@ -0,0 +1,172 @@
+"""Общий лимит частоты запросов (token bucket) для потоков и asyncio"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import RATE_LIMIT_ENABLED, RATE_LIMIT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_HOSTS, RETRY_AFTER_MAX
+
+
+class TokenBucket:
+    """Корзина токенов одного хоста
+
+    Токены пополняются со скоростью ``rate`` в секунду, но не больше
+    ``burst``. Запрос резервирует токен сразу (баланс может уйти в минус)
+    и получает время, которое нужно подождать до своей очереди. Ожидание
+    выполняется вне блокировки - поэтому одна корзина обслуживает и
+    потоки (``time.sleep``), и корутины (``asyncio.sleep``).
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'lock')
+
+    def __init__(self, rate, burst):
+        """Инициализация TokenBucket
+
+        Args:
+            rate (float): Запросов в секунду
+            burst (int): Запас запросов без ожидания
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Зарезервировать токен
+
+        Returns:
+            float: Сколько секунд подождать перед запросом (0 - сразу)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """Не выдавать токены ближайшие ``seconds`` секунд (Retry-After)
+
+        Долг корзины поднимается до ``seconds * rate`` токенов; паузы от
+        нескольких одновременных отказов не складываются.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate, -seconds * self.rate)
+            self.updated = now
+
+
+class RateLimiter:
+    """Лимиты запросов по хостам
+
+    Все движки (потоки, синхронный, asyncio) и сбор выдачи (HTTP и
+    Selenium) берут токен у одного экземпляра, поэтому суммарная частота
+    к хосту не превышает бюджет, а пауз сверх бюджета нет.
+    """
+
+    def __init__(self, rps=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST, hosts=RATE_LIMIT_HOSTS):
+        """Инициализация RateLimiter
+
+        Args:
+            rps (float): Запросов в секунду к одному хосту
+            burst (int): Запас запросов без ожидания
+            hosts (dict): Свои лимиты {хост: (rps, burst)}
+        """
+        self.rps = rps
+        self.burst = burst
+        self.hosts = hosts
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'delayed': 0, 'waited': 0.0, 'paused': 0}
+
+    def bucket(self, url):
+        """Корзина хоста из URL"""
+        host = urlsplit(url).hostname or ''
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(host)
+                if bucket is None:
+                    rps, burst = self.hosts.get(host, (self.rps, self.burst))
+                    bucket = self.buckets[host] = TokenBucket(rps, burst)
+        return bucket
+
+    def _reserve(self, url):
+        delay = self.bucket(url).reserve()
+        with self.lock:
+            self.stats['requests'] += 1
+            if delay > 0:
+                self.stats['delayed'] += 1
+                self.stats['waited'] += delay
+        return delay
+
+    def wait(self, url):
+        """Дождаться разрешения на запрос (потоки / синхронный код)"""
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """Дождаться разрешения на запрос (asyncio)"""
+        delay = self._reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, url, seconds):
+        """Сайт попросил подождать - остановить все запросы к хосту"""
+        self.bucket(url).pause(min(seconds, RETRY_AFTER_MAX))
+        with self.lock:
+            self.stats['paused'] += 1
+
+    def print_stats(self):
+        """Вывести статистику лимита"""
+        s = self.stats
+        print(f"🚦 Лимит {self.rps:g} запр/сек: запросов {s['requests']} | "
+              f"ждали {s['delayed']} | суммарное ожидание {s['waited']:.1f} сек | "
+              f"пауз по Retry-After {s['paused']}")
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Общий лимитер процесса (None, если RATE_LIMIT_ENABLED = False)"""
+    global _limiter
+    if RATE_LIMIT_ENABLED and _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def throttle(url):
+    """Дождаться токена для запроса к ``url`` (ничего не делает, если лимит выключен)"""
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        limiter.wait(url)
+
+
+async def throttle_async(url):
+    """Асинхронный вариант ``throttle``"""
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        await limiter.wait_async(url)
+
+
+def backoff(url, seconds):
+    """Передать паузу после 429/503 общему лимиту хоста (не блокирует)
+
+    Returns:
+        bool: True - пауза учтена лимитом (её выдержат все в ``throttle``),
+        False - лимит выключен и ждать придётся самому
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return False
+    limiter.pause(url, seconds)
+    return True
@@ -0,0 +1,246 @@
+"""Компактная типизированная запись объявления"""
+
+import re
+import threading
+
+import pandas as pd
+
+
+class Vocabulary:
+    """Словарное кодирование текста с небольшим числом значений
+
+    Каждое значение хранится один раз, в записях - только его номер.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.lock = threading.Lock()
+
+    def encode(self, value):
+        """Номер значения (None -> -1)"""
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            with self.lock:
+                code = self.codes.get(value)
+                if code is None:
+                    code = self.codes[value] = len(self.values)
+                    self.values.append(value)
+        return code
+
+    def decode(self, code):
+        """Значение по номеру"""
+        return None if code < 0 else self.values[code]
+
+
+class CarRecord:
+    """Объявление: числовые поля - числа, повторяющийся текст - коды словаря
+
+    Вместо словаря из 11 строковых ключей со строками вида "123 000 км"
+    хранит ``__slots__``-атрибуты с типами: год, пробег, владельцы,
+    просмотры и цена - ``int``, объём двигателя - ``float``, мощность -
+    ``int``. Коробка, топливо и состояние кодируются общими словарями
+    (``VOCABULARIES``); при передаче между процессами (pickle) коды
+    заменяются значениями, поэтому словари разных процессов не обязаны
+    совпадать.
+    """
+
+    __slots__ = (
+        'title', 'year', 'mileage_km', 'owners', '_condition', '_transmission', '_fuel',
+        'engine_volume', 'engine_power', 'date_posted', 'views', 'price', 'url'
+    )
+
+    VOCABULARIES = {'condition': Vocabulary(), 'transmission': Vocabulary(), 'fuel': Vocabulary()}
+
+    # ==================== COLUMNS ====================
+    # (атрибут, колонка в файле, тип pandas)
+    COLUMNS = (
+        ('title', 'Марка', 'string'),
+        ('year', 'Год выпуска', 'Int64'),
+        ('mileage_km', 'Пробег, км', 'Int64'),
+        ('owners', 'Владельцы', 'Int64'),
+        ('condition', 'Состояние', 'category'),
+        ('transmission', 'Коробка', 'category'),
+        ('engine_volume', 'Объём двигателя, л', 'Float64'),
+        ('engine_power', 'Мощность, л.с.', 'Int64'),
+        ('fuel', 'Топливо', 'category'),
+        ('date_posted', 'Дата объявления', 'object'),
+        ('views', 'Количество просмотров', 'Int64'),
+        ('price', 'Цена', 'Int64'),
+        ('url', 'URL', 'string'),
+    )
+
+    # Поле ExtractionPlan -> атрибут (если имена различаются)
+    FIELD_ATTRS = {'mileage': 'mileage_km'}
+    INT_FIELDS = ('year', 'mileage', 'owners', 'views', 'price')
+    MISSING = ('', 'N/A')
+
+    ENGINE_VOLUME_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*л(?!\.)')
+    ENGINE_POWER_RE = re.compile(r'(\d+)\s*л\.\s*с')
+
+    def __init__(self, title=None, year=None, mileage_km=None, owners=None, condition=None,
+                 transmission=None, engine_volume=None, engine_power=None, fuel=None,
+                 date_posted=None, views=None, price=0, url=None):
+        self.title = title
+        self.year = year
+        self.mileage_km = mileage_km
+        self.owners = owners
+        self._condition = self.VOCABULARIES['condition'].encode(condition)
+        self._transmission = self.VOCABULARIES['transmission'].encode(transmission)
+        self._fuel = self.VOCABULARIES['fuel'].encode(fuel)
+        self.engine_volume = engine_volume
+        self.engine_power = engine_power
+        self.date_posted = date_posted
+        self.views = views
+        self.price = price
+        self.url = url
+
+    # ==================== DICTIONARY FIELDS ====================
+    @property
+    def condition(self):
+        return self.VOCABULARIES['condition'].decode(self._condition)
+
+    @property
+    def transmission(self):
+        return self.VOCABULARIES['transmission'].decode(self._transmission)
+
+    @property
+    def fuel(self):
+        return self.VOCABULARIES['fuel'].decode(self._fuel)
+
+    @property
+    def engine(self):
+        """Двигатель одной строкой, как на странице: "1.6 л / 102 л.с. / Бензин" """
+        parts = []
+        if self.engine_volume is not None:
+            parts.append(f"{self.engine_volume:g} л")
+        if self.engine_power is not None:
+            parts.append(f"{self.engine_power} л.с.")
+        if self.fuel is not None:
+            parts.append(self.fuel)
+        return ' / '.join(parts) or None
+
+    # ==================== NORMALIZATION ====================
+    @classmethod
+    def parse_engine(cls, text):
+        """Разобрать строку двигателя
+
+        Returns:
+            tuple: (объём в литрах, мощность в л.с., топливо)
+        """
+        if text in (None, *cls.MISSING):
+            return None, None, None
+        volume = cls.ENGINE_VOLUME_RE.search(text)
+        power = cls.ENGINE_POWER_RE.search(text)
+        fuel = None
+        for part in (part.strip() for part in text.split('/')):
+            if part and not any(char.isdigit() for char in part):
+                fuel = part
+        return (
+            float(volume.group(1).replace(',', '.')) if volume else None,
+            int(power.group(1)) if power else None,
+            fuel,
+        )
+
+    @classmethod
+    def normalize(cls, field, value):
+        """Привести значение поля ExtractionPlan к типу записи
+
+        Args:
+            field (str): Имя поля ('price', 'mileage', ...)
+            value: Текст со страницы или значение из JSON-состояния
+        """
+        if value is None or (isinstance(value, str) and value.strip() in cls.MISSING):
+            return 0 if field == 'price' else None
+        if field in cls.INT_FIELDS:
+            if isinstance(value, int):
+                return value
+            digits = ''.join(filter(str.isdigit, str(value)))
+            if digits:
+                return int(digits)
+            return 0 if field == 'price' else None
+        if isinstance(value, str):
+            return value.strip()
+        if field == 'date_posted' and hasattr(value, 'isoformat'):
+            return value.isoformat()  # ✅ Дата из JSON-состояния - ISO-строкой
+        return value
+
+    @classmethod
+    def from_fields(cls, values, url):
+        """Собрать запись из значений полей ExtractionPlan
+
+        Args:
+            values (dict): {поле: значение} ('title', 'mileage', 'engine', ...)
+            url (str): URL объявления
+        """
+        normalize = cls.normalize
+        volume, power, fuel = cls.parse_engine(values.get('engine'))
+        return cls(
+            title=normalize('title', values.get('title')),
+            year=normalize('year', values.get('year')),
+            mileage_km=normalize('mileage', values.get('mileage')),
+            owners=normalize('owners', values.get('owners')),
+            condition=normalize('condition', values.get('condition')),
+            transmission=normalize('transmission', values.get('transmission')),
+            engine_volume=volume,
+            engine_power=power,
+            fuel=fuel,
+            date_posted=normalize('date_posted', values.get('date_posted')),
+            views=normalize('views', values.get('views')),
+            price=normalize('price', values.get('price')),
+            url=url,
+        )
+
+    def value(self, field):
+        """Значение по имени поля ExtractionPlan (для get_price() и т.п.)"""
+        return getattr(self, self.FIELD_ATTRS.get(field, field))
+
+    # ==================== EXPORT ====================
+    def to_row(self):
+        """Строка для файла: {колонка: значение}"""
+        return {column: getattr(self, attr) for attr, column, _ in self.COLUMNS}
+
+    @classmethod
+    def column_names(cls):
+        return [column for _, column, _ in cls.COLUMNS]
+
+    @classmethod
+    def apply_dtypes(cls, df):
+        """Задать колонкам DataFrame типы записи (числа, категории) вместо object"""
+        for _, column, dtype in cls.COLUMNS:
+            if column not in df.columns or dtype == 'object':
+                continue
+            if dtype in ('Int64', 'Float64'):
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+            else:
+                df[column] = df[column].replace('', None).astype(dtype)
+        return df
+
+    @classmethod
+    def arrow_schema(cls, pa):
+        """Схема Parquet: числа и словарные колонки (dictionary<int8, string>)"""
+        types = {
+            'string': pa.string(),
+            'Int64': pa.int64(),
+            'Float64': pa.float64(),
+            'category': pa.dictionary(pa.int8(), pa.string()),
+            'object': pa.string(),
+        }
+        return pa.schema([(column, types[dtype]) for _, column, dtype in cls.COLUMNS])
+
+    # ==================== PICKLE ====================
+    def __reduce__(self):
+        # ✅ Коды словаря локальны для процесса - передаём значения
+        return (self.__class__, (
+            self.title, self.year, self.mileage_km, self.owners, self.condition,
+            self.transmission, self.engine_volume, self.engine_power, self.fuel,
+            self.date_posted, self.views, self.price, self.url
+        ))
+
+    def __eq__(self, other):
+        return isinstance(other, CarRecord) and self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"CarRecord({self.title!r}, {self.year}, {self.price} руб, {self.url!r})"
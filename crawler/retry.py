@@ -0,0 +1,140 @@
+"""Отложенные повторы неудачных запросов (backoff с джиттером, Retry-After)"""
+
+import email.utils
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from config import (
+    RETRY_MAX_ATTEMPTS, RETRY_MAX_TOTAL, RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY, RETRY_AFTER_MAX
+)
+
+
+def parse_retry_after(value):
+    """Разобрать заголовок Retry-After
+
+    Args:
+        value (str): Число секунд или HTTP-дата
+
+    Returns:
+        float | None: Через сколько секунд можно повторить
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class RetryScheduler:
+    """Очередь отложенных повторов
+
+    Вместо сна внутри загрузки (с занятым слотом параллельности) неудачный
+    URL кладётся в кучу с моментом повтора, а слот сразу освобождается для
+    новой работы. Задержка - экспоненциальная с полным джиттером, либо
+    ``Retry-After`` от сайта. Число попыток ограничено на URL и на весь
+    запуск. Счётчики ведутся по причинам ('throttled', 'timeout', ...).
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, max_total=RETRY_MAX_TOTAL,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, retry_after_max=RETRY_AFTER_MAX):
+        """Инициализация RetryScheduler
+
+        Args:
+            max_attempts (int): Повторов на один URL
+            max_total (int): Повторов за весь запуск
+            base_delay (float): Базовая задержка backoff (сек)
+            max_delay (float): Максимальная задержка backoff (сек)
+            retry_after_max (float): Максимальное ожидание по Retry-After (сек)
+        """
+        self.max_attempts = max_attempts
+        self.max_total = max_total
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_after_max = retry_after_max
+
+        self.heap = []
+        self.counter = itertools.count()
+        self.attempts = {}
+        self.total = 0
+        self.lock = threading.Lock()
+        self.stats = {}  # ✅ {причина: {'retried': n, 'gave_up': n}}
+
+    def backoff(self, attempt, retry_after=None):
+        """Задержка перед повтором номер ``attempt`` (с 1)"""
+        if retry_after is not None:
+            return min(retry_after, self.retry_after_max) + random.uniform(0, self.base_delay)
+        # ✅ Полный джиттер: повторы не приходят волной в один момент
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def schedule(self, url, reason, retry_after=None):
+        """Запланировать повтор
+
+        Args:
+            url (str): URL
+            reason (str): Причина ('throttled', 'timeout', 'server', 'network')
+            retry_after (float): Задержка из заголовка Retry-After
+
+        Returns:
+            bool: True - повтор запланирован, False - лимит попыток исчерпан
+        """
+        with self.lock:
+            counters = self.stats.setdefault(reason, {'retried': 0, 'gave_up': 0})
+            attempt = self.attempts.get(url, 0) + 1
+            if attempt > self.max_attempts or self.total >= self.max_total:
+                counters['gave_up'] += 1
+                self.attempts.pop(url, None)
+                return False
+
+            self.attempts[url] = attempt
+            self.total += 1
+            counters['retried'] += 1
+            due = time.monotonic() + self.backoff(attempt, retry_after)
+            heapq.heappush(self.heap, (due, next(self.counter), url))
+            return True
+
+    def done(self, url):
+        """URL обработан успешно - забыть счётчик попыток"""
+        with self.lock:
+            self.attempts.pop(url, None)
+
+    @property
+    def pending(self):
+        """Сколько повторов ждёт своего времени"""
+        return len(self.heap)
+
+    def next_delay(self):
+        """Секунд до ближайшего повтора (None, если очередь пуста)"""
+        with self.lock:
+            if not self.heap:
+                return None
+            return max(0.0, self.heap[0][0] - time.monotonic())
+
+    def pop_due(self):
+        """Забрать все URL, время повтора которых наступило"""
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                due.append(heapq.heappop(self.heap)[2])
+        return due
+
+    def print_stats(self):
+        """Вывести счётчики повторов по причинам"""
+        if not self.stats:
+            return
+        parts = [
+            f"{reason} {counters['retried']} (отказ {counters['gave_up']})"
+            for reason, counters in sorted(self.stats.items())
+        ]
+        print(f"🔁 Повторы: {' | '.join(parts)} | всего {self.total}/{self.max_total}")
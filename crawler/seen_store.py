@@ -0,0 +1,156 @@
+"""Хранилище уже виденных объявлений для инкрементального парсинга (SQLite)"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from config import SEEN_STORE_PATH, REFRESH_INTERVAL, SINK_BATCH_SIZE
+from crawler.dedupe import sale_key
+
+
+class SeenStore:
+    """История объявлений между запусками
+
+    Для каждого объявления хранится, когда оно впервые и в последний раз
+    встретилось в выдаче, когда последний раз скачивались детали и когда
+    оно пропало из выдачи. Стоит между сбором ссылок и парсингом деталей:
+    ``observe`` возвращает только новые объявления и те, у которых истёк
+    ``refresh_interval``. Отметки ``mark_fetched`` копятся в памяти и
+    пишутся одной транзакцией на ``batch_size`` записей (как пачки
+    ResultSink), а не коммитом на каждое объявление.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS listings (
+            sale_id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            last_fetched REAL,
+            removed_at REAL
+        )
+    '''
+
+    def __init__(self, path=SEEN_STORE_PATH, refresh_interval=REFRESH_INTERVAL, batch_size=SINK_BATCH_SIZE):
+        """Инициализация SeenStore
+
+        Args:
+            path (str): Файл SQLite
+            refresh_interval (int): Через сколько секунд детали скачиваются повторно
+            batch_size (int): Сколько отметок о скачивании копить до записи
+        """
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.fetched = []  # ✅ (время, sale_id) ещё не записанных отметок
+        self.lock = threading.Lock()
+        self.run_started = time.time()
+        self.stats = {'new': 0, 'refresh': 0, 'skipped': 0, 'removed': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+
+    def begin_run(self):
+        """Начать новый запуск (для пометки пропавших объявлений)"""
+        self.run_started = time.time()
+        self.stats = {'new': 0, 'refresh': 0, 'skipped': 0, 'removed': 0}
+
+    def observe(self, urls):
+        """Отметить ссылки из выдачи и выбрать те, что нужно скачать
+
+        Args:
+            urls (list): Ссылки со страницы (или всех страниц)
+
+        Returns:
+            list: Ссылки, для которых нужно скачать детали
+        """
+        now = time.time()
+        to_fetch = []
+
+        with self.lock:
+            for url in urls:
+                key = sale_key(url)
+                row = self.conn.execute(
+                    'SELECT last_seen, last_fetched FROM listings WHERE sale_id = ?', (key,)
+                ).fetchone()
+
+                if row is None:
+                    self.conn.execute(
+                        'INSERT INTO listings (sale_id, url, first_seen, last_seen) VALUES (?, ?, ?, ?)',
+                        (key, url, now, now)
+                    )
+                    self.stats['new'] += 1
+                    to_fetch.append(url)
+                    continue
+
+                last_seen, last_fetched = row
+                self.conn.execute(
+                    'UPDATE listings SET last_seen = ?, url = ?, removed_at = NULL WHERE sale_id = ?',
+                    (now, url, key)
+                )
+                if last_seen >= self.run_started:
+                    continue  # ✅ Уже встречалось в этом запуске
+                if last_fetched is None or now - last_fetched >= self.refresh_interval:
+                    self.stats['refresh'] += 1
+                    to_fetch.append(url)
+                else:
+                    self.stats['skipped'] += 1
+
+            self.conn.commit()
+
+        return to_fetch
+
+    def mark_fetched(self, url):
+        """Детали объявления успешно скачаны (запись - пачкой по ``batch_size``)"""
+        with self.lock:
+            self.fetched.append((time.time(), sale_key(url)))
+            if len(self.fetched) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Записать накопленные отметки о скачивании"""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self.fetched:
+            self.conn.executemany('UPDATE listings SET last_fetched = ? WHERE sale_id = ?', self.fetched)
+            self.conn.commit()
+            self.fetched = []
+
+    def finish_run(self):
+        """Пометить как удалённые объявления, не встретившиеся в этом запуске
+
+        Вызывать только после полного (не прерванного и не ограниченного
+        max_pages) сбора выдачи.
+
+        Returns:
+            int: Количество помеченных объявлений
+        """
+        with self.lock:
+            self._flush_locked()
+            cursor = self.conn.execute(
+                'UPDATE listings SET removed_at = ? WHERE last_seen < ? AND removed_at IS NULL',
+                (time.time(), self.run_started)
+            )
+            self.conn.commit()
+            self.stats['removed'] = cursor.rowcount
+        return cursor.rowcount
+
+    def print_stats(self):
+        """Вывести статистику инкрементального режима"""
+        s = self.stats
+        print(f"🔁 Инкрементальный режим: новых {s['new']} | обновить {s['refresh']} | "
+              f"пропущено {s['skipped']} | снято с продажи {s['removed']}")
+
+    def close(self):
+        """Записать остатки и закрыть базу"""
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
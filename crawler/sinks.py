@@ -0,0 +1,413 @@
+"""Потоковая запись результатов парсинга (JSONL / CSV / Parquet / датасет Parquet)"""
+
+import csv
+import datetime
+import glob
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+
+from config import SINK_FORMAT, SINK_BATCH_SIZE, OUTPUT_FILENAME, DATASET_PARTITION_BY_BRAND
+from crawler import metrics
+from crawler.records import CarRecord
+
+
+class ResultSink:
+    """Базовый класс потокового хранилища записей
+
+    Записи копятся в небольшом буфере и сбрасываются на диск пачками по
+    ``batch_size``, поэтому память не растёт вместе с количеством
+    объявлений, а уже сброшенные данные можно читать во время парсинга.
+    В буфере лежат компактные ``CarRecord`` - в строки {колонка: значение}
+    они превращаются только при записи пачки.
+    """
+
+    EXTENSION = ''
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE, append=False):
+        """Инициализация ResultSink
+
+        Args:
+            path (str): Путь к файлу с результатами
+            batch_size (int): Размер пачки для сброса на диск
+            append (bool): Дописывать в существующий файл
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+        self.lock = threading.Lock()  # ✅ Пишут сразу несколько потоков
+
+        if not append and os.path.exists(path):
+            os.remove(path)
+        elif append:
+            self.count = self._count_existing()
+
+    # ==================== PUBLIC API ====================
+    def add(self, record):
+        """Добавить запись (CarRecord или dict; сброс на диск при заполнении буфера)"""
+        with self.lock:
+            self.buffer.append(record)
+            self.count += 1
+            metrics.record()
+            if len(self.buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """Принудительно сбросить буфер на диск"""
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        """Сбросить остатки и закрыть файл"""
+        self.flush()
+
+    def read_dataframe(self, columns=None):
+        """Прочитать всё, что уже записано, в DataFrame
+
+        Args:
+            columns (list): Только эти колонки (None - все)
+        """
+        self.flush()
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        df = self._read()
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return CarRecord.apply_dtypes(df)
+
+    def read_records(self):
+        """Прочитать записанные данные как список словарей"""
+        return self.read_dataframe().to_dict('records')
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==================== BACKEND ====================
+    def _flush_locked(self):
+        if self.buffer:
+            with metrics.timed('export'):
+                self._write_batch([
+                    record.to_row() if isinstance(record, CarRecord) else record
+                    for record in self.buffer
+                ])
+            self.buffer = []
+
+    def _count_existing(self):
+        if not os.path.exists(self.path):
+            return 0
+        return len(self._read())
+
+    def _write_batch(self, records):
+        raise NotImplementedError
+
+    def _read(self):
+        raise NotImplementedError
+
+
+class JsonlSink(ResultSink):
+    """JSON Lines: одна запись - одна строка, дописывается без перечитывания"""
+
+    EXTENSION = '.jsonl'
+
+    def _write_batch(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(r, ensure_ascii=False, default=str) + '\n' for r in records)
+
+    def _read(self):
+        return pd.read_json(self.path, lines=True, dtype=False)
+
+    def _count_existing(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            return sum(1 for _ in f)
+
+
+class CsvSink(ResultSink):
+    """CSV: заголовок пишется один раз, далее строки дописываются"""
+
+    EXTENSION = '.csv'
+
+    def _write_batch(self, records):
+        write_header = not os.path.exists(self.path)
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0].keys()), extrasaction='ignore')
+            if write_header:
+                writer.writeheader()
+            writer.writerows(records)
+
+    def _read(self):
+        return pd.read_csv(self.path, dtype=str, keep_default_na=False)
+
+
+class ParquetSink(ResultSink):
+    """Parquet: каждая пачка - отдельная row group (нужен pyarrow)
+
+    ParquetWriter открыт на весь запуск, пачки дописываются без перезаписи
+    файла. Footer пишется только при закрытии, поэтому чтение во время
+    парсинга закрывает текущий файл, а следующие пачки идут в новый
+    part-файл рядом (``<path>.part-NNNN``). При закрытии part-файлы один раз
+    переливаются в ``path`` по row group'ам. Так же дописывается и
+    существующий файл (append).
+    """
+
+    EXTENSION = '.parquet'
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE, append=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Для SINK_FORMAT='parquet' установите pyarrow: pip install pyarrow")
+
+        self._pa = pa
+        self._pq = pq
+        self._writer = None
+        self._writer_path = None
+        self._schema = None
+        self._files = []  # ✅ Закрытые файлы запуска по порядку: path, затем part-файлы
+
+        for part in glob.glob(glob.escape(path) + '.part-*'):
+            os.remove(part)  # ✅ Остатки прерванного запуска
+        super().__init__(path, batch_size=batch_size, append=append)
+
+        if append and os.path.exists(path):
+            self._files.append(path)
+            self._schema = pq.ParquetFile(path).schema_arrow
+
+    def _open_writer(self):
+        filename = f"{self.path}.part-{len(self._files):04d}" if self._files else self.path
+        self._writer = self._pq.ParquetWriter(filename, self._schema)
+        self._writer_path = filename
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._files.append(self._writer_path)
+            self._writer = None
+
+    def _write_batch(self, records):
+        if self._schema is None:
+            if list(records[0]) == CarRecord.column_names():
+                # ✅ Типизированная схема: числа - int64/float64, категории - словарные колонки
+                self._schema = CarRecord.arrow_schema(self._pa)
+            else:
+                self._schema = self._pa.Table.from_pylist(records).schema
+        if self._writer is None:
+            self._open_writer()
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self._schema))
+
+    def close(self):
+        super().close()
+        with self.lock:
+            self._close_writer()
+            if len(self._files) > 1:
+                self._merge_parts()
+
+    def _merge_parts(self):
+        """Перелить part-файлы в ``path`` по одной row group (без чтения всей таблицы)"""
+        merged = self.path + '.merge'
+        with self._pq.ParquetWriter(merged, self._schema) as writer:
+            for filename in self._files:
+                source = self._pq.ParquetFile(filename)
+                for index in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(index))
+        os.replace(merged, self.path)
+        for filename in self._files[1:]:
+            os.remove(filename)
+        self._files = [self.path]
+
+    def _count_existing(self):
+        if not os.path.exists(self.path):
+            return 0
+        return self._pq.ParquetFile(self.path).metadata.num_rows
+
+    def _read(self):
+        # ✅ Footer пишется только при закрытии - закрываем текущий файл, новые пачки пойдут в part-файл
+        with self.lock:
+            self._close_writer()
+            tables = [self._pq.read_table(filename) for filename in self._files]
+        if not tables:
+            return pd.DataFrame()
+        return self._pa.concat_tables(tables).to_pandas()
+
+
+class ParquetDatasetSink(ResultSink):
+    """Каталог Parquet с Hive-разбиением: crawl_date=.../[brand=...]/part-*.parquet
+
+    На каждый раздел открыт свой ParquetWriter, каждая пачка - row group в
+    файле своего раздела. Читатели (pandas, pyarrow, DuckDB, Spark) грузят
+    только нужные колонки и разделы, не разбирая весь файл. Каждый запуск
+    пишет новые part-файлы, поэтому дозапись (``--resume``) ничего не
+    перезаписывает.
+    """
+
+    EXTENSION = '_dataset'
+    BRAND_RE = re.compile(r'/sale/([^/]+)/')
+    PARTITION_COLUMNS = ('crawl_date', 'brand')
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE, append=False,
+                 partition_by_brand=DATASET_PARTITION_BY_BRAND):
+        """Инициализация ParquetDatasetSink
+
+        Args:
+            path (str): Каталог датасета
+            batch_size (int): Размер пачки (= row group)
+            append (bool): Дописывать в существующий каталог
+            partition_by_brand (bool): Дополнительно разбивать по марке из URL
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Для SINK_FORMAT='dataset' установите pyarrow: pip install pyarrow")
+
+        self._pa = pa
+        self._pq = pq
+        self.partition_by_brand = partition_by_brand
+        self._writers = {}
+        self._schema = None
+        self._run = uuid.uuid4().hex[:8]
+        self._parts = 0
+
+        if not append and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+        super().__init__(path, batch_size=batch_size, append=True)
+
+    # ==================== PARTITIONS ====================
+    def partition(self, row, crawl_date):
+        """Относительный путь раздела для строки"""
+        parts = [f"crawl_date={crawl_date}"]
+        if self.partition_by_brand:
+            match = self.BRAND_RE.search(row.get('URL') or '')
+            parts.append(f"brand={match.group(1) if match else 'unknown'}")
+        return os.path.join(*parts)
+
+    def _writer(self, partition):
+        writer = self._writers.get(partition)
+        if writer is None:
+            directory = os.path.join(self.path, partition)
+            os.makedirs(directory, exist_ok=True)
+            self._parts += 1
+            filename = os.path.join(directory, f"part-{self._run}-{self._parts:04d}.parquet")
+            writer = self._writers[partition] = self._pq.ParquetWriter(filename, self._schema)
+        return writer
+
+    def _close_writers(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def files(self):
+        """Готовые part-файлы датасета"""
+        return sorted(glob.glob(os.path.join(self.path, '**', '*.parquet'), recursive=True))
+
+    # ==================== BACKEND ====================
+    def _write_batch(self, records):
+        if self._schema is None:
+            if list(records[0]) == CarRecord.column_names():
+                self._schema = CarRecord.arrow_schema(self._pa)
+            else:
+                self._schema = self._pa.Table.from_pylist(records).schema
+
+        crawl_date = datetime.date.today().isoformat()
+        groups = {}
+        for row in records:
+            groups.setdefault(self.partition(row, crawl_date), []).append(row)
+        for partition, rows in groups.items():
+            table = self._pa.Table.from_pylist(rows, schema=self._schema)
+            self._writer(partition).write_table(table)
+
+    def close(self):
+        super().close()
+        self._close_writers()
+
+    def _count_existing(self):
+        return sum(self._pq.ParquetFile(f).metadata.num_rows for f in self.files())
+
+    def read_dataframe(self, columns=None, filters=None):
+        """Прочитать датасет с отбором колонок и разделов
+
+        Колонки разделов (crawl_date, brand) - служебные: они возвращаются,
+        только если явно перечислены в ``columns``. Без них таблица совпадает
+        с другими форматами хранилища (те же колонки в том же порядке).
+
+        Args:
+            columns (list): Только эти колонки (None - колонки записей)
+            filters (list): Отбор разделов, например [('brand', '=', 'toyota')]
+        """
+        self.flush()
+        # ✅ Footer пишется при закрытии - закрываем файлы, новые пачки пойдут в новые part-файлы
+        self._close_writers()
+        df = read_dataset(self.path, columns=columns, filters=filters)
+        if columns is None:
+            df = self._drop_partitions(df)
+        return CarRecord.apply_dtypes(df)
+
+    def _read(self):
+        self._close_writers()
+        return self._drop_partitions(read_dataset(self.path))
+
+    def _drop_partitions(self, df):
+        return df.drop(columns=[column for column in self.PARTITION_COLUMNS if column in df.columns])
+
+
+def read_dataset(path, columns=None, filters=None):
+    """Прочитать датасет Parquet (каталог с разделами crawl_date=/brand=)
+
+    Args:
+        path (str): Каталог датасета
+        columns (list): Только эти колонки (None - все)
+        filters (list): Отбор разделов в формате pyarrow
+
+    Returns:
+        pd.DataFrame: Данные (колонки разделов - в конце)
+    """
+    import pyarrow.parquet as pq
+
+    if not glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True):
+        return pd.DataFrame()
+    table = pq.read_table(path, columns=columns, filters=filters, partitioning='hive')
+    return table.to_pandas()
+
+
+SINKS = {
+    'jsonl': JsonlSink,
+    'csv': CsvSink,
+    'parquet': ParquetSink,
+    'dataset': ParquetDatasetSink,
+}
+
+
+def create_sink(fmt=SINK_FORMAT, path=None, batch_size=SINK_BATCH_SIZE, append=False):
+    """Создать хранилище результатов
+
+    Args:
+        fmt (str): 'jsonl', 'csv', 'parquet' или 'dataset'
+        path (str): Путь к файлу или каталогу (по умолчанию рядом с OUTPUT_FILENAME)
+        batch_size (int): Размер пачки
+        append (bool): Дописывать в существующий файл
+
+    Returns:
+        ResultSink: Хранилище
+    """
+    if fmt not in SINKS:
+        raise ValueError(f"Неизвестный формат хранилища: {fmt} (доступны: {', '.join(SINKS)})")
+
+    sink_class = SINKS[fmt]
+    if path is None:
+        path = os.path.splitext(OUTPUT_FILENAME)[0] + sink_class.EXTENSION
+    return sink_class(path, batch_size=batch_size, append=append)
@@ -4,9 +4,15 @@
 from pages.base_page import BasePage
 from pages.listing_page import ListingPage
 from pages.car_detail_page import CarDetailPage
+from pages.http_listing_page import HttpListingPage
+from pages.query_planner import QueryPlanner, PartitionedListingPage, create_listing
 
 __all__ = [
     'BasePage',
     'ListingPage',
-    'CarDetailPage'
+    'CarDetailPage',
+    'HttpListingPage',
+    'QueryPlanner',
+    'PartitionedListingPage',
+    'create_listing'
 ]
@@ -1,11 +1,24 @@
 # pages/car_detail_page.py
 """Page Object для деталей объявления на auto.ru - ОПТИМИЗИРОВАННАЯ"""
 
+import time
+
 import requests
 from lxml import html
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from config import REQUEST_TIMEOUT, CONNECTION_POOL_CONNECTIONS, CONNECTION_POOL_MAXSIZE, RETRIES
+from config import (
+    REQUEST_TIMEOUT, CONNECTION_POOL_CONNECTIONS, CONNECTION_POOL_MAXSIZE, RETRIES, USE_PAGE_STATE,
+    RETRY_AFTER_MAX
+)
+from pages.extraction import DEFAULT_PLAN, get_extractor
+from pages.page_state import DEFAULT_STATE_EXTRACTOR
+from pages.http_listing_page import HttpListingPage
+from crawler.records import CarRecord
+from crawler.http_cache import HttpCache, get_http_cache
+from crawler.rate_limit import throttle, backoff
+from crawler.retry import parse_retry_after
+from crawler import metrics
 
 
 class CarDetailPage:
@@ -14,31 +27,27 @@ class CarDetailPage:
     # ==================== КЛАСС-ПЕРЕМЕННЫЕ ====================
     _session = None  # ✅ Переиспользуемая сессия
     
-    # ==================== LOCATORS (XPath) - ИСПРАВЛЕННЫЕ ====================
-    TITLE = '//h1[@class="CardHead__title"]/text()'
-    YEAR = '(//a[@class="Link Link_color_black"]/text())[2]'
-    MILEAGE = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[1]'
-    OWNERS = '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[2]'
-    # ✅ ИСПРАВЛЕНО: Состояние может быть в разных позициях
-    CONDITION = '//span[contains(text(), "состояни") or contains(text(), "Состояни")]/following-sibling::*/text() | //div[contains(@class, "CardInfoSummarySimpleRow")]/following-sibling::div//div[contains(text(), "Исправн") or contains(text(), "Деформ") or contains(text(), "Битые") or contains(text(), "Перекр")]/text()'
-    TRANSMISSION = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[2]'
-    ENGINE = '(//div[@class="CardInfoSummaryComplexRow__cellValue-Hka8p"]/text())[1]'
-    # ✅ ИСПРАВЛЕНО: Дата объявления - более надёжный селектор
-    DATE_POSTED = '//div[contains(@class, "CardHead__creationDate")]/text()'
-    # ✅ ИСПРАВЛЕНО: Количество просмотров - правильный селектор
-    VIEWS = '//div[contains(@class, "CardHead__views")]/text()'
-    PRICE = '//span[@class="OfferPriceCaption__price"]/text()'
+    # ==================== LOCATORS ====================
+    # ✅ XPath-цепочки полей описаны в config.CAR_DETAIL_FIELDS и скомпилированы один раз
+    PLAN = DEFAULT_PLAN
+    EXTRACTOR = get_extractor()  # ✅ get_car_data() - один проход по DOM
+    STATE = DEFAULT_STATE_EXTRACTOR  # ✅ JSON-состояние страницы вместо DOM
     
     # ==================== INIT ====================
-    def __init__(self, car_url):
+    def __init__(self, car_url, content=None):
         """Инициализация CarDetailPage
         
         Args:
             car_url (str): URL объявления
+            content (bytes): Уже скачанная страница (None - загрузить)
         """
         self.car_url = car_url
         self.tree = None
-        self._load_page()
+        self.record = None  # ✅ Заполняется, если на странице есть JSON-состояние
+        if content is None:
+            self._load_page()
+        else:
+            self._accept(content)
     
     # ==================== SESSION MANAGEMENT ====================
     @classmethod
@@ -51,10 +60,11 @@ class CarDetailPage:
         if cls._session is None:
             cls._session = requests.Session()
             
+            # ✅ 429/503 здесь не повторяем: такие повторы идут через throttle() в _load_page
             retry_strategy = Retry(
                 total=RETRIES,
                 backoff_factor=0.1,
-                status_forcelist=[429, 500, 502, 503, 504],
+                status_forcelist=[500, 502, 504],
                 allowed_methods=["GET"]
             )
             
@@ -70,146 +80,110 @@ class CarDetailPage:
         return cls._session
     
     # ==================== PAGE LOADING ====================
+    def _accept(self, content):
+        """Разобрать тело ответа: JSON-состояние или DOM"""
+        if USE_PAGE_STATE:
+            with metrics.timed('extract'):
+                self.record = self.STATE.extract(content, self.car_url)
+        if self.record is None:
+            with metrics.timed('parse'):
+                self.tree = html.fromstring(content)
+    
     def _load_page(self):
-        """Загрузить страницу объявления"""
+        """Загрузить страницу объявления (через HTTP-кэш, если он включён)"""
         try:
+            cache = get_http_cache()
+            entry = cache.lookup(self.car_url, allow_partial=USE_PAGE_STATE) if cache is not None else None
+            if entry is not None and entry.fresh:
+                self._accept(entry.body)
+                return
+            
             session = self.get_session()
-            response = session.get(
-                self.car_url, 
-                timeout=REQUEST_TIMEOUT, 
-                verify=False,
-                headers={'Connection': 'keep-alive'}
-            )
+            for attempt in range(RETRIES + 1):
+                throttle(self.car_url)  # ✅ Общий лимит запросов к сайту - и для повторов
+                started = time.perf_counter()
+                try:
+                    response = session.get(
+                        self.car_url, 
+                        timeout=REQUEST_TIMEOUT, 
+                        verify=False,
+                        headers={'Connection': 'keep-alive', **HttpCache.conditional_headers(entry)}
+                    )
+                except requests.RequestException as e:
+                    metrics.request('card', type(e).__name__, time.perf_counter() - started)
+                    metrics.error('request', type(e).__name__)
+                    raise
+                metrics.response('card', response.status_code, started, response.elapsed)
+                if response.status_code not in (429, 503):
+                    break
+                if attempt == RETRIES:
+                    return  # ✅ Сайт так и не пустил - тело ответа-отказа не разбираем
+                # ✅ Too Many Requests: Retry-After (или пауза с ростом) - общая для всех потоков,
+                # её выдерживает throttle() перед следующей попыткой
+                delay = parse_retry_after(response.headers.get('Retry-After')) or 0.1 * 2 ** attempt
+                if not backoff(self.car_url, delay):
+                    time.sleep(min(delay, RETRY_AFTER_MAX))
+            if response.status_code == 304 and entry is not None:
+                # ✅ Страница не изменилась - берём тело из кэша
+                cache.revalidated(self.car_url, response.headers)
+                self._accept(entry.body)
+                return
+            
+            if response.status_code != 200:
+                return  # ✅ Тело ошибки (404, 5xx) не разбираем
+            if HttpListingPage.is_challenge(response.content, response.url):
+                metrics.error('request', 'challenge')
+                return  # ✅ Капчу не кэшируем: иначе она весь TTL отдавалась бы как свежая страница
+            
             response.encoding = 'utf-8'
-            self.tree = html.fromstring(response.content)
+            if cache is not None:
+                cache.store(self.car_url, response.content, response.headers)
+            self._accept(response.content)
         except:
             pass
     
-    def _get_text(self, xpath, index=0):
-        """Получить текст по XPath (оптимизировано)
-        
-        Args:
-            xpath (str): XPath выражение
-            index (int): Индекс элемента в списке результатов
-            
-        Returns:
-            str: Текст или "N/A"
-        """
-        if self.tree is None:
-            return "N/A"
-        
-        try:
-            result = self.tree.xpath(xpath)
-            if result and len(result) > index:
-                text = str(result[index]).strip() if hasattr(result[index], 'strip') else str(result[index]).strip()
-                return text or "N/A"
-        except:
-            pass
-        return "N/A"
+    # ==================== GETTERS ====================
+    def _field(self, name):
+        """Значение поля: из JSON-состояния, если оно найдено, иначе из DOM"""
+        if self.record is not None:
+            return self.record.value(name)
+        return CarRecord.normalize(name, self.PLAN.extract_field(self.tree, name))
     
-    # ==================== IMPROVED GETTERS ====================
     def get_title(self):
         """Получить название марки"""
-        return self._get_text(self.TITLE)
+        return self._field('title')
     
     def get_year(self):
         """Получить год выпуска"""
-        return self._get_text(self.YEAR)
+        return self._field('year')
     
     def get_mileage(self):
         """Получить пробег"""
-        return self._get_text(self.MILEAGE)
+        return self._field('mileage')
     
     def get_owners(self):
         """Получить количество владельцев"""
-        return self._get_text(self.OWNERS)
+        return self._field('owners')
     
     def get_condition(self):
-        """Получить состояние (ИСПРАВЛЕНО)"""
-        # ✅ Улучшенная логика парсинга состояния
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            # Пробуем разные варианты XPath
-            conditions = [
-                '//span[contains(text(), "Исправн") or contains(text(), "Деформ") or contains(text(), "Битые") or contains(text(), "Перекр")]/text()',
-                '//div[contains(@class, "CardInfoSummarySimpleRow")]//text()[contains(., "Исправн") or contains(., "Деформ") or contains(., "Битые") or contains(., "Перекр")]',
-                '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[3]',
-                '(//div[@class="CardInfoSummarySimpleRow__content-IIKcj"]/text())[4]',
-            ]
-            
-            for xpath in conditions:
-                result = self.tree.xpath(xpath)
-                if result:
-                    text = str(result[0]).strip()
-                    if text and text != "N/A":
-                        return text
-            
-            return "N/A"
-        except:
-            return "N/A"
+        """Получить состояние"""
+        return self._field('condition')
     
     def get_transmission(self):
         """Получить тип коробки"""
-        return self._get_text(self.TRANSMISSION)
+        return self._field('transmission')
     
     def get_engine(self):
         """Получить тип двигателя"""
-        return self._get_text(self.ENGINE)
+        return self._field('engine')
     
     def get_date_posted(self):
-        """Получить дату объявления (ИСПРАВЛЕНО)"""
-        # ✅ Улучшенная логика парсинга даты
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            date_patterns = [
-                '//div[contains(@class, "CardHead__creationDate")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__creationDate"]/text()',
-                '//span[contains(text(), "Объавлено")]/following-sibling::text()',
-                '(//div[@class="CardHead__info"]/div/text())[1]',
-            ]
-            
-            for xpath in date_patterns:
-                result = self.tree.xpath(xpath)
-                if result:
-                    text = str(result[0]).strip()
-                    if text and text != "N/A" and len(text) > 3:
-                        return text
-            
-            return "N/A"
-        except:
-            return "N/A"
+        """Получить дату объявления"""
+        return self._field('date_posted')
     
     def get_views(self):
-        """Получить количество просмотров (ИСПРАВЛЕНО)"""
-        # ✅ Улучшенная логика парсинга просмотров
-        try:
-            if self.tree is None:
-                return "N/A"
-            
-            view_patterns = [
-                '//div[contains(@class, "CardHead__views")]/text()',
-                '//div[@class="CardHead__infoItem CardHead__views"]/text()',
-                '//span[contains(text(), "Просмотр")]/preceding-sibling::text()',
-                '//div[contains(text(), "просмотр")]/preceding-sibling::text()',
-                '(//div[@class="CardHead__info"]/div/text())[2]',
-            ]
-            
-            for xpath in view_patterns:
-                result = self.tree.xpath(xpath)
-                if result:
-                    # ✅ Ищем числа в тексте
-                    text = str(result[0]).strip()
-                    numbers = ''.join(filter(str.isdigit, text))
-                    if numbers:
-                        return numbers
-            
-            return "N/A"
-        except:
-            return "N/A"
+        """Получить количество просмотров"""
+        return self._field('views')
     
     def get_price(self):
         """Получить цену
@@ -217,34 +191,19 @@ class CarDetailPage:
         Returns:
             int: Цена в рублях или 0
         """
-        try:
-            price_text = self._get_text(self.PRICE)
-            if price_text != "N/A":
-                return int(''.join(filter(str.isdigit, price_text)))
-        except:
-            pass
-        return 0
+        return self._field('price')
     
     # ==================== DATA EXPORT ====================
     def get_car_data(self):
-        """Получить все данные объявления (оптимизировано)
+        """Получить все данные объявления
         
         Returns:
-            dict: Словарь со всеми данными объявления
+            CarRecord: Типизированная запись объявления
         """
-        return {
-            'Марка': self.get_title(),
-            'Год выпуска': self.get_year(),
-            'Пробег': self.get_mileage(),
-            'Владельцы': self.get_owners(),
-            'Состояние': self.get_condition(),
-            'Коробка': self.get_transmission(),
-            'Двигатель': self.get_engine(),
-            'Дата объявления': self.get_date_posted(),
-            'Количество просмотров': self.get_views(),
-            'Цена': self.get_price(),
-            'URL': self.car_url
-        }
+        if self.record is not None:
+            return self.record
+        with metrics.timed('extract'):
+            return self.EXTRACTOR.extract(self.tree, self.car_url)
     
     @classmethod
     def close_session(cls):
@@ -0,0 +1,377 @@
+"""Общий движок извлечения полей объявления (предкомпилированные XPath)"""
+
+import re
+
+from lxml import etree
+
+from config import CAR_DETAIL_FIELDS, CAR_DETAIL_SOURCES, EXTRACTION_ENGINE, STREAM_REQUIRED_FIELDS
+from crawler.records import CarRecord
+
+
+class FieldSpec:
+    """Поле объявления: колонка, тип и цепочка скомпилированных XPath
+
+    Элемент цепочки - либо скомпилированный ``etree.XPath``, либо пара
+    ``(источник, индекс)``: ссылка на общий набор узлов из
+    CAR_DETAIL_SOURCES, который вычисляется один раз на страницу.
+    """
+
+    __slots__ = ('name', 'column', 'type', 'default', 'min_len', 'chain')
+
+    def __init__(self, field, column, xpaths, type='text', default='N/A', min_len=1):
+        self.name = field
+        self.column = column
+        self.type = type
+        self.default = default
+        self.min_len = min_len
+        # ✅ Компилируем один раз - дальше только вызовы XPath-объектов
+        self.chain = [
+            step if isinstance(step, tuple) else etree.XPath(step)
+            for step in xpaths
+        ]
+
+    def convert(self, value):
+        """Привести сырой текст к типу поля
+
+        Returns:
+            Значение или None, если текст не подходит
+        """
+        text = str(value).strip()
+        if len(text) < self.min_len:
+            return None
+        if self.type == 'text':
+            return text
+        digits = ''.join(filter(str.isdigit, text))
+        if not digits:
+            return None
+        return int(digits) if self.type == 'int' else digits
+
+    def extract(self, tree, sources):
+        """Пройти по цепочке и вернуть первое подходящее значение
+
+        Args:
+            tree: lxml.html дерево страницы
+            sources (SourceCache): Общие наборы узлов этой страницы
+        """
+        for step in self.chain:
+            try:
+                if isinstance(step, tuple):
+                    name, index = step
+                    values = sources.get(name)
+                    values = values[index:index + 1]
+                else:
+                    values = step(tree)
+                for value in values:
+                    converted = self.convert(value)
+                    if converted is not None:
+                        return converted
+            except Exception:
+                pass
+        return self.default
+
+
+class SourceCache:
+    """Ленивый кэш общих наборов узлов для одной страницы"""
+
+    __slots__ = ('tree', 'compiled', 'values')
+
+    def __init__(self, tree, compiled):
+        self.tree = tree
+        self.compiled = compiled
+        self.values = {}
+
+    def get(self, name):
+        """Получить набор узлов (XPath выполняется один раз)"""
+        if name not in self.values:
+            self.values[name] = self.compiled[name](self.tree)
+        return self.values[name]
+
+
+class ExtractionPlan:
+    """План извлечения: таблица полей из config, скомпилированная один раз
+
+    Используется всеми Page Object'ами деталей (CarDetailPage,
+    AsyncCarDetailPage, SyncCarDetailPage).
+    """
+
+    def __init__(self, field_table=CAR_DETAIL_FIELDS, sources=CAR_DETAIL_SOURCES):
+        """Инициализация ExtractionPlan
+
+        Args:
+            field_table (list): Таблица полей (см. CAR_DETAIL_FIELDS)
+            sources (dict): Общие наборы узлов (см. CAR_DETAIL_SOURCES)
+        """
+        self.sources = {name: etree.XPath(xpath) for name, xpath in sources.items()}
+        self.fields = [FieldSpec(**row) for row in field_table]
+        self.by_name = {spec.name: spec for spec in self.fields}
+
+    def extract_field(self, tree, name):
+        """Извлечь одно поле по его имени ('title', 'price', ...)"""
+        spec = self.by_name[name]
+        if tree is None:
+            return spec.default
+        return spec.extract(tree, SourceCache(tree, self.sources))
+
+    def extract(self, tree, url):
+        """Извлечь все поля объявления
+
+        Args:
+            tree: lxml.html дерево страницы (или None)
+            url (str): URL объявления
+
+        Returns:
+            CarRecord: Типизированная запись
+        """
+        if tree is None:
+            values = {spec.name: spec.default for spec in self.fields}
+        else:
+            sources = SourceCache(tree, self.sources)
+            values = {spec.name: spec.extract(tree, sources) for spec in self.fields}
+        return CarRecord.from_fields(values, url)
+
+
+# ✅ Общий экземпляр - компиляция выполняется один раз при импорте
+DEFAULT_PLAN = ExtractionPlan()
+
+
+class SinglePassExtractor:
+    """Извлечение всех полей за один обход DOM
+
+    Вместо 10-20 XPath-сканирований всего документа дерево обходится
+    один раз: для каждого элемента решение принимается по атрибуту class
+    и (для состояния) по текстовым маркерам. Стоимость - O(узлов), а не
+    O(узлов x полей). Поля, которые не удалось найти за проход, добираются
+    цепочками ExtractionPlan.
+    """
+
+    # ==================== DISPATCH TABLE ====================
+    # Точное совпадение class -> общий набор значений (как CAR_DETAIL_SOURCES)
+    CLASS_SOURCES = {
+        'Link Link_color_black': 'black_links',
+        'CardInfoSummarySimpleRow__content-IIKcj': 'simple_row',
+        'CardInfoSummaryComplexRow__cellValue-Hka8p': 'complex_row',
+    }
+    # Подстрока class -> поле (берётся первое непустое значение)
+    CLASS_FIELDS = (
+        ('CardHead__title', 'title'),
+        ('CardHead__creationDate', 'date_posted'),
+        ('CardHead__views', 'views'),
+        ('OfferPriceCaption__price', 'price'),
+    )
+    HEAD_INFO_CLASS = 'CardHead__info'
+    CONDITION_MARKERS = ('Исправн', 'Деформ', 'Битые', 'Перекр')
+    CONDITION_TAGS = ('span', 'div')
+
+    # ✅ Одна regex-проверка на элемент вместо цикла по подстрокам
+    CLASS_FIELDS_RE = re.compile('|'.join(re.escape(marker) for marker, _ in CLASS_FIELDS))
+    CLASS_FIELD_BY_MARKER = dict(CLASS_FIELDS)
+    CONDITION_RE = re.compile('|'.join(CONDITION_MARKERS))
+
+    # Откуда брать поле, если в проходе нашёлся только общий набор
+    SOURCE_FIELDS = {
+        'year': ('black_links', 1),
+        'mileage': ('simple_row', 0),
+        'owners': ('simple_row', 1),
+        'transmission': ('complex_row', 1),
+        'engine': ('complex_row', 0),
+    }
+    SOURCE_FALLBACKS = {
+        'condition': (('simple_row', 2), ('simple_row', 3)),
+        'date_posted': (('head_info', 0),),
+        'views': (('head_info', 1),),
+    }
+
+    def __init__(self, plan=DEFAULT_PLAN):
+        """Инициализация SinglePassExtractor
+
+        Args:
+            plan (ExtractionPlan): Таблица полей (типы, значения по умолчанию,
+                XPath-цепочки для добора недостающих полей)
+        """
+        self.plan = plan
+
+    @staticmethod
+    def _own_texts(element):
+        """Прямые текстовые узлы элемента (аналог ``./text()``)"""
+        texts = [element.text] if element.text else []
+        texts.extend(child.tail for child in element if child.tail)
+        return texts
+
+    WALK_TAGS = ('a', 'div', 'span', 'h1')
+
+    @staticmethod
+    def new_sources():
+        """Пустые общие наборы значений"""
+        return {'black_links': [], 'simple_row': [], 'complex_row': [], 'head_info': []}
+
+    def walk(self, elements, found, sources):
+        """Обработать элементы и дополнить сырые значения полей и наборов
+
+        Args:
+            elements (iterable): Элементы (обход дерева или события парсера)
+            found (dict): {поле: [сырые значения]} - дополняется на месте
+            sources (dict): Общие наборы - дополняются на месте
+        """
+        class_sources = self.CLASS_SOURCES
+        class_fields_search = self.CLASS_FIELDS_RE.search
+        field_by_marker = self.CLASS_FIELD_BY_MARKER
+        condition_search = self.CONDITION_RE.search
+        condition_tags = self.CONDITION_TAGS
+
+        for element in elements:
+            css_class = element.get('class')
+
+            if css_class:
+                source = class_sources.get(css_class)
+                if source is not None:
+                    sources[source].extend(self._own_texts(element))
+                    continue
+
+                if css_class == self.HEAD_INFO_CLASS:
+                    for child in element:
+                        if child.tag == 'div':
+                            sources['head_info'].extend(self._own_texts(child))
+
+                match = class_fields_search(css_class)
+                if match is not None:
+                    field = field_by_marker[match.group()]
+                    found.setdefault(field, []).extend(self._own_texts(element))
+
+            if 'condition' not in found and element.tag in condition_tags:
+                text = element.text
+                if text and condition_search(text):
+                    found['condition'] = [text]
+
+    def resolve(self, found, sources, use_fallbacks=True):
+        """Превратить сырые значения в запись
+
+        Args:
+            found (dict): Сырые значения полей
+            sources (dict): Общие наборы
+            use_fallbacks (bool): Учитывать позиционные запасные варианты
+
+        Returns:
+            tuple: (dict {поле: значение}, list ненайденных FieldSpec)
+        """
+        values = {}
+        missing = []
+
+        for spec in self.plan.fields:
+            candidates = list(found.get(spec.name, ()))
+            if spec.name in self.SOURCE_FIELDS:
+                name, index = self.SOURCE_FIELDS[spec.name]
+                candidates.extend(sources[name][index:index + 1])
+            if use_fallbacks:
+                for name, index in self.SOURCE_FALLBACKS.get(spec.name, ()):
+                    candidates.extend(sources[name][index:index + 1])
+
+            value = None
+            for candidate in candidates:
+                value = spec.convert(candidate)
+                if value is not None:
+                    break
+
+            if value is None:
+                missing.append(spec)
+                value = spec.default
+            values[spec.name] = value
+
+        return values, missing
+
+    def finish(self, tree, found, sources, url):
+        """Собрать CarRecord; недостающие поля добрать XPath-цепочками"""
+        values, missing = self.resolve(found, sources)
+
+        if missing and tree is not None:
+            # ✅ Редкий случай: добираем недостающие поля XPath-цепочками
+            cache = SourceCache(tree, self.plan.sources)
+            for spec in missing:
+                values[spec.name] = spec.extract(tree, cache)
+
+        return CarRecord.from_fields(values, url)
+
+    def extract(self, tree, url):
+        """Извлечь все поля объявления за один проход
+
+        Args:
+            tree: lxml.html дерево страницы (или None)
+            url (str): URL объявления
+
+        Returns:
+            CarRecord: Типизированная запись (как у ExtractionPlan)
+        """
+        if tree is None:
+            return self.plan.extract(None, url)
+
+        found, sources = {}, self.new_sources()
+        self.walk(tree.iter(tag=self.WALK_TAGS), found, sources)
+        return self.finish(tree, found, sources, url)
+
+
+class StreamingExtraction:
+    """Инкрементальный разбор тела ответа с ранней остановкой
+
+    Куски ответа подаются в ``etree.HTMLPullParser`` по мере получения,
+    закрытые элементы сразу проходят через SinglePassExtractor. Как только
+    найдены обязательные поля (``required``, без позиционных запасных
+    вариантов), ``feed`` возвращает True - остаток страницы (скрипты,
+    футер) можно не качать. Необязательные поля, не встреченные к этому
+    моменту, добираются в ``finish`` из прочитанной части.
+    """
+
+    def __init__(self, extractor=None, encoding=None, required=STREAM_REQUIRED_FIELDS):
+        """Инициализация StreamingExtraction
+
+        Args:
+            extractor (SinglePassExtractor): Движок извлечения
+            encoding (str): Кодировка ответа (None - определить по странице)
+            required (tuple): Поля, после которых разбор считается завершённым
+        """
+        self.extractor = extractor or DEFAULT_EXTRACTOR
+        self.required = frozenset(required)
+        self.parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+        self.found = {}
+        self.sources = self.extractor.new_sources()
+        self.bytes_read = 0
+        self.complete = False
+
+    def feed(self, chunk):
+        """Подать очередной кусок ответа
+
+        Returns:
+            bool: True, если обязательные поля уже найдены
+        """
+        self.parser.feed(chunk)
+        self.bytes_read += len(chunk)
+
+        walk_tags = self.extractor.WALK_TAGS
+        elements = (element for _, element in self.parser.read_events() if element.tag in walk_tags)
+        self.extractor.walk(elements, self.found, self.sources)
+
+        _, missing = self.extractor.resolve(self.found, self.sources, use_fallbacks=False)
+        self.complete = not any(spec.name in self.required for spec in missing)
+        return self.complete
+
+    def finish(self, url):
+        """Завершить разбор
+
+        Returns:
+            tuple: (дерево документа (возможно, неполное), CarRecord)
+        """
+        tree = self.parser.close()
+        return tree, self.extractor.finish(tree, self.found, self.sources, url)
+
+
+DEFAULT_EXTRACTOR = SinglePassExtractor()
+
+EXTRACTORS = {
+    'xpath': DEFAULT_PLAN,
+    'single_pass': DEFAULT_EXTRACTOR,
+}
+
+
+def get_extractor(engine=EXTRACTION_ENGINE):
+    """Получить движок извлечения по имени ('xpath' или 'single_pass')"""
+    if engine not in EXTRACTORS:
+        raise ValueError(f"Неизвестный движок извлечения: {engine} (доступны: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[engine]
@@ -0,0 +1,269 @@
+"""Page Object для списка объявлений без браузера (requests / aiohttp + lxml)"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import aiohttp
+from lxml import html
+
+from pages.listing_page import extract_car_links, extract_total_count, extract_total_pages
+from crawler.rate_limit import throttle, throttle_async
+from crawler import metrics
+from config import REQUEST_TIMEOUT, USER_AGENT, CHALLENGE_MARKERS
+
+
+class HttpListingPage:
+    """Page Object для страниц выдачи, загружаемых обычным HTTP
+
+    Selenium не используется: страницы ``base_url&page=N`` скачиваются
+    параллельно и разбираются lxml. Страницы, на которых пришла капча или
+    не нашлось ни одной ссылки, возвращаются вызывающему коду отдельным
+    списком - их нужно добрать через ``ListingPage`` (Selenium).
+    """
+
+    HEADERS = {
+        'User-Agent': USER_AGENT,
+        'Accept-Language': 'ru-RU,ru;q=0.9',
+    }
+
+    # ==================== INIT ====================
+    def __init__(self, base_url):
+        """Инициализация HttpListingPage
+
+        Args:
+            base_url (str): URL выдачи (уже содержит "?price_to=...")
+        """
+        self.base_url = base_url
+
+    def get_page_url(self, page_num):
+        """Получить URL страницы выдачи"""
+        return f"{self.base_url}&page={page_num}"
+
+    # ==================== PARSING ====================
+    @staticmethod
+    def is_challenge(content, url=''):
+        """Проверить, не вернул ли сайт капчу вместо выдачи"""
+        if 'captcha' in str(url):
+            return True
+        head = content[:20000]
+        return any(marker in head for marker in CHALLENGE_MARKERS)
+
+    @classmethod
+    def parse_links(cls, content, url=''):
+        """Разобрать страницу выдачи
+
+        Args:
+            content (bytes): Тело ответа
+            url (str): Итоговый URL (после редиректов)
+
+        Returns:
+            list | None: Ссылки на объявления или None, если страницу
+            нужно загрузить через Selenium
+        """
+        if not content or cls.is_challenge(content, url):
+            return None
+        try:
+            with metrics.timed('listing_parse'):
+                links = extract_car_links(html.fromstring(content))
+        except Exception:
+            return None
+        return links or None
+
+    @classmethod
+    def parse_probe(cls, content, url=''):
+        """Разобрать первую страницу запроса: размер выдачи и её ссылки
+
+        Returns:
+            tuple | None: (количество объявлений или None, страниц или None,
+            ссылки) или None, если пришла капча
+        """
+        if not content or cls.is_challenge(content, url):
+            return None
+        with metrics.timed('listing_parse'):
+            tree = html.fromstring(content)
+            return extract_total_count(tree), extract_total_pages(tree), extract_car_links(tree)
+
+    # ==================== PLAN HOOKS ====================
+    def plan_state(self):
+        """Состояние разбиения выдачи для контрольной точки (None - одна выдача)"""
+        return None
+
+    def load_plan(self, state):
+        """Восстановить разбиение выдачи из контрольной точки"""
+
+    # ==================== SYNC (requests) ====================
+    def fetch_page(self, session, page_num):
+        """Загрузить и разобрать страницу через requests
+
+        Returns:
+            list | None: Ссылки или None (нужен fallback)
+        """
+        try:
+            throttle(self.get_page_url(page_num))
+            started = time.perf_counter()
+            response = session.get(
+                self.get_page_url(page_num),
+                headers=self.HEADERS,
+                timeout=REQUEST_TIMEOUT,
+                verify=False,
+                allow_redirects=True
+            )
+            metrics.response('listing', response.status_code, started, response.elapsed)
+            if response.status_code != 200:
+                return None
+            return self.parse_links(response.content, response.url)
+        except Exception as e:
+            metrics.error('listing', type(e).__name__)
+            return None
+
+    def probe(self, session, url):
+        """Загрузить первую страницу запроса ``url`` (см. ``parse_probe``)"""
+        try:
+            throttle(url)
+            started = time.perf_counter()
+            response = session.get(
+                f"{url}&page=1",
+                headers=self.HEADERS,
+                timeout=REQUEST_TIMEOUT,
+                verify=False,
+                allow_redirects=True
+            )
+            metrics.response('listing', response.status_code, started, response.elapsed)
+            if response.status_code != 200:
+                return None
+            return self.parse_probe(response.content, response.url)
+        except Exception as e:
+            metrics.error('listing', type(e).__name__)
+            return None
+
+    def get_total_pages(self, session):
+        """Определить количество страниц по первой странице выдачи
+
+        Returns:
+            int | None: Количество страниц или None (нужен fallback)
+        """
+        probe = self.probe(session, self.base_url)
+        return probe[1] if probe is not None else None
+
+    def collect_threaded(self, session, pages, num_threads):
+        """Собрать ссылки с нескольких страниц в пуле потоков
+
+        Args:
+            session (requests.Session): Сессия с пулом соединений
+            pages (iterable): Номера страниц
+            num_threads (int): Количество параллельных загрузок
+
+        Returns:
+            tuple: (dict {номер страницы: ссылки}, list страниц для fallback)
+        """
+        links_by_page = {}
+        fallback_pages = []
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = {executor.submit(self.fetch_page, session, page): page for page in pages}
+            for future in as_completed(futures):
+                page = futures[future]
+                links = future.result()
+                if links is None:
+                    fallback_pages.append(page)
+                else:
+                    links_by_page[page] = links
+
+        return links_by_page, sorted(fallback_pages)
+
+    # ==================== ASYNC (aiohttp) ====================
+    async def fetch_page_async(self, session, page_num):
+        """Загрузить и разобрать страницу через aiohttp
+
+        Returns:
+            list | None: Ссылки или None (нужен fallback)
+        """
+        try:
+            await throttle_async(self.get_page_url(page_num))
+            started = time.perf_counter()
+            async with session.get(
+                self.get_page_url(page_num),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=3),
+                ssl=False,
+                allow_redirects=True,
+                headers=self.HEADERS
+            ) as response:
+                if response.status != 200:
+                    metrics.request('listing', response.status, time.perf_counter() - started)
+                    return None
+                with metrics.timed('download'):
+                    content = await response.read()
+                metrics.request('listing', response.status, time.perf_counter() - started)
+                return self.parse_links(content, response.url)
+        except Exception as e:
+            metrics.error('listing', type(e).__name__)
+            return None
+
+    async def probe_async(self, session, url):
+        """Асинхронный вариант ``probe``"""
+        try:
+            await throttle_async(url)
+            started = time.perf_counter()
+            async with session.get(
+                f"{url}&page=1",
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=3),
+                ssl=False,
+                allow_redirects=True,
+                headers=self.HEADERS
+            ) as response:
+                if response.status != 200:
+                    metrics.request('listing', response.status, time.perf_counter() - started)
+                    return None
+                with metrics.timed('download'):
+                    content = await response.read()
+                metrics.request('listing', response.status, time.perf_counter() - started)
+                return self.parse_probe(content, response.url)
+        except Exception as e:
+            metrics.error('listing', type(e).__name__)
+            return None
+
+    async def get_total_pages_async(self, session):
+        """Определить количество страниц по первой странице выдачи (aiohttp)
+
+        Returns:
+            int | None: Количество страниц или None (нужен fallback)
+        """
+        probe = await self.probe_async(session, self.base_url)
+        return probe[1] if probe is not None else None
+
+    async def collect_async(self, session, pages, concurrency):
+        """Собрать ссылки с нескольких страниц асинхронно
+
+        Args:
+            session (aiohttp.ClientSession): Сессия
+            pages (iterable): Номера страниц
+            concurrency (int): Количество одновременных запросов
+
+        Returns:
+            tuple: (dict {номер страницы: ссылки}, list страниц для fallback)
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(page):
+            async with semaphore:
+                return page, await self.fetch_page_async(session, page)
+
+        links_by_page = {}
+        fallback_pages = []
+        for page, links in await asyncio.gather(*(fetch(page) for page in pages)):
+            if links is None:
+                fallback_pages.append(page)
+            else:
+                links_by_page[page] = links
+
+        return links_by_page, sorted(fallback_pages)
+
+    # ==================== HELPERS ====================
+    @staticmethod
+    def merge_links(links_by_page):
+        """Склеить ссылки в порядке номеров страниц"""
+        all_links = []
+        for page in sorted(links_by_page):
+            all_links.extend(links_by_page[page])
+        return all_links
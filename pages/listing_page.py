@@ -3,8 +3,86 @@
 
 from selenium.webdriver.common.by import By
 from lxml import html
+import re
 import time
 from pages.base_page import BasePage
+from crawler.rate_limit import throttle
+
+
+# ==================== LXML HELPERS ====================
+# Используются и Selenium-страницей, и HTTP-сборщиком (pages/http_listing_page.py)
+CAR_LINKS_XPATH = '//a[contains(@href, "/cars/used/sale/")]/@href'
+COUNTER_XPATH = '//span[contains(text(), "найдено")]/text()'
+PAGINATION_LINKS_XPATH = '//a[contains(@href, "page=")]/@href'
+CARS_PER_PAGE = 50
+# /cars/used/sale/<марка>/<модель>/<id>-<hash>/
+SALE_ID_RE = re.compile(r'/cars/used/sale/[^/]+/[^/]+/(\d+)-')
+
+
+def parse_sale_id(url):
+    """Получить числовой ID объявления из URL
+    
+    Returns:
+        int | None: ID или None, если URL другого формата
+    """
+    match = SALE_ID_RE.search(url)
+    return int(match.group(1)) if match else None
+
+
+def extract_car_links(tree):
+    """Извлечь ссылки на объявления из lxml-дерева страницы выдачи
+    
+    Args:
+        tree: lxml.html дерево страницы
+        
+    Returns:
+        list: Ссылки без query-параметров, в порядке появления
+    """
+    car_links = {}  # ✅ dict сохраняет порядок, проверка повтора - O(1)
+    for href in tree.xpath(CAR_LINKS_XPATH):
+        if href and '/cars/used/sale/' in href:
+            # ✅ Очищаем параметры URL
+            car_links.setdefault(href.split('?', 1)[0], None)
+    return list(car_links)
+
+
+def extract_total_count(tree):
+    """Количество объявлений по счётчику "найдено N"
+    
+    Returns:
+        int | None: Количество или None, если счётчика нет
+    """
+    counter_text = tree.xpath(COUNTER_XPATH)
+    if counter_text:
+        digits = ''.join(filter(str.isdigit, counter_text[0]))
+        if digits:
+            return int(digits)
+    return None
+
+
+def extract_total_pages(tree):
+    """Определить количество страниц выдачи по счётчику или пагинации
+    
+    Args:
+        tree: lxml.html дерево первой страницы
+        
+    Returns:
+        int | None: Количество страниц или None, если определить не удалось
+    """
+    # ✅ Пробуем найти счётчик результатов (пример: "найдено 58273")
+    total_count = extract_total_count(tree)
+    if total_count is not None:
+        return (total_count // CARS_PER_PAGE) + (1 if total_count % CARS_PER_PAGE else 0)
+    
+    # ✅ Альтернативный метод - через пагинацию
+    page_numbers = []
+    for link in tree.xpath(PAGINATION_LINKS_XPATH):
+        try:
+            page_numbers.append(int(link.split('page=')[1].split('&')[0]))
+        except (IndexError, ValueError):
+            pass
+    
+    return max(page_numbers) if page_numbers else None
 
 
 class ListingPage(BasePage):
@@ -17,10 +95,23 @@ class ListingPage(BasePage):
     PAGINATION_CONTAINER = (By.XPATH, '//div[@class="Pagination"]')
     
     # ==================== INIT ====================
-    def __init__(self, driver, base_url):
-        """Инициализация ListingPage"""
+    def __init__(self, driver, base_url, page_url=None):
+        """Инициализация ListingPage
+        
+        Args:
+            driver: Selenium WebDriver
+            base_url (str): URL выдачи
+            page_url (callable): Свой URL страницы по номеру (срезы QueryPlanner)
+        """
         super().__init__(driver)
         self.base_url = base_url
+        self.page_url = page_url
+    
+    def get_page_url(self, page_num):
+        """Получить URL страницы выдачи"""
+        if self.page_url is not None:
+            return self.page_url(page_num)
+        return f"{self.base_url}&page={page_num}"
     
     # ==================== PAGE ACTIONS ====================
     def open_page(self, page_num=1):
@@ -31,9 +122,10 @@ class ListingPage(BasePage):
         """
         # ✅ ИСПРАВЛЕНО: Используем правильный формат URL
         # base_url уже содержит "?price_to=9999999"
-        url = f"{self.base_url}&page={page_num}"
+        url = self.get_page_url(page_num)
         
         print(f"   📍 Открываю: {url}")
+        throttle(url)  # ✅ Общий лимит запросов к сайту
         self.driver.get(url)
         
         # ✅ Ожидание загрузки
@@ -65,30 +157,19 @@ class ListingPage(BasePage):
         Returns:
             list: Список ссылок на объявления
         """
-        car_links = []
         try:
             # ✅ Получаем HTML и парсим с lxml
-            page_source = self.driver.page_source
-            tree = html.fromstring(page_source)
+            tree = html.fromstring(self.driver.page_source)
+            car_links = extract_car_links(tree)
             
-            # ✅ Извлекаем ссылки на объявления
-            links = tree.xpath('//a[contains(@href, "/cars/used/sale/")]/@href')
-            
-            if not links:
+            if not car_links:
                 print(f"   ⚠️  Ссылки не найдены на странице")
-                return car_links
-            
-            for href in links:
-                if href and '/cars/used/sale/' in href:
-                    # ✅ Очищаем параметры URL
-                    clean_url = href.split('?')[0] if '?' in href else href
-                    if clean_url not in car_links:
-                        car_links.append(clean_url)
+            return car_links
         
         except Exception as e:
             print(f"   ⚠️  Ошибка при поиске ссылок: {e}")
         
-        return car_links
+        return []
     
     def get_total_pages(self):
         """Получить общее количество страниц
@@ -99,47 +180,17 @@ class ListingPage(BasePage):
         try:
             # ✅ Открываем первую страницу
             print(f"   📍 Загружаю первую страницу: {self.base_url}&page=1")
+            throttle(f"{self.base_url}&page=1")
             self.driver.get(f"{self.base_url}&page=1")
             time.sleep(2)
             
             page_source = self.driver.page_source
             tree = html.fromstring(page_source)
             
-            # ✅ Пробуем найти счётчик результатов
-            counter_text = tree.xpath('//span[contains(text(), "найдено")]/text()')
-            
-            if counter_text:
-                try:
-                    count_str = counter_text[0]
-                    # Пример: "найдено 58273"
-                    total_count = int(''.join(filter(str.isdigit, count_str)))
-                    # 50 объявлений на странице
-                    total_pages = (total_count // 50) + (1 if total_count % 50 else 0)
-                    print(f"   📊 Найдено {total_count} объявлений (~{total_pages} страниц)\n")
-                    return total_pages
-                except Exception as e:
-                    print(f"   ⚠️  Не удалось спарсить счётчик: {e}")
-            
-            # ✅ Альтернативный метод - через пагинацию
-            pagination_links = tree.xpath('//a[contains(@href, "page=")]/@href')
-            
-            if pagination_links:
-                try:
-                    page_numbers = []
-                    for link in pagination_links:
-                        try:
-                            # Извлекаем номер страницы из URL
-                            page_num = int(link.split('page=')[1].split('&')[0])
-                            page_numbers.append(page_num)
-                        except:
-                            pass
-                    
-                    if page_numbers:
-                        max_page = max(page_numbers)
-                        print(f"   📊 Найдено ~{max_page} страниц\n")
-                        return max_page
-                except Exception as e:
-                    print(f"   ⚠️  Ошибка при парсинге пагинации: {e}")
+            total_pages = extract_total_pages(tree)
+            if total_pages:
+                print(f"   📊 Найдено ~{total_pages} страниц\n")
+                return total_pages
             
             print(f"   ⚠️  Не удалось определить количество страниц, использую 1200\n")
             return 1200
@@ -0,0 +1,221 @@
+"""Извлечение полей объявления из встроенного JSON-состояния страницы"""
+
+import datetime
+import json
+
+try:
+    import orjson  # ✅ Опционально: в несколько раз быстрее json
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+from config import PAGE_STATE_MARKERS, CAR_STATE_FIELDS, CAR_STATE_ENUMS
+from pages.extraction import DEFAULT_PLAN
+from crawler.records import CarRecord
+
+
+class PageStateExtractor:
+    """Извлечение полей из JSON-блока ``<script id="initial-state">``
+
+    Блок ищется байтовым поиском по сырому ответу - DOM не строится.
+    Значения сразу приводятся к типам (числа, дата). Если блока нет,
+    ``extract`` возвращает None и вызывающий код переходит к DOM.
+    """
+
+    SCRIPT_END = b'</script>'
+    CARD_MARKER = b'"card"'
+
+    def __init__(self, field_map=CAR_STATE_FIELDS, enums=CAR_STATE_ENUMS,
+                 markers=PAGE_STATE_MARKERS, plan=DEFAULT_PLAN):
+        """Инициализация PageStateExtractor
+
+        Args:
+            field_map (dict): Поле -> (тип, пути в JSON), см. CAR_STATE_FIELDS
+            enums (dict): Перевод значений-перечислений
+            markers (tuple): Байтовые маркеры тега со состоянием
+            plan (ExtractionPlan): Таблица полей (колонки и значения по умолчанию)
+        """
+        self.enums = enums
+        self.markers = markers
+        self.plan = plan
+        # ✅ Пути разбиваем один раз
+        self.field_map = {
+            field: (kind, [tuple(path.split('.')) for path in paths])
+            for field, (kind, paths) in field_map.items()
+        }
+
+    # ==================== BYTE SCAN ====================
+    def find_state(self, content):
+        """Найти JSON-блок состояния в сыром ответе
+
+        Args:
+            content (bytes): Тело ответа (может быть неполным)
+
+        Returns:
+            bytes | None: Содержимое тега <script> или None
+        """
+        for marker in self.markers:
+            position = content.find(marker)
+            if position == -1:
+                continue
+            start = content.find(b'>', position)
+            if start == -1:
+                return None
+            end = content.find(self.SCRIPT_END, start)
+            if end == -1:
+                return None
+            return content[start + 1:end]
+        return None
+
+    def has_card(self, raw):
+        """Есть ли в блоке карточка - без декодирования JSON (для ParsePool)"""
+        return self.CARD_MARKER in raw
+
+    def scanner(self):
+        """Поиск блока состояния в растущем буфере (потоковое чтение)"""
+        return StateScanner(self.markers, self.SCRIPT_END)
+
+    # ==================== JSON ====================
+    @staticmethod
+    def _lookup(state, path):
+        value = state
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+            if value is None:
+                return None
+        return value
+
+    @staticmethod
+    def _to_int(value):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return int(value)
+        digits = ''.join(filter(str.isdigit, str(value)))
+        return int(digits) if digits else None
+
+    def _convert(self, kind, values):
+        present = [value for value in values if value not in (None, '')]
+        if not present:
+            return None
+
+        if kind == 'int':
+            return self._to_int(present[0])
+        if kind == 'join':
+            return ' '.join(str(value) for value in present)
+        if kind == 'enum':
+            return self.enums.get(present[0], str(present[0]))
+        if kind == 'date_ms':
+            timestamp = self._to_int(present[0])
+            if timestamp is None:
+                return None
+            return datetime.datetime.fromtimestamp(timestamp / 1000).date()
+        if kind == 'engine':
+            displacement, power, fuel = values
+            parts = []
+            if displacement:
+                parts.append(f"{round(self._to_int(displacement) / 1000, 1)} л")
+            if power:
+                parts.append(f"{self._to_int(power)} л.с.")
+            if fuel:
+                parts.append(self.enums.get(fuel, str(fuel)))
+            return ' / '.join(parts) or None
+        return present[0]
+
+    def extract_state(self, state, url):
+        """Разложить уже декодированное состояние в CarRecord"""
+        if not isinstance(state, dict) or self._lookup(state, ('card',)) is None:
+            return None
+
+        values = {}
+        for spec in self.plan.fields:
+            value = None
+            if spec.name in self.field_map:
+                kind, paths = self.field_map[spec.name]
+                if kind in ('join', 'engine'):
+                    value = self._convert(kind, [self._lookup(state, path) for path in paths])
+                else:
+                    for path in paths:
+                        value = self._convert(kind, [self._lookup(state, path)])
+                        if value is not None:
+                            break
+            values[spec.name] = spec.default if value is None else value
+
+        return CarRecord.from_fields(values, url)
+
+    def extract(self, content, url):
+        """Извлечь запись из сырого ответа
+
+        Args:
+            content (bytes): Тело ответа
+            url (str): URL объявления
+
+        Returns:
+            CarRecord | None: Запись (как у ExtractionPlan) или None, если блока нет
+        """
+        return self.decode(self.find_state(content), url)
+
+    def decode(self, raw, url):
+        """Разобрать уже найденный блок состояния (см. ``find_state``)
+
+        Returns:
+            CarRecord | None: Запись или None, если JSON битый или без ``card``
+        """
+        if not raw:
+            return None
+        try:
+            state = _json_loads(raw)
+        except ValueError:
+            return None
+        return self.extract_state(state, url)
+
+
+class StateScanner:
+    """Поиск блока состояния по мере чтения ответа
+
+    ``find_state`` на каждом новом куске просматривал бы весь буфер с
+    начала. Сканер помнит, докуда уже искал, и смотрит только новые байты
+    (с перекрытием на длину маркера, разрезанного между кусками).
+    """
+
+    __slots__ = ('markers', 'script_end', 'scanned', 'start')
+
+    def __init__(self, markers, script_end):
+        self.markers = markers
+        self.script_end = script_end
+        self.scanned = 0  # ✅ До какой позиции буфер уже просмотрен
+        self.start = None  # ✅ Начало JSON (после '>' тега <script>)
+
+    def feed(self, content):
+        """Проверить буфер после очередного куска
+
+        Args:
+            content (bytes | bytearray): Весь прочитанный буфер
+
+        Returns:
+            bytes | None: Содержимое тега <script>, когда он получен целиком
+        """
+        if self.start is None:
+            overlap = max(len(marker) for marker in self.markers)
+            positions = [content.find(marker, max(0, self.scanned - overlap)) for marker in self.markers]
+            positions = [position for position in positions if position != -1]
+            if not positions:
+                self.scanned = len(content)
+                return None
+            tag_end = content.find(b'>', min(positions))
+            if tag_end == -1:
+                self.scanned = min(positions)  # ✅ Тег ещё не дочитан - маркер найдём снова
+                return None
+            self.start = tag_end + 1
+            self.scanned = self.start
+
+        end = content.find(self.script_end, max(self.start, self.scanned - len(self.script_end)))
+        self.scanned = len(content)
+        if end == -1:
+            return None
+        return bytes(content[self.start:end])
+
+
+DEFAULT_STATE_EXTRACTOR = PageStateExtractor()
@@ -0,0 +1,334 @@
+# pages/query_planner.py
+"""Разбиение выдачи на срезы по цене и году под лимит страниц на запрос"""
+
+import asyncio
+import bisect
+import datetime
+import math
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from pages.http_listing_page import HttpListingPage
+from pages.listing_page import CARS_PER_PAGE
+from config import (
+    QUERY_PLANNER, LISTING_PAGE_CAP, QUERY_YEAR_MIN, QUERY_PROBE_RETRIES, LISTING_CONCURRENCY, MAX_PRICE
+)
+
+
+class ListingSlice:
+    """Срез выдачи: диапазон цены (и года) и размер по счётчику "найдено N" """
+
+    __slots__ = ('url', 'price_from', 'price_to', 'year_from', 'year_to', 'count', 'pages', 'first_links',
+                 'attempts')
+
+    def __init__(self, url, price_from, price_to, year_from=None, year_to=None,
+                 count=None, pages=None, first_links=None):
+        self.url = url
+        self.price_from = price_from
+        self.price_to = price_to
+        self.year_from = year_from
+        self.year_to = year_to
+        self.count = count
+        self.pages = pages
+        self.first_links = first_links  # ✅ Страница 1 уже скачана при замере
+        self.attempts = 0  # ✅ Неудавшихся замеров (в план не сохраняется)
+
+    def to_dict(self):
+        return {
+            'url': self.url, 'price_from': self.price_from, 'price_to': self.price_to,
+            'year_from': self.year_from, 'year_to': self.year_to,
+            'count': self.count, 'pages': self.pages,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        years = f", {self.year_from}-{self.year_to} г." if self.year_from is not None else ''
+        return f"ListingSlice({self.price_from}-{self.price_to} руб{years}: {self.count})"
+
+
+class QueryPlanner:
+    """Рекурсивно делит запрос, пока каждый срез не поместится в лимит страниц
+
+    Срез, у которого объявлений больше ``page_cap * per_page``, делится
+    по цене на ``ceil(count / capacity)`` частей (не меньше двух); если
+    цена уже одна, - по году выпуска. Неудавшийся замер повторяется на
+    следующем уровне (до ``probe_retries`` раз), после чего от среза
+    берётся одна страница - размер его неизвестен. Срезы одного уровня замеряются
+    параллельно, а первая страница каждого итогового среза, скачанная
+    при замере, сразу идёт в сбор ссылок - лишних запросов к выдаче
+    нет, кроме замеров срезов, которые пришлось делить.
+    """
+
+    def __init__(self, base_url, page_cap=LISTING_PAGE_CAP, per_page=CARS_PER_PAGE,
+                 year_min=QUERY_YEAR_MIN, concurrency=LISTING_CONCURRENCY, probe_retries=QUERY_PROBE_RETRIES):
+        """Инициализация QueryPlanner
+
+        Args:
+            base_url (str): URL выдачи (с "?price_to=...")
+            page_cap (int): Сколько страниц сайт отдаёт на запрос
+            per_page (int): Объявлений на странице
+            year_min (int): Нижняя граница года при разбиении по году
+            concurrency (int): Одновременных замеров
+            probe_retries (int): Повторов неудавшегося замера среза
+        """
+        self.base_url = base_url
+        self.listing = HttpListingPage(base_url)
+        self.page_cap = page_cap
+        self.per_page = per_page
+        self.capacity = page_cap * per_page
+        self.year_min = year_min
+        self.concurrency = concurrency
+        self.probe_retries = probe_retries
+        self.stats = {'probes': 0, 'split': 0, 'slices': 0, 'capped': 0, 'unprobed': 0}
+
+        query = dict(parse_qsl(urlsplit(base_url).query))
+        self.price_from = int(query.get('price_from', 0))
+        self.price_to = int(query.get('price_to', MAX_PRICE))
+
+    # ==================== SLICES ====================
+    def slice_url(self, price_from, price_to, year_from=None, year_to=None):
+        """URL выдачи с подставленными границами"""
+        parts = urlsplit(self.base_url)
+        query = dict(parse_qsl(parts.query))
+        query.update(price_from=price_from, price_to=price_to)
+        if year_from is not None:
+            query.update(year_from=year_from, year_to=year_to)
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def make_slice(self, price_from, price_to, year_from=None, year_to=None):
+        return ListingSlice(self.slice_url(price_from, price_to, year_from, year_to),
+                            price_from, price_to, year_from, year_to)
+
+    @staticmethod
+    def split_range(low, high, parts):
+        """Разделить [low, high] (целые, включительно) на ``parts`` непустых частей"""
+        parts = min(parts, high - low + 1)
+        step = (high - low + 1) / parts
+        edges = [low + round(i * step) for i in range(parts)] + [high + 1]
+        return [(edges[i], edges[i + 1] - 1) for i in range(parts)]
+
+    def children(self, piece):
+        """Срезы, на которые делится ``piece`` (пусто, если делить некуда)"""
+        parts = max(2, math.ceil(piece.count / self.capacity))
+        if piece.price_to > piece.price_from:
+            return [
+                self.make_slice(low, high, piece.year_from, piece.year_to)
+                for low, high in self.split_range(piece.price_from, piece.price_to, parts)
+            ]
+        year_from = piece.year_from if piece.year_from is not None else self.year_min
+        year_to = piece.year_to if piece.year_to is not None else datetime.date.today().year
+        if year_to > year_from:
+            return [
+                self.make_slice(piece.price_from, piece.price_to, low, high)
+                for low, high in self.split_range(year_from, year_to, parts)
+            ]
+        return []
+
+    # ==================== PLANNING ====================
+    def measure(self, piece, probe):
+        """Заполнить размер среза по замеру первой страницы
+
+        Returns:
+            bool: False - замер не удался (капча, ошибка, страница без
+            счётчика и без объявлений)
+        """
+        self.stats['probes'] += 1
+        if probe is None:
+            return False
+        count, pages, links = probe
+        if count is None and not pages and not links:
+            # ✅ Ни счётчика, ни ссылок - это не пустой срез, а неразобранная страница
+            return False
+        if count is None:
+            # ✅ Счётчика нет - оцениваем по пагинации
+            count = pages * self.per_page if pages else len(links)
+        piece.count = count
+        piece.pages = min(self.page_cap, math.ceil(count / self.per_page))
+        piece.first_links = links or None
+        return True
+
+    def next_level(self, level, probes):
+        """Разобрать замеры уровня
+
+        Returns:
+            tuple: (list готовых срезов, list срезов следующего уровня)
+        """
+        done, deeper = [], []
+        for piece, probe in zip(level, probes):
+            if not self.measure(piece, probe):
+                if piece.attempts < self.probe_retries:
+                    # ✅ Не замерили - замерим снова вместе со следующим уровнем
+                    piece.attempts += 1
+                    deeper.append(piece)
+                else:
+                    # ✅ Размер неизвестен - одна страница вместо page_cap запросов наугад
+                    piece.count, piece.pages = None, 1
+                    self.stats['unprobed'] += 1
+                    print(f"   ⚠️  {piece} не удалось замерить - беру только первую страницу")
+                    done.append(piece)
+                continue
+            if piece.count <= self.capacity:
+                if piece.count:
+                    done.append(piece)
+                continue
+            children = self.children(piece)
+            if children:
+                self.stats['split'] += 1
+                deeper.extend(children)
+            else:
+                self.stats['capped'] += 1
+                print(f"   ⚠️  {piece} не помещается в {self.page_cap} страниц - часть объявлений недоступна")
+                done.append(piece)
+        return done, deeper
+
+    def finish(self, slices):
+        slices.sort(key=lambda piece: (piece.price_from, piece.year_from or 0))
+        self.stats['slices'] = len(slices)
+        self.print_stats(slices)
+        return slices
+
+    def plan(self, session):
+        """Разбить выдачу (requests, замеры уровня - в пуле потоков)
+
+        Returns:
+            list | None: Срезы по возрастанию цены или None, если не удалось
+            замерить даже исходный запрос (нужен fallback через Selenium)
+        """
+        root = ListingSlice(self.base_url, self.price_from, self.price_to)
+        probe = self.listing.probe(session, root.url)
+        if probe is None:
+            return None
+        slices, level = self.next_level([root], [probe])
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while level:
+                probes = list(executor.map(lambda piece: self.listing.probe(session, piece.url), level))
+                done, level = self.next_level(level, probes)
+                slices.extend(done)
+        return self.finish(slices)
+
+    async def plan_async(self, session):
+        """Асинхронный вариант ``plan`` (aiohttp)"""
+        root = ListingSlice(self.base_url, self.price_from, self.price_to)
+        probe = await self.listing.probe_async(session, root.url)
+        if probe is None:
+            return None
+        slices, level = self.next_level([root], [probe])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def measure(piece):
+            async with semaphore:
+                return await self.listing.probe_async(session, piece.url)
+
+        while level:
+            probes = await asyncio.gather(*(measure(piece) for piece in level))
+            done, level = self.next_level(level, probes)
+            slices.extend(done)
+        return self.finish(slices)
+
+    def print_stats(self, slices):
+        s = self.stats
+        total = sum(piece.count or 0 for piece in slices)
+        pages = sum(piece.pages for piece in slices)
+        extra = s['probes'] - len(slices)
+        print(f"   🧭 Срезов выдачи: {len(slices)} | объявлений ~{total} | страниц {pages} | "
+              f"замеров сверх сбора {max(0, extra)}" + (f" | упёрлись в лимит {s['capped']}" if s['capped'] else '')
+              + (f" | не замерены {s['unprobed']}" if s['unprobed'] else ''))
+
+
+class PartitionedListingPage(HttpListingPage):
+    """HttpListingPage поверх срезов QueryPlanner
+
+    Страницы всех срезов нумеруются подряд (1..total), поэтому движки,
+    контрольная точка и очередь заданий работают с обычными номерами
+    страниц; ``get_page_url`` переводит номер в URL среза. Первые страницы
+    срезов, скачанные при замере, отдаются без повторного запроса.
+    """
+
+    def __init__(self, base_url, planner=None):
+        """Инициализация PartitionedListingPage
+
+        Args:
+            base_url (str): URL выдачи (с "?price_to=...")
+            planner (QueryPlanner): Планировщик (по умолчанию - с настройками config)
+        """
+        super().__init__(base_url)
+        self.planner = planner or QueryPlanner(base_url)
+        self.slices = None
+        self.starts = []
+        self.prefetched = {}
+
+    def set_slices(self, slices):
+        """Разложить срезы по сквозным номерам страниц
+
+        Returns:
+            int: Всего страниц
+        """
+        self.slices = slices
+        self.starts = []
+        self.prefetched = {}
+        page = 1
+        for piece in slices:
+            self.starts.append(page)
+            if piece.first_links:
+                self.prefetched[page] = piece.first_links
+            page += piece.pages
+        return page - 1
+
+    def locate(self, page_num):
+        """Срез и номер страницы внутри него"""
+        index = bisect.bisect_right(self.starts, page_num) - 1
+        return self.slices[index], page_num - self.starts[index] + 1
+
+    def get_page_url(self, page_num):
+        """URL страницы по сквозному номеру"""
+        if not self.slices:
+            return super().get_page_url(page_num)
+        piece, local = self.locate(page_num)
+        return f"{piece.url}&page={local}"
+
+    # ==================== PLAN ====================
+    def plan_state(self):
+        if self.slices is None:
+            return None
+        return [piece.to_dict() for piece in self.slices]
+
+    def load_plan(self, state):
+        if state:
+            self.set_slices([ListingSlice.from_dict(data) for data in state])
+
+    def get_total_pages(self, session):
+        """Спланировать срезы и вернуть сквозное количество страниц"""
+        slices = self.planner.plan(session)
+        return self.set_slices(slices) if slices is not None else None
+
+    async def get_total_pages_async(self, session):
+        """Асинхронный вариант ``get_total_pages``"""
+        slices = await self.planner.plan_async(session)
+        return self.set_slices(slices) if slices is not None else None
+
+    # ==================== FETCH ====================
+    def fetch_page(self, session, page_num):
+        links = self.prefetched.pop(page_num, None)
+        return links if links is not None else super().fetch_page(session, page_num)
+
+    async def fetch_page_async(self, session, page_num):
+        links = self.prefetched.pop(page_num, None)
+        return links if links is not None else await super().fetch_page_async(session, page_num)
+
+
+def search_url(base_url, max_price):
+    """URL выдачи с верхней границей цены ``max_price`` (параметр price_to)"""
+    parts = urlsplit(base_url)
+    query = dict(parse_qsl(parts.query))
+    query['price_to'] = max_price
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def create_listing(base_url):
+    """HTTP-выдача для движков: со срезами (QUERY_PLANNER) или одним запросом"""
+    if QUERY_PLANNER:
+        return PartitionedListingPage(base_url)
+    return HttpListingPage(base_url)
@@ -0,0 +1,65 @@
+"""Тесты контрольных точек (crawler/checkpoint.py)"""
+
+import pytest
+
+from crawler.checkpoint import Checkpoint
+from crawler.sinks import create_sink
+from crawler.records import CarRecord
+
+BASE_URL = 'https://auto.ru/cars/used/?price_to=1000000'
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'state' / 'checkpoint.db')
+
+
+def test_resume_keeps_progress(path):
+    checkpoint = Checkpoint(path)
+    assert not checkpoint.start(BASE_URL)
+    checkpoint.set_total_pages(4, plan=[{'url': BASE_URL, 'pages': 4}])
+    checkpoint.save_pages({2: ['b1', 'b2'], 1: ['a1', 'b1']})
+    checkpoint.fail_pages([3, 2])
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.start(BASE_URL, resume=True)
+    assert checkpoint.total_pages == 4
+    assert checkpoint.plan == [{'url': BASE_URL, 'pages': 4}]
+    assert checkpoint.remaining_pages(4) == [3, 4]  # ✅ Собранная страница не стала 'failed'
+    assert checkpoint.frontier() == ['a1', 'b1', 'b2']
+    checkpoint.close()
+
+
+def test_start_over(path):
+    checkpoint = Checkpoint(path)
+    checkpoint.start(BASE_URL)
+    checkpoint.save_page(1, ['a1'])
+
+    assert not checkpoint.start(BASE_URL + '0', resume=True)  # ✅ Другой поиск
+    assert checkpoint.frontier() == [] and checkpoint.total_pages is None
+
+    checkpoint.save_page(1, ['a1'])
+    checkpoint.finish()
+    assert not checkpoint.start(BASE_URL + '0', resume=True)  # ✅ Прошлый запуск завершён
+    checkpoint.close()
+
+
+def test_completed_urls(path, tmp_path):
+    sink = create_sink('jsonl', path=str(tmp_path / 'cars.jsonl'))
+    sink.add(CarRecord(title='Kia Rio', price=1, url='a1'))
+    sink.close()
+
+    checkpoint = Checkpoint(path)
+    checkpoint.start(BASE_URL)
+    checkpoint.save_page(1, ['a1', 'a2', 'a3'])
+    checkpoint.mark_finished('a2')
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path)
+    checkpoint.start(BASE_URL, resume=True)
+    with create_sink('jsonl', path=str(tmp_path / 'cars.jsonl'), append=True) as sink:
+        completed = checkpoint.completed_urls(sink)
+    assert completed == {'a1', 'a2'}
+    assert Checkpoint.pending(checkpoint.frontier(), completed) == ['a3']
+    checkpoint.close()
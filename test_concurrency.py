@@ -0,0 +1,89 @@
+"""Тесты адаптивного лимита параллельности (crawler/concurrency.py)"""
+
+import asyncio
+
+import pytest
+
+import crawler.concurrency
+from crawler.concurrency import AdaptiveLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(crawler.concurrency.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_additive_increase():
+    limiter = AdaptiveLimiter(4, min_limit=1, max_limit=6)
+    for _ in range(4):
+        limiter.on_success(0.1)
+    assert 4.9 < limiter.limit < 5  # ✅ Около +1 за окно из limit ответов
+    limiter.on_success(0.1)
+    assert limiter.current == 5
+
+    for _ in range(100):
+        limiter.on_success(0.1)
+    assert limiter.limit == 6
+
+
+def test_multiplicative_decrease_with_cooldown(clock):
+    limiter = AdaptiveLimiter(16, min_limit=2, max_limit=32, cooldown=5)
+    limiter.on_congestion('throttled')
+    assert limiter.current == 8
+    limiter.on_congestion('timeout')
+    assert limiter.current == 8  # ✅ Пачка ошибок - одно снижение
+
+    clock[0] += 5
+    limiter.on_congestion('challenge')
+    assert limiter.current == 4
+    for _ in range(3):
+        clock[0] += 5
+        limiter.on_congestion('throttled')
+    assert limiter.current == 2
+    assert limiter.stats['throttled'] == 4
+
+
+def test_slow_responses_count_as_congestion(clock):
+    limiter = AdaptiveLimiter(10, min_limit=1, max_limit=20, latency_factor=2, cooldown=0)
+    limiter.on_success(0.1)
+    for _ in range(10):
+        limiter.on_success(2.0)
+    assert limiter.stats['slow'] > 0
+    assert limiter.current < 10
+
+
+def test_errors_stop_growth():
+    limiter = AdaptiveLimiter(4, min_limit=1, max_limit=8)
+    for _ in range(5):
+        limiter.on_error()
+    limiter.on_success(0.1)
+    assert limiter.limit == 4
+
+
+def test_fixed_limit():
+    limiter = AdaptiveLimiter(3, min_limit=3, max_limit=3)
+    assert not limiter.adaptive
+    limiter.on_congestion('throttled')
+    limiter.on_success(0.1)
+    assert limiter.current == 3
+
+
+def test_slots():
+    async def run():
+        limiter = AdaptiveLimiter(2, min_limit=1, max_limit=4)
+        active, peak = 0, 0
+
+        async def task():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(task() for _ in range(8)))
+        return peak, limiter.in_flight
+
+    assert asyncio.run(run()) == (2, 0)
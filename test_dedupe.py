@@ -0,0 +1,63 @@
+"""Тесты дедупликации (crawler/dedupe.py)"""
+
+from crawler.dedupe import sale_key, BloomFilter, ListingIndex
+
+URL = 'https://auto.ru/cars/used/sale/kia/rio/1100000001-abc/'
+
+
+def test_sale_key_ignores_link_variants():
+    assert sale_key(URL) == 1100000001
+    assert sale_key(URL + '?from=search') == sale_key('https://auto.ru/cars/used/sale/kia/RIO/1100000001-abc/')
+    assert sale_key('https://auto.ru/promo/') < 0
+    assert sale_key('https://auto.ru/promo/') == sale_key('https://auto.ru/promo/')
+
+
+def test_bloom_add_and_contains():
+    bloom = BloomFilter(capacity=1000, error_rate=0.001)
+    for key in range(0, 2000, 2):
+        bloom.add(key)
+    assert all(key in bloom for key in range(0, 2000, 2))
+    false_positives = sum(key in bloom for key in range(1, 20000, 2))
+    assert false_positives < 100
+
+
+def test_bloom_save_and_load(tmp_path):
+    path = str(tmp_path / 'history' / 'seen.bloom')
+    bloom = BloomFilter(path, capacity=1000, error_rate=0.01)
+    bloom.add(42)
+    bloom.save()
+    assert not bloom.dirty
+
+    # ✅ Размер берётся из файла, а не из новых настроек
+    loaded = BloomFilter(path, capacity=10 ** 6, error_rate=0.001)
+    assert (loaded.size, loaded.hashes) == (bloom.size, bloom.hashes)
+    assert 42 in loaded and 43 not in loaded
+
+
+def test_bloom_corrupted_file_starts_over(tmp_path):
+    path = tmp_path / 'seen.bloom'
+    path.write_bytes(b'BLM1' + b'\x00' * 20)
+    bloom = BloomFilter(str(path), capacity=100, error_rate=0.01)
+    assert not any(bloom.bits)
+
+
+def test_listing_index_skips_duplicates():
+    index = ListingIndex(bloom_path=None)
+    first = index.filter([URL, URL + '?from=search', 'https://auto.ru/cars/used/sale/lada/vesta/1100000002-b/'])
+    assert len(first) == 2 and first[0] == URL
+    assert index.filter([URL]) == []
+    assert index.stats == {'unique': 2, 'duplicate': 2, 'history': 0}
+
+
+def test_listing_index_history(tmp_path):
+    path = str(tmp_path / 'seen.bloom')
+    index = ListingIndex(bloom_path=path)
+    index.filter([URL])
+    index.mark_fetched(URL)
+    index.close()
+
+    # ✅ Следующий запуск пропускает скачанное, но не то, что только встречалось
+    other = 'https://auto.ru/cars/used/sale/lada/vesta/1100000002-b/'
+    index = ListingIndex(bloom_path=path)
+    assert index.filter([URL, other]) == [other]
+    assert index.stats['history'] == 1
@@ -0,0 +1,96 @@
+"""Тест координатора и воркера поверх общей очереди (auto_parser_distributed.py)"""
+
+import asyncio
+import threading
+
+import auto_parser_distributed
+from auto_parser_distributed import Coordinator, DistributedWorker
+from crawler.records import CarRecord
+from crawler.sinks import create_sink
+
+BAD_ID = 1100000099
+
+
+def sale_url(sale_id):
+    return f'https://auto.ru/cars/used/sale/kia/rio/{sale_id}-abc/'
+
+
+class FakeListing:
+    """Выдача: 3 объявления на странице; страница 3 с первого раза отдаёт капчу"""
+
+    def __init__(self):
+        self.captcha = {3}
+
+    def links(self, page):
+        links = [sale_url(1100000000 + page * 10 + i) for i in range(3)]
+        if page == 2:
+            links.append(sale_url(1100000010))  # ✅ Объявление сдвинулось со страницы 1
+        if page == 5:
+            links.append(sale_url(BAD_ID))
+        return links
+
+    async def collect_async(self, session, pages, concurrency):
+        links_by_page, failed = {}, []
+        for page in pages:
+            if page in self.captcha:
+                self.captcha.discard(page)
+                failed.append(page)
+            else:
+                links_by_page[page] = self.links(page)
+        return links_by_page, failed
+
+
+class FakeDetailPage:
+    """Карточка: BAD_ID не скачивается никогда (без повода для повтора)"""
+
+    loads = []
+
+    def __init__(self, car_url, limiter=None):
+        self.car_url = car_url
+        self.retry_reason = None
+        self.retry_after = None
+
+    async def _load_page(self, session):
+        self.loads.append(self.car_url)
+        return str(BAD_ID) not in self.car_url
+
+    def get_car_data(self):
+        return CarRecord(title='Kia Rio', price=int(self.car_url.split('/')[-2].split('-')[0]) % 1000,
+                         url=self.car_url)
+
+
+def test_coordinator_worker_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(auto_parser_distributed, 'LISTING_JOB_PAGES', 2)
+    monkeypatch.setattr(auto_parser_distributed, 'DETAIL_JOB_SIZE', 4)
+    monkeypatch.setattr(auto_parser_distributed, 'AsyncCarDetailPage', FakeDetailPage)
+    monkeypatch.setattr(FakeDetailPage, 'loads', [])
+
+    store_path = str(tmp_path / 'jobs.db')
+    sink = create_sink('jsonl', path=str(tmp_path / 'cars.jsonl'))
+    coordinator = Coordinator(max_price=1000, store_path=store_path, sink=sink)
+    monkeypatch.setattr(coordinator, 'get_total_pages', lambda max_pages=None: 5)
+    coordinator.plan()
+    assert coordinator.store.counts() == {('listing', 'pending'): 3}
+
+    worker = DistributedWorker(store_path, name='w1', concurrent_requests=4, slots=2,
+                               adaptive=False, poll_interval=0.01)
+    worker.listing = FakeListing()
+
+    finished = threading.Thread(target=coordinator.run, kwargs={'poll_interval': 0.01, 'report_every': 100})
+    finished.start()
+    asyncio.run(asyncio.wait_for(worker.run_async(), timeout=30))
+    finished.join(timeout=30)
+    assert not finished.is_alive()
+
+    # ✅ 15 объявлений с 5 страниц (страница 3 - со второй попытки), дубль скачан один раз
+    urls = sorted(record['URL'] for record in sink.read_records())
+    assert urls == sorted(sale_url(1100000000 + page * 10 + i) for page in range(1, 6) for i in range(3))
+    assert coordinator.stats['relisted'] == 1
+    # ✅ Нескачиваемое объявление поставлено заново JOB_MAX_ATTEMPTS - 1 раз и учтено как потерянное
+    assert FakeDetailPage.loads.count(sale_url(BAD_ID)) == auto_parser_distributed.JOB_MAX_ATTEMPTS
+    assert coordinator.stats['lost_urls'] == 1
+    assert FakeDetailPage.loads.count(sale_url(1100000010)) == 1
+    assert coordinator.store.get_meta('state') == 'done'
+    assert worker.stats['processed'] == 15
+    worker.store.close()
+    coordinator.store.close()
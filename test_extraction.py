@@ -0,0 +1,137 @@
+"""Тесты извлечения полей из DOM (pages/extraction.py)"""
+
+import datetime
+
+import pytest
+from lxml import html
+
+from benchmarks.fixtures import FixtureCorpus, MONTHS
+from pages.extraction import DEFAULT_PLAN, DEFAULT_EXTRACTOR, ExtractionPlan, StreamingExtraction, get_extractor
+
+CORPUS = FixtureCorpus(size=20, card_bytes=60000, today=datetime.date(2024, 1, 20))
+SALE_IDS = sorted(CORPUS.by_id)[:10]
+
+
+def card(sale_id):
+    listing = CORPUS.by_id[sale_id]
+    return listing, CORPUS.card_page(sale_id), f"https://auto.ru{listing.path()}"
+
+
+@pytest.mark.parametrize('sale_id', SALE_IDS)
+def test_plan_extracts_fixture_card(sale_id):
+    listing, page, url = card(sale_id)
+    record = DEFAULT_PLAN.extract(html.fromstring(page), url)
+    assert record.title == f"{listing.mark} {listing.model_name}"
+    assert record.year == listing.year
+    assert record.mileage_km == listing.mileage
+    assert record.owners == listing.owners
+    assert record.condition is None  # ✅ На карточке стенда нет маркеров состояния, как и на многих настоящих
+    assert record.transmission == listing.transmission[1]
+    assert (record.engine_power, record.fuel) == (listing.power, listing.fuel[1])
+    assert record.views == listing.views
+    assert record.price == listing.price
+    assert record.url == url
+
+
+def test_plan_extract_field_and_defaults():
+    listing, page, url = card(SALE_IDS[0])
+    tree = html.fromstring(page)
+    assert DEFAULT_PLAN.extract_field(tree, 'price') == listing.price
+    assert DEFAULT_PLAN.extract_field(tree, 'date_posted') == f"{listing.posted.day} {MONTHS[listing.posted.month - 1]}"
+    assert DEFAULT_PLAN.extract_field(None, 'title') == 'N/A'
+
+    empty = DEFAULT_PLAN.extract(None, url)
+    assert (empty.title, empty.price, empty.views) == (None, 0, 0)
+
+
+def test_plan_condition_markers():
+    tree = html.fromstring('<html><body><div class="CardInfoSummarySimpleRow">'
+                           '<span>Исправна, не битая</span></div></body></html>')
+    assert DEFAULT_PLAN.extract_field(tree, 'condition') == 'Исправна, не битая'
+
+
+def test_plan_from_custom_table():
+    plan = ExtractionPlan(
+        field_table=[{'field': 'price', 'column': 'Цена', 'type': 'int', 'default': 0,
+                      'xpaths': ['//b[@id="missing"]/text()', '//i/text()']}],
+        sources={},
+    )
+    tree = html.fromstring('<html><body><i>1 250 000 ₽</i></body></html>')
+    assert plan.extract_field(tree, 'price') == 1250000
+
+
+@pytest.mark.parametrize('sale_id', SALE_IDS)
+def test_single_pass_matches_plan(sale_id):
+    _, page, url = card(sale_id)
+    tree = html.fromstring(page)
+    assert DEFAULT_EXTRACTOR.extract(tree, url) == DEFAULT_PLAN.extract(tree, url)
+
+
+def test_single_pass_falls_back_to_xpath():
+    # ✅ Просмотры без класса CardHead__views - добираются XPath-цепочкой плана
+    page = ('<html><body><h1 class="CardHead__title">Kia Rio</h1>'
+            '<div>120 <span>Просмотров</span></div>'
+            '<span class="OfferPriceCaption__price">650 000 ₽</span></body></html>')
+    tree = html.fromstring(page)
+    record = DEFAULT_EXTRACTOR.extract(tree, 'u')
+    assert record == DEFAULT_PLAN.extract(tree, 'u')
+    assert (record.title, record.views, record.price) == ('Kia Rio', 120, 650000)
+
+
+def test_single_pass_without_tree():
+    assert DEFAULT_EXTRACTOR.extract(None, 'u') == DEFAULT_PLAN.extract(None, 'u')
+
+
+def test_get_extractor():
+    assert get_extractor('xpath') is DEFAULT_PLAN
+    assert get_extractor('single_pass') is DEFAULT_EXTRACTOR
+    with pytest.raises(ValueError):
+        get_extractor('regex')
+
+
+def stream(page, chunk_size=4096, **kwargs):
+    extraction = StreamingExtraction(encoding='utf-8', **kwargs)
+    for i in range(0, len(page), chunk_size):
+        if extraction.feed(page[i:i + chunk_size]):
+            break
+    return extraction
+
+
+@pytest.mark.parametrize('sale_id', SALE_IDS)
+def test_streaming_matches_full_parse_and_stops_early(sale_id):
+    _, page, url = card(sale_id)
+    extraction = stream(page)
+    assert extraction.complete
+    assert extraction.bytes_read < len(page) / 2  # ✅ Балласт и JSON в конце страницы не читаются
+    _, record = extraction.finish(url)
+    assert record == DEFAULT_PLAN.extract(html.fromstring(page), url)
+
+
+def test_streaming_waits_for_required_fields():
+    _, page, url = card(SALE_IDS[0])
+    # ✅ Состояния на карточке нет: если требовать все поля, ранней остановки не будет
+    extraction = stream(page, required=[spec.name for spec in DEFAULT_PLAN.fields])
+    assert not extraction.complete and extraction.bytes_read == len(page)
+
+    head = page[:page.index(b'OfferPriceCaption__price')]
+    extraction = stream(head)
+    assert not extraction.complete  # ✅ Цена ещё не пришла
+    assert extraction.finish(url)[1].price == 0
+
+
+def test_async_reader_closes_after_dom_fields(monkeypatch):
+    import asyncio
+
+    import auto_parser_async
+    from test_page_state import FakeResponse
+
+    monkeypatch.setattr(auto_parser_async, 'USE_PAGE_STATE', False)
+    monkeypatch.setattr(auto_parser_async, 'STREAM_PARSE', True)
+    _, page, url = card(SALE_IDS[1])
+    detail = auto_parser_async.AsyncCarDetailPage(url)
+    response = FakeResponse(page, chunk_size=4096)
+    content = asyncio.run(detail._read_streaming(response))
+
+    assert detail.partial and response.closed
+    assert len(content) < len(page) / 2
+    assert detail.get_car_data() == DEFAULT_PLAN.extract(html.fromstring(page), url)
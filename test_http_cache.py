@@ -0,0 +1,161 @@
+"""Тесты HTTP-кэша (crawler/http_cache.py)"""
+
+import datetime
+import random
+import sqlite3
+
+import pytest
+
+import auto_parser_sync
+import crawler.rate_limit
+import pages.car_detail_page
+from auto_parser_sync import SyncCarDetailPage
+from crawler.http_cache import HttpCache
+from pages.car_detail_page import CarDetailPage
+
+URL = 'https://auto.ru/cars/used/sale/kia/rio/1100000001-abc/'
+HEADERS = {'ETag': '"v1"', 'Last-Modified': 'Wed, 03 Jan 2024 10:00:00 GMT'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.db'), max_bytes=10 ** 6, ttl=3600)
+    yield cache
+    cache.close()
+
+
+def last_access(cache, url):
+    return cache.conn.execute('SELECT last_access FROM responses WHERE url = ?', (url,)).fetchone()[0]
+
+
+def test_store_and_lookup(cache):
+    assert cache.lookup(URL) is None
+    cache.store(URL, b'<html>body</html>', HEADERS)
+    entry = cache.lookup(URL)
+    assert entry.body == b'<html>body</html>' and entry.fresh and not entry.partial
+    assert HttpCache.conditional_headers(entry) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': HEADERS['Last-Modified']
+    }
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def test_stale_and_revalidated(cache):
+    cache.ttl = 0
+    cache.store(URL, b'body', HEADERS)
+    assert not cache.lookup(URL).fresh
+    cache.ttl = 3600
+    cache.revalidated(URL, {'ETag': '"v2"'})
+    entry = cache.lookup(URL)
+    assert entry.fresh and entry.etag == '"v2"'
+
+
+def test_partial_body_only_for_page_state(cache):
+    cache.store(URL, b'<html><script id="initial-state">{}</script>', {}, partial=True)
+    assert cache.lookup(URL) is None  # ✅ Для DOM обрезанное тело - промах
+    assert cache.lookup(URL, allow_partial=True).partial
+
+
+def test_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.db'), max_bytes=3000, ttl=3600)
+    for i in range(5):
+        cache.store(f'{URL}?n={i}', random.Random(i).randbytes(1000), {})  # ✅ Не сжимается
+    assert cache.total_bytes <= 3000
+    assert cache.stats['evicted'] >= 2
+    assert cache.lookup(f'{URL}?n=0') is None and cache.lookup(f'{URL}?n=4') is not None
+    cache.close()
+
+
+
+def test_eviction_shares_size_between_processes(tmp_path, monkeypatch):
+    # ✅ Два экземпляра на одном файле - как несколько процессов-воркеров
+    monkeypatch.setattr(HttpCache, 'EVICT_BATCH', 2)
+    path = str(tmp_path / 'cache.db')
+    first = HttpCache(path, max_bytes=5000, ttl=3600)
+    second = HttpCache(path, max_bytes=5000, ttl=3600)
+    for i in range(4):
+        first.store(f'{URL}?n={i}', random.Random(i).randbytes(1000), {})
+    second.store(f'{URL}?n=4', random.Random(4).randbytes(1000), {})
+    assert second.total_bytes > 4000  # ✅ Видны и чужие записи
+    second.store(f'{URL}?n=5', random.Random(5).randbytes(1000), {})
+    assert second.stats['evicted'] == 2
+    assert second.total_bytes == second._total_bytes() <= 4500
+    assert first.lookup(f'{URL}?n=0') is None and first.lookup(f'{URL}?n=5') is not None
+    first.close()
+    second.close()
+
+def test_hits_are_written_in_batches(cache, monkeypatch):
+    monkeypatch.setattr(HttpCache, 'TOUCH_BATCH', 3)
+    urls = [f'{URL}?n={i}' for i in range(3)]
+    for url in urls:
+        cache.store(url, b'body', {})
+    stored = last_access(cache, urls[0])
+
+    cache.lookup(urls[0])
+    cache.lookup(urls[1])
+    assert last_access(cache, urls[0]) == stored  # ✅ Попадание - не коммит
+    assert len(cache.touched) == 2
+
+    cache.lookup(urls[2])
+    assert cache.touched == {}
+    assert last_access(cache, urls[0]) > stored
+
+    cache.lookup(urls[0])
+    cache.flush()
+    assert cache.touched == {}
+
+
+def test_locked_database_is_not_fatal(cache, tmp_path):
+    cache.store(URL, b'old', {})
+    cache.conn.execute('PRAGMA busy_timeout = 0')
+    other = sqlite3.connect(str(tmp_path / 'cache.db'))
+    other.execute('BEGIN EXCLUSIVE')
+    try:
+        cache.store(URL, b'new', {})
+        cache.revalidated(URL)
+    finally:
+        other.rollback()
+        other.close()
+    assert cache.stats['errors'] == 2
+    assert cache.lookup(URL).body == b'old'
+    cache.store(URL, b'new', {})
+    assert cache.lookup(URL).body == b'new'
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200, url=URL):
+        self.content = content
+        self.status_code = status_code
+        self.url = url
+        self.headers = {}
+        self.elapsed = datetime.timedelta(seconds=0.01)
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+CAPTCHA = b'<html><body><form action="/checkcaptcha">' + b' ' * 1000 + b'</form></body></html>'
+CARD = b'<html><body><h1 class="CardHead__title">Kia Rio</h1>' + b' ' * 1000 + b'</body></html>'
+
+
+@pytest.mark.parametrize('engine', ['threaded', 'sync'])
+@pytest.mark.parametrize('content, status, cached', [(CAPTCHA, 200, False), (CARD, 404, False), (CARD, 200, True)])
+def test_engines_cache_only_real_pages(cache, monkeypatch, engine, content, status, cached):
+    monkeypatch.setattr(crawler.rate_limit, '_limiter', crawler.rate_limit.RateLimiter(rps=1000, burst=1000))
+    session = FakeSession(FakeResponse(content, status))
+    if engine == 'threaded':
+        monkeypatch.setattr(pages.car_detail_page, 'get_http_cache', lambda: cache)
+        monkeypatch.setattr(CarDetailPage, '_session', session)
+        page = CarDetailPage(URL)
+    else:
+        monkeypatch.setattr(auto_parser_sync, 'get_http_cache', lambda: cache)
+        page = SyncCarDetailPage(URL)
+        page._load_page(session)
+        assert page.retry_reason == ('challenge' if content is CAPTCHA else None)
+
+    assert (cache.lookup(URL) is not None) == cached
+    assert (page.tree is not None) == cached  # ✅ Капча и страница ошибки не разбираются
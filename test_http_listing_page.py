@@ -0,0 +1,82 @@
+"""Тесты HTTP-выдачи (pages/http_listing_page.py)"""
+
+import datetime
+from urllib.parse import urlsplit, parse_qsl
+
+import pytest
+
+import crawler.rate_limit
+from benchmarks.fixtures import FixtureCorpus
+from crawler.rate_limit import RateLimiter
+from pages.http_listing_page import HttpListingPage
+from pages.listing_page import CARS_PER_PAGE
+
+BASE = 'https://auto.ru'
+PATH = '/cars/used/'
+CORPUS = FixtureCorpus(size=120, listing_bytes=2000, promoted=0, today=datetime.date(2024, 1, 20))
+CAPTCHA = b'<html><form action="/checkcaptcha">SmartCaptcha</form></html>'
+
+
+def listing_page(page=1):
+    return CORPUS.listing_page(BASE, PATH, {'page': page})
+
+
+class FakeResponse:
+    def __init__(self, content, url, status_code=200):
+        self.content = content
+        self.url = url
+        self.status_code = status_code
+        self.elapsed = None
+
+
+class FakeSession:
+    """Страницы выдачи стенда; номера из ``captcha`` отдают капчу"""
+
+    def __init__(self, captcha=()):
+        self.captcha = set(captcha)
+
+    def get(self, url, **kwargs):
+        page = int(dict(parse_qsl(urlsplit(url).query)).get('page', 1))
+        if page in self.captcha:
+            return FakeResponse(CAPTCHA, url)
+        return FakeResponse(listing_page(page), url)
+
+
+@pytest.fixture(autouse=True)
+def fast_limiter(monkeypatch):
+    monkeypatch.setattr(crawler.rate_limit, '_limiter', RateLimiter(rps=1000, burst=1000))
+
+
+def test_is_challenge():
+    assert HttpListingPage.is_challenge(CAPTCHA)
+    assert HttpListingPage.is_challenge(b'<html></html>', 'https://auto.ru/showcaptcha?retpath=x')
+    assert not HttpListingPage.is_challenge(listing_page(), f'{BASE}{PATH}?page=1')
+    # ✅ Маркер далеко в теле (в тексте объявления, скриптах) - не капча
+    assert not HttpListingPage.is_challenge(b'x' * 20000 + b'SmartCaptcha')
+
+
+def test_parse_links():
+    links = HttpListingPage.parse_links(listing_page(), f'{BASE}{PATH}?page=1')
+    expected = [f'{BASE}{listing.path()}' for listing in CORPUS.listings[:CARS_PER_PAGE]]
+    assert links == expected  # ✅ Без ?from=search, в порядке выдачи
+    assert HttpListingPage.parse_links(CAPTCHA) is None
+    assert HttpListingPage.parse_links(b'') is None
+    assert HttpListingPage.parse_links(b'<html><body>nothing</body></html>') is None
+
+
+def test_parse_probe():
+    count, pages, links = HttpListingPage.parse_probe(listing_page())
+    assert (count, pages, len(links)) == (120, 3, CARS_PER_PAGE)
+    assert HttpListingPage.parse_probe(CAPTCHA) is None
+
+
+def test_collect_threaded_with_fallback():
+    listing = HttpListingPage(f'{BASE}{PATH}?price_to=10000000')
+    assert listing.get_total_pages(FakeSession()) == 3
+
+    links_by_page, fallback = listing.collect_threaded(FakeSession(captcha={2}), range(1, 4), num_threads=3)
+    assert fallback == [2]
+    assert sorted(links_by_page) == [1, 3]
+    merged = HttpListingPage.merge_links(links_by_page)
+    assert merged == links_by_page[1] + links_by_page[3]
+    assert len(merged) == 120 - CARS_PER_PAGE
@@ -0,0 +1,101 @@
+"""Тесты очереди заданий (crawler/jobs.py)"""
+
+import pytest
+
+import crawler.jobs
+from crawler.jobs import JobStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(crawler.jobs.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = JobStore(str(tmp_path / 'jobs.db'), lease_seconds=10, max_attempts=2)
+    yield store
+    store.close()
+
+
+def test_lease_order(store):
+    store.add_jobs('listing', [{'pages': [1, 2]}])
+    store.add_jobs('detail', [{'urls': ['a']}])
+    assert store.lease('w1')[1:] == ('detail', {'urls': ['a']})
+    assert store.lease('w1')[1:] == ('listing', {'pages': [1, 2]})
+    assert store.lease('w1') is None
+
+
+def test_expired_lease_goes_to_another_worker(store, clock):
+    store.add_jobs('detail', [{'urls': ['a']}])
+    job_id, _, _ = store.lease('w1')
+    assert store.lease('w2') is None
+
+    clock.now += 5
+    assert store.renew(job_id, 'w1')
+    clock.now += 9
+    assert store.lease('w2') is None  # ✅ Продлённая аренда ещё действует
+
+    clock.now += 2
+    assert store.lease('w2')[0] == job_id
+    assert not store.renew(job_id, 'w1')
+    assert not store.complete(job_id, 'w1', records=[{'URL': 'a'}])
+    assert store.complete(job_id, 'w2', records=[{'URL': 'a'}])
+    assert store.drain_results() == [{'URL': 'a'}]
+
+
+def test_attempts_exhausted(store, clock):
+    store.add_jobs('detail', [{'urls': ['a']}])
+    store.lease('w1')
+    clock.now += 11
+    store.lease('w2')
+    clock.now += 11
+    assert store.lease('w3') is None
+    assert store.counts() == {('detail', 'failed'): 1}
+    assert not store.unfinished()
+
+
+def test_release_without_error_keeps_attempt(store):
+    store.add_jobs('detail', [{'urls': ['a']}])
+    for _ in range(3):
+        job_id, _, _ = store.lease('w1')
+        store.release(job_id, 'w1')
+    store.release(store.lease('w1')[0], 'w1', error=True)
+    store.lease('w1')
+    assert store.lease('w1') is None
+    assert store.counts() == {('detail', 'leased'): 1}
+
+
+def test_split_listings_dedupes_sale_ids(store):
+    store.add_jobs('listing', [{'pages': [1]}, {'pages': [2]}])
+    links = ['https://auto.ru/cars/used/sale/kia/rio/1100000001-a/',
+             'https://auto.ru/cars/used/sale/kia/rio/1100000002-b/']
+    first, _, _ = store.lease('w1')
+    store.complete(first, 'w1', {'links': links})
+    second, _, _ = store.lease('w1')
+    store.complete(second, 'w1', {'links': [links[1] + '?from=search'], 'failed': [2]})
+
+    batches, failed = store.split_listings(batch_size=1)
+    assert batches == 2
+    assert failed == [({'pages': [2]}, [2])]
+    assert store.split_listings(batch_size=1) == (0, [])
+
+
+def test_collect_failed_details_once(store):
+    store.add_jobs('detail', [{'urls': ['a', 'b']}])
+    job_id, _, _ = store.lease('w1')
+    store.complete(job_id, 'w1', {'failed': ['b']})
+    assert store.unfinished()
+    assert store.collect_failed_details() == [({'urls': ['a', 'b']}, ['b'])]
+    assert store.collect_failed_details() == []
+    assert not store.unfinished()
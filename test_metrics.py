@@ -0,0 +1,91 @@
+"""Тесты метрик стадий (crawler/metrics.py)"""
+
+import urllib.request
+
+import pytest
+
+from crawler import metrics
+from crawler.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Чистый реестр вместо общего (остальные тесты тоже пишут метрики)"""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, 'REGISTRY', registry)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(metrics, 'STAGE_SECONDS', registry.histogram('stage_seconds', 'Стадии', ('stage',),
+                                                                       buckets=(0.01, 0.1, 1)))
+    monkeypatch.setattr(metrics, 'REQUEST_SECONDS', registry.histogram('request_seconds', 'Запросы',
+                                                                         ('kind', 'status'), buckets=(0.1, 1)))
+    monkeypatch.setattr(metrics, 'ERRORS', registry.counter('errors_total', 'Ошибки', ('stage', 'type')))
+    monkeypatch.setattr(metrics, 'RECORDS', registry.counter('records_total', 'Записи'))
+    return registry
+
+
+def test_histogram_buckets_and_quantile():
+    histogram = MetricsRegistry().histogram('h', 'help', ('stage',), buckets=(1, 0.1, 0.01))
+    for value in (0.005, 0.05, 0.05, 0.5, 5):
+        histogram.observe(value, stage='parse')
+    counts, total, count = histogram.values[('parse',)]
+    assert counts == [1, 2, 1, 1]  # ✅ Границы отсортированы, последняя корзина - +Inf
+    assert (round(total, 3), count) == (5.605, 5)
+    assert histogram.quantile(('parse',), 0.5) == 0.1
+    assert histogram.quantile(('parse',), 1.0) == float('inf')
+
+
+def test_hooks(registry):
+    metrics.observe('parse', 0.05)
+    metrics.request('card', 200, 0.5)
+    metrics.error('request', 'timeout')
+    metrics.record(3)
+    with pytest.raises(ValueError):
+        with metrics.timed('extract'):
+            raise ValueError('broken')
+
+    assert metrics.STAGE_SECONDS.values[('parse',)][2] == 1
+    assert metrics.STAGE_SECONDS.values[('extract',)][2] == 1  # ✅ Длительность записана и при ошибке
+    assert metrics.REQUEST_SECONDS.values[('card', '200')][2] == 1
+    assert metrics.ERRORS.values == {('request', 'timeout'): 1, ('extract', 'ValueError'): 1}
+    assert metrics.RECORDS.values == {(): 3}
+
+
+def test_disabled_hooks_write_nothing(registry, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+    metrics.observe('parse', 0.05)
+    metrics.error('request', 'timeout')
+    with metrics.timed('extract'):
+        pass
+    assert not metrics.STAGE_SECONDS.values and not metrics.ERRORS.values
+    assert metrics.trace_configs() == []
+
+
+def test_prometheus_text(registry):
+    metrics.observe('parse', 0.05)
+    metrics.observe('parse', 5)
+    metrics.error('request', 'say "hi"\n')
+    text = registry.render()
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="parse",le="0.01"} 0' in text
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text  # ✅ Корзины накопительные
+    assert 'stage_seconds_count{stage="parse"} 2' in text
+    assert 'stage_seconds_sum{stage="parse"} 5.050000' in text
+    assert 'errors_total{stage="request",type="say \\"hi\\"\\n"} 1' in text
+    assert text.endswith('\n')
+
+
+def test_server(registry, monkeypatch):
+    monkeypatch.setattr(metrics, '_server', None)
+    metrics.record()
+    server = metrics.start_server(port=0)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode('utf-8')
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'records_total 1' in body
+        assert metrics.start_server(port=0) is server  # ✅ Один сервер на процесс
+    finally:
+        server.shutdown()
+        server.server_close()
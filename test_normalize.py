@@ -0,0 +1,97 @@
+"""Тесты crawler/normalize.py и CarRecord"""
+
+import pandas as pd
+
+from crawler.normalize import normalize_frame, parse_dates, digits, split_engine, sort_by_date
+from crawler.records import CarRecord
+
+TODAY = pd.Timestamp('2024-01-05')
+
+
+def make_record(**values):
+    fields = {
+        'title': 'Kia Rio', 'year': '2015', 'mileage': '123 000 км', 'owners': '2 владельца',
+        'condition': 'Не требует ремонта', 'transmission': 'механическая',
+        'engine': '1.6 л / 123 л.с. / Бензин', 'date_posted': '3 января',
+        'views': '45 просмотров', 'price': '650 000 ₽',
+    }
+    fields.update(values)
+    return CarRecord.from_fields(fields, 'https://auto.ru/cars/used/sale/kia/rio/1100000001-abc/')
+
+
+def test_record_round_trip():
+    row = make_record().to_row()
+    assert list(row) == CarRecord.column_names()
+
+    df = normalize_frame(pd.DataFrame([row]), today=TODAY)
+    result = df.iloc[0]
+    assert result['Пробег, км'] == 123000
+    assert result['Владельцы'] == 2
+    assert result['Объём двигателя, л'] == 1.6
+    assert result['Мощность, л.с.'] == 123
+    assert result['Топливо'] == 'Бензин'
+    assert result['Цена'] == 650000
+    assert result['Дата объявления'] == pd.Timestamp('2024-01-03')
+
+
+def test_missing_values_become_na():
+    record = make_record(mileage='N/A', engine='N/A', price='N/A')
+    assert record.mileage_km is None
+    assert record.engine_volume is None and record.fuel is None
+    assert record.price == 0
+
+
+def test_parse_dates():
+    values = pd.Series(['3 января', '28 декабря', '12 октября 2022', '2023-11-02',
+                        'вчера', '3 дня назад', 'N/A', None])
+    parsed = parse_dates(values, today=TODAY)
+    assert list(parsed[:6]) == [
+        pd.Timestamp('2024-01-03'),
+        pd.Timestamp('2023-12-28'),  # ✅ Дата без года «в будущем» - прошлогодняя
+        pd.Timestamp('2022-10-12'),
+        pd.Timestamp('2023-11-02'),
+        pd.Timestamp('2024-01-04'),
+        pd.Timestamp('2024-01-02'),
+    ]
+    assert parsed[6:].isna().all()
+
+
+def test_digits():
+    assert list(digits(pd.Series(['123 000 км', 'N/A', '', None]))) == [123000, pd.NA, pd.NA, pd.NA]
+    assert str(digits(pd.Series([1, 2])).dtype) == 'Int64'
+
+
+def test_split_engine():
+    engine = split_engine(pd.Series([
+        '1.6 л / 102 л.с. / Бензин', '2,0 л/150 л.с./Дизель', '150 кВт / 204 л.с. / Электро',
+        '2.0 л / 150 л.с.', 'Бензин',
+    ]))
+    assert list(engine['Объём двигателя, л']) == [1.6, 2.0, pd.NA, 2.0, pd.NA]
+    assert list(engine['Мощность, л.с.']) == [102, 150, 204, 150, pd.NA]
+    assert list(engine['Топливо'].astype(object).fillna('-')) == ['Бензин', 'Дизель', 'Электро', '-', 'Бензин']
+
+
+def test_split_engine_placeholders_are_missing():
+    # ✅ «A» после «/» в «N/A» - не топливо
+    engine = split_engine(pd.Series(['N/A', '', ' N/A ', None]))
+    assert engine.isna().all().all()
+
+
+def test_legacy_columns():
+    legacy = pd.DataFrame({
+        'Марка': ['Kia Rio', 'Lada Vesta'],
+        'Пробег': ['123 000 км', 'N/A'],
+        'Двигатель': ['1.6 л / 123 л.с. / Бензин', 'N/A'],
+        'Дата объявления': ['3 января', 'вчера'],
+        'Цена': ['650 000', None],
+    })
+    df = normalize_frame(legacy, today=TODAY)
+    assert 'Пробег' not in df.columns and 'Двигатель' not in df.columns
+    assert list(df['Пробег, км']) == [123000, pd.NA]
+    assert list(df['Топливо'].astype(object).fillna('-')) == ['Бензин', '-']
+    assert list(df['Цена']) == [650000, 0]
+
+
+def test_sort_by_date():
+    df = normalize_frame(pd.DataFrame({'Дата объявления': ['1 января', None, '4 января']}), today=TODAY)
+    assert list(sort_by_date(df)['Дата объявления'].dt.day.fillna(0)) == [4, 1, 0]
@@ -0,0 +1,130 @@
+"""Тесты извлечения из JSON-состояния (pages/page_state.py)"""
+
+import asyncio
+import datetime
+import json
+
+import auto_parser_async
+from auto_parser_async import AsyncCarDetailPage
+from pages.page_state import PageStateExtractor
+
+URL = 'https://auto.ru/cars/used/sale/kia/rio/1100000001-abc/'
+STATE = {'card': {
+    'vehicle_info': {
+        'mark_info': {'name': 'Kia'}, 'model_info': {'name': 'Rio'},
+        'tech_param': {'transmission': 'MECHANICAL', 'displacement': 1591, 'power': 123, 'engine_type': 'GASOLINE'},
+    },
+    'documents': {'year': 2015, 'owners_number': 2},
+    'state': {'mileage': 123000, 'condition': 'CONDITION_OK'},
+    'additional_info': {'creation_date': 1704276000000, 'views': 45},
+    'price_info': {'RUR': 650000},
+}}
+
+
+def make_page(state=STATE, filler=b''):
+    script = f'<script id="initial-state" type="application/json">{json.dumps(state)}</script>'.encode()
+    return b'<html><body><h1>Kia Rio</h1>' + filler + script + b'<footer>' + b'x' * 5000 + b'</footer></body></html>'
+
+
+def test_find_state():
+    extractor = PageStateExtractor()
+    page = make_page()
+    assert json.loads(extractor.find_state(page)) == STATE
+    assert extractor.find_state(page[:page.index(b'</script>')]) is None  # ✅ Блок ещё не дочитан
+    assert extractor.find_state(b'<html></html>') is None
+
+
+def test_scanner_finds_state_across_chunks():
+    extractor = PageStateExtractor()
+    page = make_page(filler=b'<div>' * 3000)
+    expected = extractor.find_state(page)
+    for size in (1, 7, 64, 4096):
+        scanner, buffer, found = extractor.scanner(), bytearray(), None
+        for i in range(0, len(page), size):
+            buffer.extend(page[i:i + size])
+            found = scanner.feed(buffer)
+            if found is not None:
+                break
+        assert found == expected
+        assert len(buffer) < len(page)  # ✅ Блок найден до конца страницы
+        assert scanner.scanned == len(buffer)
+
+
+def test_scanner_without_state():
+    scanner = PageStateExtractor().scanner()
+    assert scanner.feed(b'<html><script id="other">{}</script>') is None
+    assert scanner.feed(b'<html><script id="other">{}</script><script id="initial-state">{"a"') is None
+    assert scanner.feed(b'<html><script id="other">{}</script><script id="initial-state">{"a": 1}</script>') == b'{"a": 1}'
+
+
+def test_extract():
+    record = PageStateExtractor().extract(make_page(), URL)
+    assert record.title == 'Kia Rio'
+    assert (record.year, record.mileage_km, record.owners, record.views, record.price) == (2015, 123000, 2, 45, 650000)
+    assert (record.engine_volume, record.engine_power, record.fuel) == (1.6, 123, 'Бензин')
+    assert record.transmission == 'механическая'
+    assert record.condition == 'Не требует ремонта'
+    assert record.date_posted == datetime.datetime.fromtimestamp(1704276000).date().isoformat()
+    assert record.url == URL
+
+
+def test_extract_fallbacks():
+    extractor = PageStateExtractor()
+    state = json.loads(json.dumps(STATE))
+    del state['card']['price_info']['RUR']
+    state['card']['price_info']['price'] = '700 000'
+    state['card']['vehicle_info']['tech_param']['transmission'] = 'NEW_GEARBOX'
+    record = extractor.extract(make_page(state), URL)
+    assert record.price == 700000
+    assert record.transmission == 'NEW_GEARBOX'
+
+    assert extractor.extract(make_page({'user': {}}), URL) is None
+    assert extractor.extract(b'<script id="initial-state">{broken</script>', URL) is None
+
+
+class FakeContent:
+    def __init__(self, body, chunk_size):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+class FakeResponse:
+    charset = 'utf-8'
+
+    def __init__(self, body, chunk_size=256):
+        self.content = FakeContent(body, chunk_size)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def read_streaming(monkeypatch, body):
+    monkeypatch.setattr(auto_parser_async, 'USE_PAGE_STATE', True)
+    page = AsyncCarDetailPage(URL)
+    response = FakeResponse(body)
+    content = asyncio.run(page._read_streaming(response))
+    return page, response, content
+
+
+def test_streaming_stops_after_state(monkeypatch):
+    body = make_page()
+    page, response, content = read_streaming(monkeypatch, body)
+    assert page.record is not None and page.record.price == 650000
+    assert page.partial and response.closed
+    assert len(content) < len(body)
+    assert response.content.read < len(response.content.chunks)
+
+
+def test_streaming_without_card_reads_everything(monkeypatch):
+    # ✅ Блок без card не обрывает чтение - DOM строится по полному телу
+    body = make_page({'user': {}})
+    page, response, content = read_streaming(monkeypatch, body)
+    assert page.record is None
+    assert not page.partial and not response.closed
+    assert content == body
@@ -0,0 +1,87 @@
+"""Тесты разбора в пуле процессов (crawler/parse_pool.py)"""
+
+import asyncio
+import datetime
+
+import auto_parser_async
+from auto_parser_async import AsyncCarDetailPage
+from benchmarks.fixtures import FixtureCorpus
+from crawler.parse_pool import ParsePool, parse_batch, parse_document
+from test_page_state import FakeResponse
+
+CORPUS = FixtureCorpus(size=10, card_bytes=20000, today=datetime.date(2024, 1, 20))
+SALE_IDS = sorted(CORPUS.by_id)[:5]
+
+
+def card(sale_id):
+    listing = CORPUS.by_id[sale_id]
+    return listing, CORPUS.card_page(sale_id), f"https://auto.ru{listing.path()}"
+
+
+def test_parse_document_state_and_dom(monkeypatch):
+    listing, page, url = card(SALE_IDS[0])
+    record, timings = parse_document(page, url)
+    assert (record.price, record.year, record.views) == (listing.price, listing.year, listing.views)
+    assert [stage for stage, _ in timings] == ['extract']  # ✅ Хватило JSON-состояния
+
+    monkeypatch.setattr('config.USE_PAGE_STATE', False)
+    dom_record, timings = parse_document(page, url)
+    assert dom_record.price == listing.price
+    assert [stage for stage, _ in timings] == ['parse', 'extract']
+
+
+def test_parse_batch_bad_document():
+    _, page, url = card(SALE_IDS[0])
+    results = parse_batch([(page, url), (b'', url)])
+    assert results[0][0] is not None
+    assert results[1][0] is None
+
+
+def test_pool_batches_and_stats(capsys):
+    documents = [card(sale_id) for sale_id in SALE_IDS] + [(None, b'', 'https://auto.ru/broken/')]
+
+    async def run():
+        with ParsePool(processes=1, batch_size=2, flush_interval=0.01) as pool:
+            records = await asyncio.gather(*(pool.parse(page, url) for _, page, url in documents))
+            pool.print_stats()
+            return records, dict(pool.stats)
+
+    records, stats = asyncio.run(run())
+    for (listing, _, url), record in zip(documents[:-1], records):
+        assert (record.price, record.url) == (listing.price, url)
+    assert records[-1] is None
+    assert stats == {'documents': 6, 'batches': 3, 'failed': 1}
+    assert 'документов 6 | пачек 3 (в среднем 2.0) | не разобрано 1' in capsys.readouterr().out
+
+
+def test_pool_flushes_incomplete_batch():
+    listing, page, url = card(SALE_IDS[0])
+
+    async def run():
+        with ParsePool(processes=1, batch_size=8, flush_interval=0.01) as pool:
+            return await pool.parse(page, url), dict(pool.stats)
+
+    record, stats = asyncio.run(run())
+    assert record.price == listing.price
+    assert stats['batches'] == 1
+
+
+def test_raw_streaming_leaves_state_to_pool(monkeypatch):
+    # ✅ В режиме raw JSON не декодируется на event loop: чтение обрывается по маркеру карточки
+    def decode(raw, url):
+        raise AssertionError('JSON декодирован на event loop')
+
+    listing, page, url = card(SALE_IDS[0])
+    detail = AsyncCarDetailPage(url, raw=True)
+    body = page + b'<footer>' + b'x' * 20000 + b'</footer>'
+    response = FakeResponse(body)
+    with monkeypatch.context() as patch:
+        patch.setattr(auto_parser_async, 'USE_PAGE_STATE', True)
+        patch.setattr(detail.STATE, 'decode', decode)
+        content = asyncio.run(detail._read_streaming(response))
+    assert detail.record is None
+    assert detail.partial and response.closed
+    assert len(content) < len(body)
+
+    record, _ = parse_document(content, url)
+    assert record.price == listing.price
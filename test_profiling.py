@@ -0,0 +1,60 @@
+"""Тесты профилирования (crawler/profiling.py)"""
+
+import threading
+import time
+
+import pytest
+
+from crawler.profiling import Profiler, StackSampler, classify, current_rss
+
+pytestmark = pytest.mark.skipif(current_rss() is None, reason='RSS процесса недоступен')
+
+
+def allocate(blocks, size=2 ** 20):
+    for _ in range(40):
+        blocks.append(bytearray(size))  # ✅ bytearray заполняется нулями - страницы реально заняты
+        time.sleep(0.002)
+
+
+def run_in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_classify():
+    assert classify([('/usr/lib/python3/threading.py', 'wait'), ('auto_parser.py', 'run')]) == 'idle'
+    assert classify([('/site-packages/lxml/html/__init__.py', 'fromstring'),
+                     ('/repo/pages/http_listing_page.py', 'get_car_links')]) == 'pagination'
+    assert classify([('/site-packages/lxml/html/__init__.py', 'fromstring')]) == 'parse'
+
+
+def test_sampler_attributes_rss_growth():
+    blocks = []
+    sampler = StackSampler(interval=0.001, stacks=False, memory=True)
+    sampler.start()
+    sampler.begin_phase()
+    run_in_thread(lambda: allocate(blocks))
+    peak, growth = sampler.end_phase()
+    sampler.stop()
+
+    assert not sampler.samples  # ✅ Без профиля CPU стеки не копятся
+    assert peak >= current_rss() - 2 ** 20
+    assert sum(growth.values()) > 20 * 2 ** 20
+    assert any(stack[0].co_name == 'allocate' for stack in growth)
+
+
+def test_profiler_memory_sample_report(tmp_path):
+    blocks = []
+    with Profiler(mode=None, memory='sample', output=str(tmp_path / 'cars.xlsx'), interval=0.001) as profiler:
+        with profiler.phase('crawl'):
+            run_in_thread(lambda: allocate(blocks))
+    report = (tmp_path / 'cars.memory.txt').read_text(encoding='utf-8')
+    assert report.startswith('# Режим: сэмплы RSS')
+    assert '# crawl: пик' in report and 'allocate (' in report
+    assert not (tmp_path / 'cars.cpu.collapsed').exists()
+
+
+def test_profiler_rejects_unknown_memory_mode():
+    with pytest.raises(ValueError):
+        Profiler(memory='heap')
@@ -0,0 +1,95 @@
+"""Тесты разбиения выдачи (pages/query_planner.py)"""
+
+from urllib.parse import urlsplit, parse_qsl
+
+from pages.query_planner import QueryPlanner, search_url
+
+BASE_URL = 'https://auto.ru/cars/used/?sort=cr_date-desc&price_to=1000'
+
+
+def price_range(url):
+    query = dict(parse_qsl(urlsplit(url).query))
+    return int(query.get('price_from', 0)), int(query['price_to'])
+
+
+class FakeListing:
+    """Выдача, где цена объявления = его номер; замеры из ``failures`` падают"""
+
+    def __init__(self, total=1000, failures=None, blank=None):
+        self.total = total
+        self.failures = dict(failures or {})
+        self.blank = dict(blank or {})  # ✅ Страница без счётчика и ссылок
+        self.probed = []
+
+    def probe(self, session, url):
+        low, high = price_range(url)
+        self.probed.append((low, high))
+        if self.failures.get((low, high), 0) > 0:
+            self.failures[(low, high)] -= 1
+            return None
+        if self.blank.get((low, high), 0) > 0:
+            self.blank[(low, high)] -= 1
+            return None, None, []
+        count = max(0, min(high, self.total - 1) - low + 1)
+        return count, None, [f'{url}#{i}' for i in range(min(count, 2))]
+
+
+def make_planner(listing, **kwargs):
+    planner = QueryPlanner(BASE_URL, page_cap=5, per_page=10, **kwargs)
+    planner.listing = listing
+    return planner
+
+
+def test_search_url():
+    assert search_url('https://auto.ru/cars/used/?sort=cr_date-desc', 500) == \
+        'https://auto.ru/cars/used/?sort=cr_date-desc&price_to=500'
+    assert price_range(search_url(BASE_URL, 700)) == (0, 700)
+
+
+def test_split_range():
+    assert QueryPlanner.split_range(0, 9, 3) == [(0, 2), (3, 6), (7, 9)]
+    assert QueryPlanner.split_range(5, 6, 4) == [(5, 5), (6, 6)]
+
+
+def test_plan_fits_page_cap():
+    planner = make_planner(FakeListing())
+    slices = planner.plan(session=None)
+    assert all(piece.pages <= 5 for piece in slices)
+    assert sum(piece.count for piece in slices) == 1000
+    ranges = [(piece.price_from, piece.price_to) for piece in slices]
+    assert ranges == sorted(ranges) and ranges[0][0] == 0 and ranges[-1][1] == 1000
+
+
+def test_failed_probe_is_retried():
+    listing = FakeListing(failures={(0, 49): 1})
+    planner = make_planner(listing)
+    slices = planner.plan(session=None)
+    assert listing.probed.count((0, 49)) == 2
+    assert sum(piece.count for piece in slices) == 1000
+    assert planner.stats['unprobed'] == 0
+
+
+def test_unprobed_slice_takes_one_page():
+    listing = FakeListing(failures={(0, 49): 10})
+    planner = make_planner(listing, probe_retries=2)
+    slices = planner.plan(session=None)
+    assert listing.probed.count((0, 49)) == 3
+    unprobed = [piece for piece in slices if piece.count is None]
+    assert [(piece.price_from, piece.price_to, piece.pages) for piece in unprobed] == [(0, 49, 1)]
+    assert planner.stats['unprobed'] == 1
+
+
+def test_blank_probe_is_not_an_empty_slice():
+    listing = FakeListing(blank={(0, 49): 1})
+    planner = make_planner(listing)
+    slices = planner.plan(session=None)
+    assert listing.probed.count((0, 49)) == 2  # ✅ Замер повторён, срез не потерян
+    assert sum(piece.count for piece in slices) == 1000
+
+    listing = FakeListing(blank={(0, 49): 10})
+    slices = make_planner(listing, probe_retries=1).plan(session=None)
+    assert [(piece.price_from, piece.count, piece.pages) for piece in slices if piece.count is None] == [(0, None, 1)]
+
+
+def test_root_probe_failure():
+    assert make_planner(FakeListing(failures={(0, 1000): 1})).plan(session=None) is None
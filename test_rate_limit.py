@@ -0,0 +1,116 @@
+"""Тесты общего лимита запросов (crawler/rate_limit.py)"""
+
+import asyncio
+
+import pytest
+
+import crawler.rate_limit
+from crawler.rate_limit import TokenBucket, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(crawler.rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1.0]  # ✅ Очередь по 1/rate
+
+    clock[0] += 10
+    assert bucket.reserve() == 0.0
+    assert bucket.tokens == 2  # ✅ Запас не больше burst
+
+
+def test_bucket_pause(clock):
+    bucket = TokenBucket(rate=2, burst=4)
+    bucket.pause(5)
+    bucket.pause(1)  # ✅ Паузы не складываются и не укорачиваются
+    assert bucket.reserve() == pytest.approx(5.5)
+
+    clock[0] += 6
+    assert bucket.reserve() == 0.0
+
+
+def test_limiter_hosts(clock):
+    limiter = RateLimiter(rps=1, burst=1, hosts={'slow.example': (0.5, 1)})
+    assert limiter.bucket('https://auto.ru/a') is limiter.bucket('https://auto.ru/b')
+    assert limiter.bucket('https://slow.example/').rate == 0.5
+
+    limiter._reserve('https://auto.ru/a')
+    assert limiter._reserve('https://auto.ru/b') == 1.0
+    assert limiter._reserve('https://other.example/') == 0.0
+    assert limiter.stats['requests'] == 3 and limiter.stats['delayed'] == 1
+
+
+def test_limiter_pause_is_capped(clock, monkeypatch):
+    monkeypatch.setattr(crawler.rate_limit, 'RETRY_AFTER_MAX', 30)
+    limiter = RateLimiter(rps=1, burst=1)
+    limiter.pause('https://auto.ru/a', 3600)
+    assert limiter._reserve('https://auto.ru/b') == pytest.approx(31)
+    assert limiter.stats['paused'] == 1
+
+
+def test_throttle_and_backoff(monkeypatch):
+    waited = []
+    limiter = RateLimiter(rps=1000, burst=2)
+    monkeypatch.setattr(crawler.rate_limit, '_limiter', limiter)
+    monkeypatch.setattr(crawler.rate_limit.time, 'sleep', waited.append)
+
+    for _ in range(3):
+        crawler.rate_limit.throttle('https://auto.ru/')
+    asyncio.run(crawler.rate_limit.throttle_async('https://auto.ru/'))
+    assert limiter.stats['requests'] == 4
+    assert len(waited) == 1  # ✅ Третий запрос ждал своей очереди
+
+    assert crawler.rate_limit.backoff('https://auto.ru/', 2)
+    crawler.rate_limit.throttle('https://auto.ru/')
+    assert waited[-1] >= 1.9
+
+
+def test_backoff_without_limiter(monkeypatch):
+    monkeypatch.setattr(crawler.rate_limit, 'RATE_LIMIT_ENABLED', False)
+    monkeypatch.setattr(crawler.rate_limit, '_limiter', None)
+    assert crawler.rate_limit.get_rate_limiter() is None
+    assert not crawler.rate_limit.backoff('https://auto.ru/', 2)
+    crawler.rate_limit.throttle('https://auto.ru/')  # ✅ Без лимита - сразу
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b'<html><body><h1 class="CardHead__title">Kia Rio</h1></body></html>'
+        self.url = 'https://auto.ru/cars/used/sale/kia/rio/1-a/'
+        self.elapsed = None
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def get(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+def test_threaded_page_backs_off_through_limiter(monkeypatch):
+    import pages.car_detail_page
+    from pages.car_detail_page import CarDetailPage
+
+    paused, waited = [], []
+    limiter = RateLimiter(rps=1000, burst=10)
+    limiter.pause = lambda url, seconds: paused.append(seconds)
+    monkeypatch.setattr(crawler.rate_limit, '_limiter', limiter)
+    monkeypatch.setattr(pages.car_detail_page, 'get_http_cache', lambda: None)
+    monkeypatch.setattr(pages.car_detail_page.time, 'sleep', waited.append)
+    monkeypatch.setattr(CarDetailPage, '_session', FakeSession(
+        FakeResponse(429, {'Retry-After': '7'}), FakeResponse(503), FakeResponse(200)
+    ))
+
+    page = CarDetailPage('https://auto.ru/cars/used/sale/kia/rio/1-a/')
+    assert page.tree is not None
+    assert paused == [7.0, 0.2]  # ✅ Retry-After, затем пауза с ростом - в общий лимит
+    assert waited == []  # ✅ Поток сам не спит
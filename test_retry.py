@@ -0,0 +1,71 @@
+"""Тесты отложенных повторов (crawler/retry.py)"""
+
+import email.utils
+import time
+
+import pytest
+
+import crawler.retry
+from crawler.retry import parse_retry_after, RetryScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(crawler.retry.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after(' 12 ') == 12.0
+    assert parse_retry_after('') is None
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < parse_retry_after(later) <= 30
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_backoff_bounds():
+    scheduler = RetryScheduler(base_delay=1, max_delay=5, retry_after_max=10)
+    assert all(0 <= scheduler.backoff(2) <= 4 for _ in range(100))
+    assert all(scheduler.backoff(10) <= 5 for _ in range(100))
+    assert 10 <= scheduler.backoff(1, retry_after=60) <= 11
+
+
+def test_pop_due(clock):
+    scheduler = RetryScheduler(base_delay=1, max_delay=1, retry_after_max=10)
+    assert scheduler.next_delay() is None
+    scheduler.schedule('a', 'throttled', retry_after=3)
+    scheduler.schedule('b', 'timeout', retry_after=1)
+    assert scheduler.pending == 2
+    assert 1 <= scheduler.next_delay() <= 2
+
+    assert scheduler.pop_due() == []
+    clock[0] += 2.5
+    assert scheduler.pop_due() == ['b']
+    clock[0] += 2
+    assert scheduler.pop_due() == ['a']
+    assert scheduler.pending == 0
+
+
+def test_attempt_limits(clock):
+    scheduler = RetryScheduler(max_attempts=2, max_total=3)
+    assert scheduler.schedule('a', 'server')
+    assert scheduler.schedule('a', 'server')
+    assert not scheduler.schedule('a', 'server')
+    assert scheduler.stats['server'] == {'retried': 2, 'gave_up': 1}
+
+    scheduler.done('b')
+    assert scheduler.schedule('b', 'network')
+    assert not scheduler.schedule('c', 'network')  # ✅ Общий лимит на запуск
+    assert scheduler.total == 3
+
+
+def test_done_resets_attempts(clock):
+    scheduler = RetryScheduler(max_attempts=1, max_total=10)
+    assert scheduler.schedule('a', 'timeout')
+    scheduler.done('a')
+    assert scheduler.schedule('a', 'timeout')
@@ -0,0 +1,95 @@
+"""Тесты инкрементального режима (crawler/seen_store.py)"""
+
+import pytest
+
+from crawler import seen_store
+from crawler.seen_store import SeenStore
+
+URLS = [f'https://auto.ru/cars/used/sale/kia/rio/{1100000000 + i}-abc/' for i in range(4)]
+
+
+class Clock:
+    """Подменяет модуль time в seen_store: время двигает тест"""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(seen_store, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = SeenStore(str(tmp_path / 'seen.db'), refresh_interval=100, batch_size=3)
+    yield store
+    store.close()
+
+
+def fetched_count(store):
+    return store.conn.execute('SELECT COUNT(*) FROM listings WHERE last_fetched IS NOT NULL').fetchone()[0]
+
+
+def test_new_listings_are_fetched_once_per_run(store):
+    assert store.observe(URLS[:3]) == URLS[:3]
+    assert store.observe(URLS) == URLS[3:]  # ✅ Уже встречались в этом запуске
+    # ✅ Та же карточка по ссылке с параметрами - то же объявление
+    assert store.observe([URLS[0] + '?from=search']) == []
+    assert store.stats == {'new': 4, 'refresh': 0, 'skipped': 0, 'removed': 0}
+
+
+def test_refresh_interval(store, clock):
+    store.observe(URLS[:2])
+    for url in URLS[:2]:
+        store.mark_fetched(url)
+    store.flush()
+
+    clock.now += 50
+    store.begin_run()
+    clock.now += 1
+    assert store.observe(URLS[:2]) == []
+    assert store.stats['skipped'] == 2
+
+    clock.now += 100
+    store.begin_run()
+    clock.now += 1
+    assert store.observe(URLS[:2]) == URLS[:2]
+    assert store.stats['refresh'] == 2
+
+
+def test_mark_fetched_is_batched(store):
+    store.observe(URLS)
+    store.mark_fetched(URLS[0])
+    store.mark_fetched(URLS[1])
+    assert fetched_count(store) == 0  # ✅ Ещё в памяти
+    store.mark_fetched(URLS[2])
+    assert fetched_count(store) == 3  # ✅ Пачка batch_size записана одной транзакцией
+    store.mark_fetched(URLS[3])
+    store.flush()
+    assert fetched_count(store) == 4
+
+
+def test_finish_run_marks_removed(store, clock):
+    store.observe(URLS)
+    store.mark_fetched(URLS[0])
+    clock.now += 10
+    store.begin_run()
+    clock.now += 1
+    store.observe(URLS[:1])
+    assert store.finish_run() == 3
+    assert store.stats['removed'] == 3
+    assert fetched_count(store) == 1  # ✅ Отложенные отметки записаны до пометки
+
+    removed = store.conn.execute('SELECT sale_id FROM listings WHERE removed_at IS NOT NULL').fetchall()
+    assert len(removed) == 3
+    # ✅ Объявление вернулось в выдачу - пометка снимается
+    store.begin_run()
+    clock.now += 1
+    store.observe(URLS[1:2])
+    assert store.conn.execute('SELECT COUNT(*) FROM listings WHERE removed_at IS NOT NULL').fetchone()[0] == 2
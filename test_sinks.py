@@ -0,0 +1,105 @@
+"""Тесты потоковых хранилищ (crawler/sinks.py)"""
+
+import pytest
+
+from crawler.records import CarRecord
+from crawler.sinks import create_sink, SINKS
+
+FORMATS = ['jsonl', 'csv']
+try:
+    import pyarrow  # noqa: F401
+    FORMATS += ['parquet', 'dataset']
+except ImportError:
+    pass
+
+
+def make_records(count, start=0):
+    return [
+        CarRecord(title='Kia Rio', year=2010 + i % 10, mileage_km=1000 * i, owners=1,
+                  condition='Не требует ремонта', transmission='механическая',
+                  engine_volume=1.6, engine_power=123, fuel='Бензин', date_posted='2024-01-03',
+                  views=i, price=100000 + i, url=f'https://auto.ru/cars/used/sale/kia/rio/{1100000000 + i}-a/')
+        for i in range(start, start + count)
+    ]
+
+
+def sink_path(tmp_path, fmt):
+    return str(tmp_path / f"cars{SINKS[fmt].EXTENSION or '.' + fmt}")
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_add_and_read(tmp_path, fmt):
+    sink = create_sink(fmt, path=sink_path(tmp_path, fmt), batch_size=3)
+    for record in make_records(7):
+        sink.add(record)
+
+    df = sink.read_dataframe()  # ✅ Читает и то, что ещё в буфере
+    assert len(df) == sink.count == 7
+    assert list(df.columns) == CarRecord.column_names()
+    assert list(df['Цена']) == [100000 + i for i in range(7)]
+    assert str(df['Цена'].dtype) == 'Int64'
+    sink.close()
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_append(tmp_path, fmt):
+    path = sink_path(tmp_path, fmt)
+    with create_sink(fmt, path=path, batch_size=2) as sink:
+        for record in make_records(3):
+            sink.add(record)
+
+    with create_sink(fmt, path=path, batch_size=2, append=True) as sink:
+        assert sink.count == 3
+        for record in make_records(2, start=3):
+            sink.add(record)
+        assert len(sink.read_dataframe()) == 5
+
+    with create_sink(fmt, path=path) as sink:
+        assert sink.count == 0  # ✅ Без append файл начинается заново
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_read_columns(tmp_path, fmt):
+    with create_sink(fmt, path=sink_path(tmp_path, fmt)) as sink:
+        for record in make_records(2):
+            sink.add(record)
+        assert list(sink.read_dataframe(columns=['URL', 'Цена']).columns) == ['URL', 'Цена']
+
+
+
+@pytest.mark.skipif('dataset' not in FORMATS, reason='нужен pyarrow')
+@pytest.mark.parametrize('by_brand', [False, True])
+def test_dataset_hides_partition_columns(tmp_path, by_brand):
+    sink = SINKS['dataset'](str(tmp_path / 'cars_dataset'), partition_by_brand=by_brand)
+    for record in make_records(3):
+        sink.add(record)
+
+    assert list(sink.read_dataframe().columns) == CarRecord.column_names()
+    assert 'crawl_date' in sink.read_dataframe(columns=['Цена', 'crawl_date']).columns
+    if by_brand:
+        only_kia = sink.read_dataframe(filters=[('brand', '=', 'kia')])
+        assert len(only_kia) == 3 and 'brand' not in only_kia.columns
+    sink.close()
+
+
+@pytest.mark.skipif('parquet' not in FORMATS, reason='нужен pyarrow')
+def test_parquet_reads_do_not_rewrite(tmp_path):
+    import pyarrow.parquet as pq
+
+    path = sink_path(tmp_path, 'parquet')
+    sink = create_sink('parquet', path=path, batch_size=2)
+    for record in make_records(4):
+        sink.add(record)
+    assert len(sink.read_dataframe()) == 4
+    size = (tmp_path / 'cars.parquet').stat().st_size
+    for record in make_records(4, start=4):
+        sink.add(record)
+    assert len(sink.read_dataframe()) == 8
+    assert (tmp_path / 'cars.parquet').stat().st_size == size  # ✅ Новые пачки - в part-файле
+    assert len(list(tmp_path.glob('cars.parquet.part-*'))) == 1
+    sink.close()
+
+    # ✅ После закрытия - один файл, row group на каждую пачку
+    assert [p.name for p in tmp_path.iterdir()] == ['cars.parquet']
+    assert pq.ParquetFile(path).num_row_groups == 4
+    assert list(sink.read_dataframe()['Цена']) == [100000 + i for i in range(8)]